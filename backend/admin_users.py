@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Admin user directory.
+
+GET /api/admin/users returns users newest first, one page at a time,
+walking the _id index with a keyset cursor. ?q= does a case-insensitive
+prefix search on email, full name and last name. Each user document stores
+lower-cased copies of those fields, and each copy has its own index, so
+the search is a union of three anchored index range scans.
+
+With ?stats=1 the page gets per-user transaction counts and the time of
+the last write. Both come from data kept up to date on every write: counts
+come from the monthly rollups and last activity from data_versions. That
+costs two batched queries per page, not one query per user.
+
+Users created before the search fields existed are backfilled with:
+
+    python admin_users.py backfill
+"""
+
+import argparse
+import re
+
+from bson.objectid import ObjectId
+from pymongo import DESCENDING, UpdateOne
+
+from database import connect
+from etags import VERSION_COLLECTION
+from rollups import ROLLUP_COLLECTION
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Fields sent to the admin dashboard; password and the search fields stay behind
+USER_FIELDS = {
+    'firstName': 1, 'lastName': 1, 'email': 1, 'phone': 1,
+    'dateOfBirth': 1, 'gender': 1, 'createdAt': 1, 'deletingAt': 1
+}
+SEARCH_FIELDS = ['emailLower', 'nameLower', 'lastNameLower']
+
+
+def normalize(value):
+    return ' '.join(str(value or '').split()).lower()
+
+
+def search_fields(doc):
+    """Lower-cased copies of the searchable fields of a user document"""
+    return {
+        'emailLower': normalize(doc.get('email')),
+        'nameLower': normalize(f"{doc.get('firstName', '')} {doc.get('lastName', '')}"),
+        'lastNameLower': normalize(doc.get('lastName'))
+    }
+
+
+def parse_directory_args(args):
+    """
+    Validate the directory query string.
+
+    Returns a dict with limit, before, q and stats. Raises ValueError on bad input.
+    """
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+
+    before = None
+    if args.get('before'):
+        if not ObjectId.is_valid(args['before']):
+            raise ValueError('Invalid cursor')
+        before = ObjectId(args['before'])
+
+    return {
+        'limit': min(limit, MAX_PAGE_SIZE),
+        'before': before,
+        'q': normalize(args.get('q')),
+        'stats': args.get('stats', '').lower() in ('1', 'true', 'yes')
+    }
+
+
+def directory_query(params):
+    """The filter for one directory page, sorted on _id descending"""
+    query = {}
+    if params['q']:
+        prefix = {'$regex': '^' + re.escape(params['q'])}
+        query['$or'] = [{field: prefix} for field in SEARCH_FIELDS]
+    if params['before']:
+        query['_id'] = {'$lt': params['before']}
+    return query
+
+
+def usage_stats_pipeline(user_ids):
+    """Transaction counts per (user, kind) for a page of users, read off the rollups"""
+    return [
+        {'$match': {'userId': {'$in': user_ids}}},
+        {'$group': {'_id': {'userId': '$userId', 'kind': '$kind'}, 'count': {'$sum': '$count'}}}
+    ]
+
+
+def usage_stats(db, user_ids):
+    """{user_id: {income_count, expense_count, last_activity}} for a page of users"""
+    stats = {user_id: {'income_count': 0, 'expense_count': 0, 'last_activity': None} for user_id in user_ids}
+    if not user_ids:
+        return stats
+
+    rows = db[ROLLUP_COLLECTION].aggregate(usage_stats_pipeline(user_ids))
+    for row in rows:
+        stats[row['_id']['userId']][f"{row['_id']['kind']}_count"] = row['count']
+
+    for row in db[VERSION_COLLECTION].find({'_id': {'$in': user_ids}}, {'updatedAt': 1}):
+        stats[row['_id']]['last_activity'] = row.get('updatedAt')
+    return stats
+
+
+def directory_page(db, params):
+    """Response body for one page of the admin user directory"""
+    users = list(db['users'].find(directory_query(params), USER_FIELDS)
+                 .sort('_id', DESCENDING).limit(params['limit'] + 1))
+    has_more = len(users) > params['limit']
+    users = users[:params['limit']]
+
+    if params['stats']:
+        stats = usage_stats(db, [user['_id'] for user in users])
+        for user in users:
+            user.update(stats[user['_id']])
+
+    page = {
+        'users': users,
+        'next_cursor': str(users[-1]['_id']) if has_more else None
+    }
+    if not params['q']:
+        # Collection metadata, not a count of matching documents
+        page['total'] = db['users'].estimated_document_count()
+    return page
+
+
+def backfill_search_fields(db, batch_size=1000):
+    """Add the search fields to users that lack them. Returns the number updated"""
+    updated = 0
+    batch = []
+    cursor = db['users'].find({'emailLower': {'$exists': False}}, {'email': 1, 'firstName': 1, 'lastName': 1})
+    for doc in cursor:
+        batch.append(UpdateOne({'_id': doc['_id']}, {'$set': search_fields(doc)}))
+        if len(batch) >= batch_size:
+            updated += db['users'].bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += db['users'].bulk_write(batch, ordered=False).modified_count
+    return updated
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Maintain the admin user directory search fields')
+    parser.add_argument('command', choices=['backfill'])
+    parser.add_argument('--uri', default=Config.MONGODB_URI, help='MongoDB connection string')
+    parser.add_argument('--database', help='Database name, if not the one in the URI')
+    args = parser.parse_args()
+
+    db = connect(args.uri, args.database)
+
+    print(f'✅ Backfilled search fields on {backfill_search_fields(db)} users')
+
+
+if __name__ == '__main__':
+    main()
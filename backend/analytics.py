@@ -0,0 +1,123 @@
+"""
+Recommendations built from a user's monthly totals.
+
+The totals come from the rollup collection (rollups.recommendation_totals),
+so this module only turns them, and the trends analysis, into the payload.
+"""
+
+from datetime import datetime
+
+
+def month_bounds(now=None):
+    """Return [start, end) datetimes for the calendar month containing now"""
+    now = now or datetime.now()
+    start = datetime(now.year, now.month, 1)
+    if now.month == 12:
+        end = datetime(now.year + 1, 1, 1)
+    else:
+        end = datetime(now.year, now.month + 1, 1)
+    return start, end
+
+
+def build_recommendations(totals, trends=None):
+    """
+    Turn monthly totals into the recommendations payload.
+
+    trends, from trends.analyze, adds recommendations drawn from the
+    user's history and is included in the payload.
+    """
+    monthly_income = totals['monthly_income']
+    monthly_expenses = totals['monthly_expenses']
+    expense_categories = totals['expense_categories']
+
+    monthly_savings = monthly_income - monthly_expenses
+    savings_rate = (monthly_savings / monthly_income * 100) if monthly_income > 0 else 0
+
+    recommendations = []
+
+    if savings_rate < 20:
+        recommendations.append({
+            'type': 'warning',
+            'title': 'Low Savings Rate',
+            'message': f'Your current savings rate is {savings_rate:.1f}%. Aim for at least 20% of your income.',
+            'suggestion': 'Review your expenses and identify areas where you can cut back.'
+        })
+
+    if monthly_expenses > monthly_income:
+        recommendations.append({
+            'type': 'alert',
+            'title': 'Overspending Alert',
+            'message': f'You are spending ₹{monthly_expenses - monthly_income:.2f} more than your income this month.',
+            'suggestion': 'Reduce discretionary spending and focus on essential expenses only.'
+        })
+
+    if savings_rate >= 20:
+        recommendations.append({
+            'type': 'investment',
+            'title': 'Investment Opportunity',
+            'message': f'Great job! You\'re saving {savings_rate:.1f}% of your income.',
+            'suggestion': 'Consider investing in SIP mutual funds or PPF for long-term wealth building.'
+        })
+
+    # Find highest spending category
+    if expense_categories:
+        highest_category = max(expense_categories, key=expense_categories.get)
+        highest_amount = expense_categories[highest_category]
+
+        if highest_amount > monthly_income * 0.3:
+            recommendations.append({
+                'type': 'category_alert',
+                'title': f'High {highest_category} Spending',
+                'message': f'You\'re spending ₹{highest_amount:.2f} on {highest_category} this month.',
+                'suggestion': f'Consider reducing {highest_category} expenses by 10-15%.'
+            })
+
+    if trends:
+        recommendations.extend(trend_recommendations(trends))
+
+    payload = {
+        'monthly_income': monthly_income,
+        'monthly_expenses': monthly_expenses,
+        'monthly_savings': monthly_savings,
+        'savings_rate': savings_rate,
+        'recommendations': recommendations,
+        'expense_categories': expense_categories
+    }
+    if trends is not None:
+        payload['trends'] = trends
+    return payload
+
+
+def trend_recommendations(trends):
+    """Recommendations from spending anomalies, rising categories and recurring payments"""
+    recommendations = []
+
+    for anomaly in trends['anomalies']:
+        recommendations.append({
+            'type': 'anomaly',
+            'title': f"Unusual {anomaly['category']} Spending",
+            'message': f"You've spent ₹{anomaly['amount']:.2f} on {anomaly['category']} this month, "
+                       f"against a typical ₹{anomaly['baseline']:.2f}.",
+            'suggestion': 'Check for one-off purchases or charges you did not expect.'
+        })
+
+    for trend in trends['rising']:
+        recommendations.append({
+            'type': 'trend',
+            'title': f"{trend['category']} Costs Are Rising",
+            'message': f"Your 3-month average for {trend['category']} is ₹{trend['baseline_3m']:.2f}, "
+                       f"up {trend['change_pct']:.0f}% on your 12-month average.",
+            'suggestion': f"Set a monthly budget for {trend['category']} and track it."
+        })
+
+    recurring = trends['recurring']
+    if recurring:
+        monthly_total = sum(payment['amount'] for payment in recurring)
+        recommendations.append({
+            'type': 'recurring',
+            'title': 'Recurring Payments',
+            'message': f'{len(recurring)} recurring payments add up to ₹{monthly_total:.2f} a month.',
+            'suggestion': 'Review subscriptions and regular bills, and cancel the ones you no longer use.'
+        })
+
+    return recommendations
@@ -1,54 +1,250 @@
-from flask import Flask, request, jsonify, session
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify
 from flask_cors import CORS
-from pymongo import MongoClient
-from werkzeug.security import generate_password_hash, check_password_hash
+from pymongo.errors import DuplicateKeyError
+from werkzeug.local import LocalProxy
 from werkzeug.utils import secure_filename
 from bson.objectid import ObjectId
 from datetime import datetime, timedelta
 import os
-import jwt
-import PyPDF2
-import pytesseract
-from PIL import Image
 import io
-import re
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['UPLOAD_FOLDER'] = 'uploads'
-CORS(app, supports_credentials=True)
-
-# MongoDB connection
-client = MongoClient('mongodb://localhost:27017/')
-db = client['finwise_db']
-users_collection = db['users']
-income_collection = db['income']
-expense_collection = db['expenses']
-admins_collection = db['admins']
-
-# Ensure upload directory exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-# Helper function to generate JWT token
-def generate_token(user_id):
-    payload = {
-        'user_id': str(user_id),
-        'exp': datetime.utcnow() + timedelta(days=1)
+import shutil
+import uuid
+
+import click
+
+from admin_users import directory_page, parse_directory_args, search_fields
+from analytics import build_recommendations
+from auth import Auth, admin_required, generate_token, login_required
+from compression import compress_response, compression_stats
+from config import Config, config
+from dashboard import dashboard_summary, parse_recent
+from etags import active_users, bump_version, conditional, conditional_stats, current_month
+from database import Database
+from indexes import ensure_indexes
+from json_provider import OrjsonProvider, dumps
+from ingest import build_expense_doc, build_income_doc, ingest_rows, iter_rows
+from jobs import QueueFull, ReceiptJobQueue
+import metrics
+import precompute
+from passwords import HasherBusy, PasswordHasher, default_workers
+from receipt_cache import ReceiptCache, content_digest
+from receipt_parser import PARSER_VERSION, with_default_date
+from result_cache import make_result_cache
+from user_deletion import UserDeleter, public_job
+from receipts import process_pdf, process_receipt, receipt_kind
+import rollups
+from trends import expense_trends
+import visualization
+from pagination import (
+    EXPENSE_FIELDS, INCOME_FIELDS, NDJSON_MIMETYPE, build_list_query, fetch_page, listing_payload,
+    parse_list_args, serialize_record, stream_ndjson
+)
+
+# Routes live on a blueprint so create_app() can build any number of apps
+api = Blueprint('api', __name__)
+
+# Services are built per app by create_app() from that app's config, and
+# reached through these proxies while handling a request
+def service(name):
+    return current_app.extensions['finwise'][name]
+
+# MongoDB connection, opened lazily in each process on first use
+mongo = LocalProxy(lambda: current_app.extensions['finwise_db'])
+db = LocalProxy(lambda: mongo.db)
+users_collection = LocalProxy(lambda: db['users'])
+income_collection = LocalProxy(lambda: db['income'])
+expense_collection = LocalProxy(lambda: db['expenses'])
+admins_collection = LocalProxy(lambda: db['admins'])
+
+receipt_jobs = LocalProxy(lambda: service('receipt_jobs'))
+receipt_cache = LocalProxy(lambda: service('receipt_cache'))
+result_cache = LocalProxy(lambda: service('result_cache'))
+user_deleter = LocalProxy(lambda: service('user_deleter'))
+password_hasher = LocalProxy(lambda: service('password_hasher'))
+
+metrics.register('receipt_cache', lambda: receipt_cache.stats())
+metrics.register('conditional_get', conditional_stats)
+metrics.register('compression', compression_stats)
+metrics.register('result_cache', lambda: result_cache.stats())
+metrics.register('precomputed', precompute.precompute_stats)
+
+
+def init_services(app):
+    """Build the app's database handle and services from app.config"""
+    settings = app.config
+    database = Database(app)
+    # Background threads have no app context, so they get handles bound to this app
+    app_db = LocalProxy(lambda: database.db)
+
+    # Decode bearer tokens once per request; tokens issued before role claims
+    # existed fall back to a single admins lookup
+    Auth(
+        app,
+        cache_size=settings['AUTH_CACHE_SIZE'],
+        cache_ttl=settings['AUTH_CACHE_TTL'],
+        role_resolver=lambda user_id: 'admin' if admins_collection.find_one(
+            {'_id': ObjectId(user_id)}, {'_id': 1}) else 'user'
+    )
+
+    # Encoded recommendation and visualization payloads per user and data version
+    results = make_result_cache(settings)
+
+    app.extensions['finwise'] = {
+        # Receipt OCR runs on a process pool, job state lives in MongoDB
+        'receipt_jobs': ReceiptJobQueue(
+            database.collection('receipt_jobs'),
+            workers=settings['OCR_WORKERS'],
+            max_depth=settings['OCR_QUEUE_DEPTH'],
+            timeout=settings['OCR_JOB_TIMEOUT'],
+            result_ttl=settings['OCR_RESULT_TTL']
+        ),
+        # Parsed receipts keyed by the SHA-256 of the uploaded bytes
+        'receipt_cache': ReceiptCache(
+            database.collection('receipt_cache'),
+            max_entries=settings['RECEIPT_CACHE_SIZE'],
+            ttl=settings['RECEIPT_CACHE_TTL'],
+            version=PARSER_VERSION
+        ),
+        'result_cache': results,
+        # Admin user removal runs in batches on a background thread
+        'user_deleter': UserDeleter(
+            app_db,
+            batch_size=settings['USER_DELETE_BATCH_SIZE'],
+            pause=settings['USER_DELETE_PAUSE_MS'] / 1000,
+            workers=settings['USER_DELETE_WORKERS'],
+            stale_after=settings['USER_DELETE_STALE_AFTER'],
+            result_ttl=settings['USER_DELETE_RESULT_TTL'],
+            on_deleted=results.invalidate_user
+        ),
+        # Password hashing runs on its own bounded pool so a burst of logins
+        # cannot take every core away from the read endpoints
+        'password_hasher': PasswordHasher(
+            method=settings['PASSWORD_HASH_METHOD'],
+            workers=settings['PASSWORD_HASH_WORKERS'] or default_workers(settings['SERVER_WORKERS']),
+            queue_limit=settings['PASSWORD_HASH_QUEUE'],
+            timeout=settings['PASSWORD_HASH_TIMEOUT']
+        )
     }
-    return jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
 
-# Helper function to verify JWT token
-def verify_token(token):
+
+def create_app(config_name=None):
+    """Build the Flask app for a config name from config.py, FINWISE_CONFIG by default"""
+    app = Flask(__name__)
+    app.config.from_object(config[config_name or os.environ.get('FINWISE_CONFIG', 'default')])
+    app.json = OrjsonProvider(app)
+    CORS(app, supports_credentials=True)
+
+    init_services(app)
+    app.register_blueprint(api)
+    app.after_request(compress_response)
+
+    @app.cli.command('warm-cache')
+    @click.option('--days', default=Config.RESULT_CACHE_WARM_DAYS, help='Users who signed in within this many days')
+    @click.option('--limit', default=Config.RESULT_CACHE_WARM_USERS, help='Most users to warm')
+    def warm_cache_command(days, limit):
+        """Precompute cached payloads for recently active users"""
+        print(f'Warmed {warm_result_cache(days, limit)} users')
+
+    @app.cli.command('ensure-indexes')
+    def ensure_indexes_command():
+        """Create any missing MongoDB indexes"""
+        for collection_name, names in ensure_indexes(app.extensions['finwise_db'].db).items():
+            print(f"{collection_name}: {', '.join(names)}")
+
+    # Registration relies on the unique email index, so indexes exist before the first request
+    ensure_indexes(app.extensions['finwise_db'].db)
+    # Receipt jobs orphaned by a previous run would otherwise stay pending until their TTL
+    app.extensions['finwise']['receipt_jobs'].fail_stale()
+
+    # Ensure upload directory exists
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    return app
+
+# Helper functions computing the cached payloads; params are the parsed
+# query string, None for the default payload
+def recommendations_payload(user_id, params=None):
+    rollups.ensure_user_rollups(db, user_id)
+    return build_recommendations(rollups.recommendation_totals(db, user_id), expense_trends(db, user_id))
+
+def visualization_payload(user_id, params=None):
+    rollups.ensure_user_rollups(db, user_id)
+    # Defaults to monthly and category totals for the last 6 months
+    return visualization.chart_data(db, user_id, params)
+
+# name: (compute(user_id, params), period the payload covers(params))
+CACHED_PAYLOADS = {
+    'recommendations': (recommendations_payload, lambda params=None: current_month()),
+    'visualization': (visualization_payload, visualization.period_key)
+}
+
+# Helper function to serve a payload from the result cache, then from the
+# nightly batch (see precompute.py), computing it live only when both miss
+def cached_payload(name, user_id, version=None, params=None):
+    compute, period = CACHED_PAYLOADS[name]
+    if version is None:
+        # conditional() has already read the version for this request
+        version = g.data_version
+    covers = period(params)
+
+    def load_or_compute():
+        stored = precompute.load_payload(db, user_id, name, version, covers, current_app.config['PRECOMPUTE_MAX_AGE'])
+        return stored if stored is not None else dumps(compute(user_id, params), sort_keys=True)
+
+    return result_cache.fetch(user_id, version, name, covers, load_or_compute)
+
+# Helper function to precompute cached payloads for recently active users
+def warm_result_cache(days=None, limit=None):
+    days = current_app.config['RESULT_CACHE_WARM_DAYS'] if days is None else days
+    limit = current_app.config['RESULT_CACHE_WARM_USERS'] if limit is None else limit
+    warmed = 0
+    for user_id, version in active_users(db, datetime.utcnow() - timedelta(days=days), limit):
+        for name in CACHED_PAYLOADS:
+            cached_payload(name, user_id, version)
+        warmed += 1
+    return warmed
+
+# Helper function to invalidate everything cached for a user after a write
+def data_changed(user_id):
+    bump_version(db, user_id)
+    result_cache.invalidate_user(user_id)
+
+# Helper function to check a password and upgrade its hash to the configured method
+def check_credentials(collection, doc, field, password):
+    if not doc or not password_hasher.verify(doc[field], password):
+        return False
+    if password_hasher.needs_rehash(doc[field]):
+        collection.update_one(
+            {'_id': doc['_id'], field: doc[field]},
+            {'$set': {field: password_hasher.hash(password)}}
+        )
+    return True
+
+# Helper function to list a user's transactions with optional keyset pagination
+def list_transactions(collection, key, user_id, allowed_fields, category_field):
     try:
-        payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        return payload['user_id']
-    except jwt.ExpiredSignatureError:
-        return None
-    except jwt.InvalidTokenError:
-        return None
+        params = parse_list_args(request.args, allowed_fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query, sort, projection = build_list_query(user_id, params, category_field)
+
+    # NDJSON streams straight off the cursor so memory stays flat
+    if params['stream'] or (params['format'] is None and request.accept_mimetypes.best == NDJSON_MIMETYPE):
+        cursor = collection.find(query, projection).sort(sort)
+        if params['limit']:
+            cursor = cursor.limit(params['limit'])
+        return Response(stream_ndjson(cursor), mimetype=NDJSON_MIMETYPE)
+
+    # Without a limit or cursor keep returning the full list
+    if params['limit'] is None:
+        records = [serialize_record(r) for r in collection.find(query, projection).sort(sort)]
+        return jsonify(listing_payload(key, records, params)), 200
+
+    records, next_cursor, prev_cursor = fetch_page(collection, query, sort, projection, params)
+    return jsonify(listing_payload(key, records, params, (next_cursor, prev_cursor))), 200
 
 # User Registration
-@app.route('/api/register', methods=['POST'])
+@api.route('/api/register', methods=['POST'])
 def register():
     try:
         data = request.get_json()
@@ -58,7 +254,7 @@ def register():
             return jsonify({'error': 'User already exists'}), 400
         
         # Hash password
-        hashed_password = generate_password_hash(data['password'])
+        hashed_password = password_hasher.hash(data['password'])
         
         # Create user document
         user_doc = {
@@ -69,11 +265,17 @@ def register():
             'dateOfBirth': data['dateOfBirth'],
             'gender': data['gender'],
             'password': hashed_password,
-            'createdAt': datetime.utcnow()
+            'createdAt': datetime.utcnow(),
+            'lastLoginAt': datetime.utcnow(),
+            # Lower-cased copies for the admin directory search
+            **search_fields(data)
         }
         
-        # Insert user
-        result = users_collection.insert_one(user_doc)
+        # Insert user (the unique email index catches concurrent registrations)
+        try:
+            result = users_collection.insert_one(user_doc)
+        except DuplicateKeyError:
+            return jsonify({'error': 'User already exists'}), 400
         
         # Generate token
         token = generate_token(result.inserted_id)
@@ -89,11 +291,14 @@ def register():
             }
         }), 201
         
+    except HasherBusy:
+        return jsonify({'error': 'Too many sign-in attempts are being processed, try again shortly'}), 503, \
+            {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # User Login
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def login():
     try:
         data = request.get_json()
@@ -101,9 +306,15 @@ def login():
         # Find user
         user = users_collection.find_one({'email': data['email']})
         
-        if not user or not check_password_hash(user['password'], data['password']):
+        if not check_credentials(users_collection, user, 'password', data['password']):
             return jsonify({'error': 'Invalid credentials'}), 401
         
+        if 'deletingAt' in user:
+            return jsonify({'error': 'This account is being deleted'}), 403
+        
+        # Record the sign-in; the nightly batch and cache warming pick users by it
+        users_collection.update_one({'_id': user['_id']}, {'$set': {'lastLoginAt': datetime.utcnow()}})
+        
         # Generate token
         token = generate_token(user['_id'])
         
@@ -118,18 +329,18 @@ def login():
             }
         }), 200
         
+    except HasherBusy:
+        return jsonify({'error': 'Too many sign-in attempts are being processed, try again shortly'}), 503, \
+            {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Get User Profile
-@app.route('/api/profile', methods=['GET'])
+@api.route('/api/profile', methods=['GET'])
+@login_required
 def get_profile():
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid token'}), 401
+        user_id = g.user_id
         
         user = users_collection.find_one({'_id': ObjectId(user_id)})
         if not user:
@@ -150,29 +361,39 @@ def get_profile():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Helper function to run a bulk import and pick the response status
+def bulk_import(collection, kind, user_id):
+    result = ingest_rows(db, collection, kind, user_id, iter_rows(request))
+    
+    # Rows inserted before an unreadable part of the body stay inserted
+    if result['inserted']:
+        data_changed(user_id)
+    if 'error' in result:
+        status = 400
+    elif result['failed'] == 0:
+        status = 201
+    elif result['inserted'] > 0:
+        status = 207
+    else:
+        status = 400
+    return jsonify(result), status
+
 # Add Income
-@app.route('/api/income', methods=['POST'])
+@api.route('/api/income', methods=['POST'])
+@login_required
 def add_income():
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid token'}), 401
+        user_id = g.user_id
         
         data = request.get_json()
         
-        income_doc = {
-            'userId': ObjectId(user_id),
-            'source': data['source'],
-            'amount': float(data['amount']),
-            'frequency': data['frequency'],  # monthly, yearly, one-time
-            'date': datetime.strptime(data['date'], '%Y-%m-%d'),
-            'description': data.get('description', ''),
-            'createdAt': datetime.utcnow()
-        }
+        try:
+            income_doc = build_income_doc(user_id, data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        result = income_collection.insert_one(income_doc)
+        result = rollups.insert_transaction(db, 'income', income_doc)
+        data_changed(user_id)
         
         return jsonify({
             'message': 'Income added successfully',
@@ -182,52 +403,47 @@ def add_income():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Get Income
-@app.route('/api/income', methods=['GET'])
-def get_income():
+# Bulk Add Income
+@api.route('/api/income/bulk', methods=['POST'])
+@login_required
+def add_income_bulk():
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid token'}), 401
+        user_id = g.user_id
         
-        income_records = list(income_collection.find({'userId': ObjectId(user_id)}))
+        return bulk_import(income_collection, 'income', user_id)
         
-        for record in income_records:
-            record['_id'] = str(record['_id'])
-            record['userId'] = str(record['userId'])
-            record['date'] = record['date'].strftime('%Y-%m-%d')
-            record['createdAt'] = record['createdAt'].isoformat()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Get Income
+@api.route('/api/income', methods=['GET'])
+@login_required
+@conditional(db)
+def get_income():
+    try:
+        user_id = g.user_id
         
-        return jsonify({'income': income_records}), 200
+        return list_transactions(income_collection, 'income', user_id, INCOME_FIELDS, 'source')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Add Expense
-@app.route('/api/expense', methods=['POST'])
+@api.route('/api/expense', methods=['POST'])
+@login_required
 def add_expense():
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid token'}), 401
+        user_id = g.user_id
         
         data = request.get_json()
         
-        expense_doc = {
-            'userId': ObjectId(user_id),
-            'category': data['category'],
-            'amount': float(data['amount']),
-            'date': datetime.strptime(data['date'], '%Y-%m-%d'),
-            'description': data.get('description', ''),
-            'merchant': data.get('merchant', ''),
-            'createdAt': datetime.utcnow()
-        }
+        try:
+            expense_doc = build_expense_doc(user_id, data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        result = expense_collection.insert_one(expense_doc)
+        result = rollups.insert_transaction(db, 'expense', expense_doc)
+        data_changed(user_id)
         
         return jsonify({
             'message': 'Expense added successfully',
@@ -237,83 +453,52 @@ def add_expense():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Get Expenses
-@app.route('/api/expense', methods=['GET'])
-def get_expenses():
+# Bulk Add Expenses
+@api.route('/api/expense/bulk', methods=['POST'])
+@login_required
+def add_expense_bulk():
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid token'}), 401
+        user_id = g.user_id
         
-        expense_records = list(expense_collection.find({'userId': ObjectId(user_id)}))
-        
-        for record in expense_records:
-            record['_id'] = str(record['_id'])
-            record['userId'] = str(record['userId'])
-            record['date'] = record['date'].strftime('%Y-%m-%d')
-            record['createdAt'] = record['createdAt'].isoformat()
-        
-        return jsonify({'expenses': expense_records}), 200
+        return bulk_import(expense_collection, 'expense', user_id)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Extract text from PDF
-def extract_text_from_pdf(file_path):
-    try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-        return text
-    except Exception as e:
-        return str(e)
-
-# Extract text from image using OCR
-def extract_text_from_image(file_path):
+# Get Expenses
+@api.route('/api/expense', methods=['GET'])
+@login_required
+@conditional(db)
+def get_expenses():
     try:
-        image = Image.open(file_path)
-        text = pytesseract.image_to_string(image)
-        return text
+        user_id = g.user_id
+        
+        return list_transactions(expense_collection, 'expenses', user_id, EXPENSE_FIELDS, 'category')
+        
     except Exception as e:
-        return str(e)
+        return jsonify({'error': str(e)}), 500
 
-# Parse expense data from extracted text
-def parse_expense_data(text):
-    # Simple regex patterns to extract common expense information
-    amount_pattern = r'₹?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)'
-    date_pattern = r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'
+# Helper function to hand an upload to the OCR workers without touching disk
+def receipt_source(stream, filename):
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
     
-    amounts = re.findall(amount_pattern, text)
-    dates = re.findall(date_pattern, text)
+    if size <= current_app.config['RECEIPT_SPOOL_THRESHOLD']:
+        return stream.read()
     
-    # Get the largest amount (likely the total)
-    if amounts:
-        amount = max([float(amt.replace(',', '')) for amt in amounts])
-    else:
-        amount = 0
-    
-    # Get the first date found
-    expense_date = dates[0] if dates else datetime.now().strftime('%d/%m/%Y')
-    
-    return {
-        'amount': amount,
-        'date': expense_date,
-        'raw_text': text
-    }
+    # Large uploads are spooled under a unique name; the worker removes the file
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f'{uuid.uuid4().hex}_{filename}')
+    with open(file_path, 'wb') as spooled:
+        shutil.copyfileobj(stream, spooled)
+    return file_path
 
 # Upload Receipt
-@app.route('/api/upload-receipt', methods=['POST'])
+@api.route('/api/upload-receipt', methods=['POST'])
+@login_required
 def upload_receipt():
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid token'}), 401
+        user_id = g.user_id
         
         if 'file' not in request.files:
             return jsonify({'error': 'No file uploaded'}), 400
@@ -322,178 +507,136 @@ def upload_receipt():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        if file:
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
-            
-            # Extract text based on file type
-            if filename.lower().endswith('.pdf'):
-                extracted_text = extract_text_from_pdf(file_path)
-            elif filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                extracted_text = extract_text_from_image(file_path)
-            else:
-                return jsonify({'error': 'Unsupported file format'}), 400
-            
-            # Parse expense data
-            expense_data = parse_expense_data(extracted_text)
-            
-            # Clean up uploaded file
-            os.remove(file_path)
-            
+        filename = secure_filename(file.filename)
+        kind = receipt_kind(filename)
+        if not kind:
+            return jsonify({'error': 'Unsupported file format'}), 400
+        
+        # Identical uploads skip OCR entirely
+        digest = content_digest(file.stream)
+        cached = receipt_cache.get(digest)
+        if cached is not None:
             return jsonify({
                 'message': 'Receipt processed successfully',
-                'data': expense_data
+                'status': 'done',
+                'cached': True,
+                'data': with_default_date(cached)
             }), 200
         
+        # Refuse early instead of saving a file we cannot process
+        if receipt_jobs.depth >= receipt_jobs.max_depth:
+            return jsonify({'error': 'Too many receipts are being processed, try again shortly'}), 429, \
+                {'Retry-After': '5'}
+        
+        source = receipt_source(file.stream, filename)
+        
+        try:
+            # Runs on a coordinator thread, outside the app context
+            cache = receipt_cache._get_current_object()
+            on_done = lambda result: cache.set(digest, result)
+            if kind == 'pdf':
+                job_id = receipt_jobs.submit_task(user_id, process_pdf, source, current_app.config['PDF_PAGE_CHUNK'],
+                                                  current_app.config['PDF_MAX_PAGES'],
+                                                  current_app.config['UPLOAD_FOLDER'], on_done=on_done)
+            else:
+                job_id = receipt_jobs.submit(user_id, process_receipt, source, on_done=on_done)
+        except QueueFull:
+            if isinstance(source, str):
+                os.remove(source)
+            return jsonify({'error': 'Too many receipts are being processed, try again shortly'}), 429, \
+                {'Retry-After': '5'}
+        
+        return jsonify({
+            'message': 'Receipt queued for processing',
+            'job_id': job_id,
+            'status': 'queued'
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Get Receipt Processing Status
+@api.route('/api/receipts/<job_id>', methods=['GET'])
+@login_required
+def get_receipt_job(job_id):
+    try:
+        user_id = g.user_id
+        
+        # Optional long poll, capped so a request thread is never held for long
+        wait = min(request.args.get('wait', 0, type=float), 30)
+        job = receipt_jobs.get(job_id, user_id, wait=wait)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        response = {'job_id': job_id, 'status': job['status']}
+        # Multi-page PDFs publish line items page by page while they run
+        if 'pagesDone' in job:
+            response['pages_done'] = job['pagesDone']
+            response['pages'] = job['pages']
+            response['items'] = job.get('items', [])
+        if job['status'] == 'done':
+            response['message'] = 'Receipt processed successfully'
+            response['data'] = with_default_date(job['result'])
+        elif job['status'] == 'failed':
+            response['error'] = job['error']
+        
+        return jsonify(response), 200
+        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Get Recommendations
-@app.route('/api/recommendations', methods=['GET'])
+@api.route('/api/recommendations', methods=['GET'])
+@login_required
+@conditional(db, period=current_month)
 def get_recommendations():
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid token'}), 401
-        
-        # Get user's income and expenses
-        user_income = list(income_collection.find({'userId': ObjectId(user_id)}))
-        user_expenses = list(expense_collection.find({'userId': ObjectId(user_id)}))
-        
-        # Calculate monthly income
-        monthly_income = sum([inc['amount'] for inc in user_income if inc['frequency'] == 'monthly'])
-        yearly_income = sum([inc['amount'] for inc in user_income if inc['frequency'] == 'yearly'])
-        monthly_income += yearly_income / 12
-        
-        # Calculate monthly expenses
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        monthly_expenses = sum([
-            exp['amount'] for exp in user_expenses 
-            if exp['date'].month == current_month and exp['date'].year == current_year
-        ])
-        
-        # Calculate savings
-        monthly_savings = monthly_income - monthly_expenses
-        savings_rate = (monthly_savings / monthly_income * 100) if monthly_income > 0 else 0
-        
-        # Generate recommendations
-        recommendations = []
-        
-        if savings_rate < 20:
-            recommendations.append({
-                'type': 'warning',
-                'title': 'Low Savings Rate',
-                'message': f'Your current savings rate is {savings_rate:.1f}%. Aim for at least 20% of your income.',
-                'suggestion': 'Review your expenses and identify areas where you can cut back.'
-            })
-        
-        if monthly_expenses > monthly_income:
-            recommendations.append({
-                'type': 'alert',
-                'title': 'Overspending Alert',
-                'message': f'You are spending ₹{monthly_expenses - monthly_income:.2f} more than your income this month.',
-                'suggestion': 'Reduce discretionary spending and focus on essential expenses only.'
-            })
-        
-        if savings_rate >= 20:
-            recommendations.append({
-                'type': 'investment',
-                'title': 'Investment Opportunity',
-                'message': f'Great job! You\'re saving {savings_rate:.1f}% of your income.',
-                'suggestion': 'Consider investing in SIP mutual funds or PPF for long-term wealth building.'
-            })
-        
-        # Category-wise expense analysis
-        expense_categories = {}
-        for expense in user_expenses:
-            if expense['date'].month == current_month and expense['date'].year == current_year:
-                category = expense['category']
-                expense_categories[category] = expense_categories.get(category, 0) + expense['amount']
-        
-        # Find highest spending category
-        if expense_categories:
-            highest_category = max(expense_categories, key=expense_categories.get)
-            highest_amount = expense_categories[highest_category]
-            
-            if highest_amount > monthly_income * 0.3:
-                recommendations.append({
-                    'type': 'category_alert',
-                    'title': f'High {highest_category} Spending',
-                    'message': f'You\'re spending ₹{highest_amount:.2f} on {highest_category} this month.',
-                    'suggestion': f'Consider reducing {highest_category} expenses by 10-15%.'
-                })
+        user_id = g.user_id
         
-        return jsonify({
-            'monthly_income': monthly_income,
-            'monthly_expenses': monthly_expenses,
-            'monthly_savings': monthly_savings,
-            'savings_rate': savings_rate,
-            'recommendations': recommendations,
-            'expense_categories': expense_categories
-        }), 200
+        return Response(cached_payload('recommendations', user_id), mimetype='application/json'), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Get Dashboard Summary
+@api.route('/api/dashboard/summary', methods=['GET'])
+@login_required
+@conditional(db)
+def get_dashboard_summary():
+    try:
+        user_id = g.user_id
+        
+        try:
+            recent = parse_recent(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        rollups.ensure_user_rollups(db, user_id)
+        return jsonify(dashboard_summary(db, user_id, recent)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Get Visualization Data
-@app.route('/api/visualization', methods=['GET'])
+@api.route('/api/visualization', methods=['GET'])
+@login_required
+@conditional(db, period=lambda: visualization.request_period(
+    request.args, **visualization.chart_limits(current_app.config)))
 def get_visualization_data():
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid token'}), 401
-        
-        # Get expenses for the last 6 months
-        six_months_ago = datetime.now() - timedelta(days=180)
-        user_expenses = list(expense_collection.find({
-            'userId': ObjectId(user_id),
-            'date': {'$gte': six_months_ago}
-        }))
-        
-        # Monthly expense data
-        monthly_data = {}
-        category_data = {}
-        
-        for expense in user_expenses:
-            month_key = expense['date'].strftime('%Y-%m')
-            category = expense['category']
-            amount = expense['amount']
-            
-            # Monthly totals
-            monthly_data[month_key] = monthly_data.get(month_key, 0) + amount
-            
-            # Category totals
-            category_data[category] = category_data.get(category, 0) + amount
-        
-        # Format data for charts
-        months = sorted(monthly_data.keys())
-        monthly_amounts = [monthly_data[month] for month in months]
-        
-        categories = list(category_data.keys())
-        category_amounts = list(category_data.values())
+        user_id = g.user_id
+        try:
+            params = visualization.parse_chart_args(request.args, **visualization.chart_limits(current_app.config))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
-            'monthly_chart': {
-                'labels': months,
-                'data': monthly_amounts
-            },
-            'category_chart': {
-                'labels': categories,
-                'data': category_amounts
-            }
-        }), 200
+        return Response(cached_payload('visualization', user_id, params=params), mimetype='application/json'), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Admin Registration
-@app.route('/api/admin/register', methods=['POST'])
+@api.route('/api/admin/register', methods=['POST'])
 def admin_register():
     try:
         data = request.get_json()
@@ -503,7 +646,7 @@ def admin_register():
             return jsonify({'error': 'Admin already exists'}), 400
         
         # Hash password
-        hashed_password = generate_password_hash(data['adminPassword'])
+        hashed_password = password_hasher.hash(data['adminPassword'])
         
         # Create admin document
         admin_doc = {
@@ -513,10 +656,13 @@ def admin_register():
         }
         
         # Insert admin
-        result = admins_collection.insert_one(admin_doc)
+        try:
+            result = admins_collection.insert_one(admin_doc)
+        except DuplicateKeyError:
+            return jsonify({'error': 'Admin already exists'}), 400
         
         # Generate token
-        token = generate_token(result.inserted_id)
+        token = generate_token(result.inserted_id, role='admin')
         
         return jsonify({
             'message': 'Admin registered successfully',
@@ -527,11 +673,14 @@ def admin_register():
             }
         }), 201
         
+    except HasherBusy:
+        return jsonify({'error': 'Too many sign-in attempts are being processed, try again shortly'}), 503, \
+            {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Admin Login
-@app.route('/api/admin/login', methods=['POST'])
+@api.route('/api/admin/login', methods=['POST'])
 def admin_login():
     try:
         data = request.get_json()
@@ -539,11 +688,11 @@ def admin_login():
         # Find admin
         admin = admins_collection.find_one({'adminName': data['adminName']})
         
-        if not admin or not check_password_hash(admin['adminPassword'], data['adminPassword']):
+        if not check_credentials(admins_collection, admin, 'adminPassword', data['adminPassword']):
             return jsonify({'error': 'Invalid credentials'}), 401
         
         # Generate token
-        token = generate_token(admin['_id'])
+        token = generate_token(admin['_id'], role='admin')
         
         return jsonify({
             'message': 'Admin login successful',
@@ -554,47 +703,33 @@ def admin_login():
             }
         }), 200
         
+    except HasherBusy:
+        return jsonify({'error': 'Too many sign-in attempts are being processed, try again shortly'}), 503, \
+            {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Get All Users (Admin only)
-@app.route('/api/admin/users', methods=['GET'])
+# Get Users, a page at a time with optional search (Admin only)
+@api.route('/api/admin/users', methods=['GET'])
+@admin_required
 def get_all_users():
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        admin_id = verify_token(token)
+        try:
+            params = parse_directory_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if not admin_id:
-            return jsonify({'error': 'Invalid token'}), 401
-        
-        # Check if user is admin
-        admin = admins_collection.find_one({'_id': ObjectId(admin_id)})
-        if not admin:
-            return jsonify({'error': 'Admin access required'}), 403
-        
-        # Get all users
-        users = list(users_collection.find({}, {'password': 0}))
-        
-        for user in users:
-            user['_id'] = str(user['_id'])
-            user['createdAt'] = user['createdAt'].isoformat()
-        
-        return jsonify({'users': users}), 200
+        return jsonify(directory_page(db, params)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Get Admin Profile
-@app.route('/api/admin/profile', methods=['GET'])
+@api.route('/api/admin/profile', methods=['GET'])
+@admin_required
 def get_admin_profile():
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        admin_id = verify_token(token)
-        
-        if not admin_id:
-            return jsonify({'error': 'Invalid token'}), 401
-        
-        admin = admins_collection.find_one({'_id': ObjectId(admin_id)})
+        admin = admins_collection.find_one({'_id': ObjectId(g.user_id)})
         if not admin:
             return jsonify({'error': 'Admin not found'}), 404
         
@@ -608,37 +743,51 @@ def get_admin_profile():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Delete User (Admin only)
-@app.route('/api/admin/users/<user_id>', methods=['DELETE'])
-def delete_user(user_id):
+# Get Server Metrics (Admin only)
+@api.route('/api/admin/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        admin_id = verify_token(token)
+        return jsonify(metrics.snapshot()), 200
         
-        if not admin_id:
-            return jsonify({'error': 'Invalid token'}), 401
-        
-        # Check if user is admin
-        admin = admins_collection.find_one({'_id': ObjectId(admin_id)})
-        if not admin:
-            return jsonify({'error': 'Admin access required'}), 403
-        
-        # Delete user and all related data
-        user_object_id = ObjectId(user_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Delete User and all related data in the background (Admin only)
+@api.route('/api/admin/users/<user_id>', methods=['DELETE'])
+@admin_required
+def delete_user(user_id):
+    try:
+        if not ObjectId.is_valid(user_id):
+            return jsonify({'error': 'User not found'}), 404
         
-        # Delete user
-        users_collection.delete_one({'_id': user_object_id})
+        job = user_deleter.start(user_id)
+        if not job:
+            return jsonify({'error': 'User not found'}), 404
         
-        # Delete user's income records
-        income_collection.delete_many({'userId': user_object_id})
+        return jsonify({
+            'message': 'User deletion started',
+            'deletion': public_job(job)
+        }), 202, {'Location': f'/api/admin/users/{user_id}/deletion'}
         
-        # Delete user's expense records
-        expense_collection.delete_many({'userId': user_object_id})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Get User Deletion Progress (Admin only)
+@api.route('/api/admin/users/<user_id>/deletion', methods=['GET'])
+@admin_required
+def get_user_deletion(user_id):
+    try:
+        job = user_deleter.get(user_id) if ObjectId.is_valid(user_id) else None
+        if not job:
+            return jsonify({'error': 'Deletion not found'}), 404
         
-        return jsonify({'message': 'User deleted successfully'}), 200
+        return jsonify({'deletion': public_job(job)}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# `flask --app app` finds create_app() by itself
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    app = create_app()
+    app.run(debug=app.config['DEBUG'], port=5000)
@@ -0,0 +1,374 @@
+"""
+Async serving mode for the read-heavy routes.
+
+GET /api/profile, /api/income, /api/expense, /api/recommendations,
+/api/visualization and /api/dashboard/summary are served by a Starlette
+app on Motor, so a request waiting on MongoDB holds no worker thread and
+many requests overlap on one event loop per worker. Responses match app.py, and query building,
+pagination and the rollup folding are shared with it. Every other path
+(login, writes, uploads, the admin routes) falls through to the sync app,
+mounted in the same worker, whose result cache the async reads share.
+
+    python run_backend.py --mode async
+
+Quart was the obvious fit, but no Quart release works with the Flask 2.3
+that the sync app is pinned to, so this uses Starlette.
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from functools import wraps
+
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse as StarletteJSONResponse
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import dashboard
+import etags
+import metrics
+import precompute
+import rollups
+import trends
+import visualization
+from analytics import build_recommendations
+from app import create_app
+from auth import Auth
+from compression import COMPRESSIBLE_MIMETYPES, best_encoding, timed_compress
+from config import config
+from database import DEFAULT_DATABASE, client_options
+from json_provider import dumps
+from pagination import (
+    EXPENSE_FIELDS, INCOME_FIELDS, NDJSON_MIMETYPE, STREAM_BATCH_SIZE, build_list_query,
+    listing_payload, page_from_records, parse_list_args, serialize_record
+)
+
+
+class JSONResponse(StarletteJSONResponse):
+    """Encode with json_provider, same as the sync app"""
+
+    def render(self, content):
+        return dumps(content, sort_keys=True)
+
+
+def login_required(view):
+    """Decode the bearer token onto request.state, or reject with 401"""
+    @wraps(view)
+    async def wrapper(request):
+        settings = request.app.state.settings
+        header = request.headers.get('Authorization', '')
+        claims = request.app.state.auth.decode(header.replace('Bearer ', ''), settings['SECRET_KEY']) \
+            if header else None
+        if not claims or not claims.get('user_id'):
+            return JSONResponse({'error': 'Invalid token'}, status_code=401)
+        request.state.user_id = claims['user_id']
+        return await view(request)
+    return wrapper
+
+
+def conditional(period=None):
+    """
+    Async counterpart of etags.conditional, answering If-None-Match from the data version.
+
+    period, if given, is called with the request.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request):
+            user_id = request.state.user_id
+            doc = await request.app.state.db[etags.VERSION_COLLECTION].find_one({'_id': ObjectId(user_id)})
+            full_path = f'{request.url.path}?{request.url.query}'
+            version = request.state.data_version = doc['version'] if doc else 0
+            etag = etags.make_etag(user_id, version, full_path,
+                                   request.headers.get('accept', ''), period(request) if period else '')
+
+            candidates = {tag.strip().removeprefix('W/').strip('"')
+                          for tag in request.headers.get('if-none-match', '').split(',')}
+            if etag in candidates or '*' in candidates:
+                metrics.incr('etag.not_modified')
+                return Response(status_code=304, headers={'ETag': f'"{etag}"', 'Cache-Control': etags.CACHE_CONTROL})
+
+            metrics.incr('etag.full')
+            response = await view(request)
+            if response.status_code == 200:
+                response.headers['ETag'] = f'"{etag}"'
+                response.headers['Cache-Control'] = etags.CACHE_CONTROL
+            return response
+        return wrapper
+    return decorator
+
+
+async def cached_payload(request, name, period, compute):
+    """
+    Async counterpart of app.cached_payload: the result cache, then the
+    nightly batch, then await compute() for the payload.
+
+    The cache is the mounted sync app's, so a write through it drops what
+    these routes stored. Its calls run in a thread as the Redis backend blocks.
+    """
+    results = request.app.state.result_cache
+    key = (request.state.user_id, request.state.data_version, name, period)
+    body = await run_in_threadpool(results.get, *key)
+    if body is None:
+        query, projection = precompute.stored_query(request.state.user_id, name, request.state.data_version)
+        doc = await request.app.state.db[precompute.PRECOMPUTED_COLLECTION].find_one(query, projection)
+        body = precompute.fresh_body(doc, name, period, request.app.state.settings['PRECOMPUTE_MAX_AGE'])
+        if body is None:
+            body = dumps(await compute(), sort_keys=True)
+        await run_in_threadpool(results.set, *key, body)
+    return Response(body, media_type='application/json')
+
+
+async def ensure_user_rollups(request):
+    """
+    Async counterpart of rollups.ensure_user_rollups. The check for rollup
+    rows is awaited; the rare backfill runs on the sync app's client in a thread.
+    """
+    rows = request.app.state.db[rollups.ROLLUP_COLLECTION]
+    if not await rows.find_one({'userId': ObjectId(request.state.user_id)}, {'_id': 1}):
+        await run_in_threadpool(rollups.ensure_user_rollups, request.app.state.sync_db.db, request.state.user_id)
+
+
+def wants_ndjson(request, params):
+    accept = request.headers.get('accept', '').split(',')[0].split(';')[0].strip()
+    return params['stream'] or (params['format'] is None and accept == NDJSON_MIMETYPE)
+
+
+async def ndjson_lines(cursor):
+    async for record in cursor.batch_size(STREAM_BATCH_SIZE):
+        yield dumps(serialize_record(record)) + b'\n'
+
+
+# Async counterpart of app.list_transactions
+async def list_transactions(request, collection_name, key, allowed_fields, category_field):
+    try:
+        params = parse_list_args(request.query_params, allowed_fields)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    query, sort, projection = build_list_query(request.state.user_id, params, category_field)
+    cursor = request.app.state.db[collection_name].find(query, projection).sort(sort)
+
+    if wants_ndjson(request, params):
+        if params['limit']:
+            cursor = cursor.limit(params['limit'])
+        return StreamingResponse(ndjson_lines(cursor), media_type=NDJSON_MIMETYPE)
+
+    if params['limit'] is None:
+        return JSONResponse(listing_payload(key, [serialize_record(r) async for r in cursor], params))
+
+    records = await cursor.limit(params['limit'] + 1).to_list(None)
+    records, next_cursor, prev_cursor = page_from_records(records, params)
+    return JSONResponse(listing_payload(key, records, params, (next_cursor, prev_cursor)))
+
+
+@login_required
+async def get_profile(request):
+    user = await request.app.state.db['users'].find_one({'_id': ObjectId(request.state.user_id)})
+    if not user:
+        return JSONResponse({'error': 'User not found'}, status_code=404)
+
+    return JSONResponse({
+        'user': {
+            'id': str(user['_id']),
+            'firstName': user['firstName'],
+            'lastName': user['lastName'],
+            'email': user['email'],
+            'phone': user['phone'],
+            'dateOfBirth': user['dateOfBirth'],
+            'gender': user['gender']
+        }
+    })
+
+
+@login_required
+@conditional()
+async def get_income(request):
+    return await list_transactions(request, 'income', 'income', INCOME_FIELDS, 'source')
+
+
+@login_required
+@conditional()
+async def get_expenses(request):
+    return await list_transactions(request, 'expenses', 'expenses', EXPENSE_FIELDS, 'category')
+
+
+@login_required
+@conditional(period=lambda request: etags.current_month())
+async def get_recommendations(request):
+    async def compute():
+        await ensure_user_rollups(request)
+        db = request.app.state.db
+        user_id = request.state.user_id
+        rows, history_rows, month_docs = await asyncio.gather(
+            db[rollups.ROLLUP_COLLECTION].find(*rollups.recommendation_query(user_id)).to_list(None),
+            db[rollups.ROLLUP_COLLECTION].find(*trends.history_query(user_id)).to_list(None),
+            db['expenses'].aggregate(trends.recent_expenses_pipeline(user_id)).to_list(None)
+        )
+        return build_recommendations(rollups.fold_recommendation_rows(rows), trends.analyze(history_rows, month_docs))
+
+    return await cached_payload(request, 'recommendations', etags.current_month(), compute)
+
+
+@login_required
+@conditional(period=lambda request: visualization.request_period(
+    request.query_params, **visualization.chart_limits(request.app.state.settings)))
+async def get_visualization_data(request):
+    try:
+        params = visualization.parse_chart_args(request.query_params,
+                                                **visualization.chart_limits(request.app.state.settings))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    async def compute():
+        await ensure_user_rollups(request)
+        db = request.app.state.db
+        user_id = request.state.user_id
+        if visualization.uses_rollups(params):
+            query = visualization.rollup_query(user_id, params)
+            return visualization.fold_rollup_rows(await db[rollups.ROLLUP_COLLECTION].find(*query).to_list(None),
+                                                  params)
+        rows = await db['expenses'].aggregate(visualization.bucket_pipeline(user_id, params)).to_list(None)
+        return visualization.fold_bucket_rows(rows, params)
+
+    return await cached_payload(request, 'visualization', visualization.period_key(params), compute)
+
+
+@login_required
+@conditional()
+async def get_dashboard_summary(request):
+    try:
+        recent = dashboard.parse_recent(request.query_params)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    await ensure_user_rollups(request)
+    db = request.app.state.db
+    user_id = request.state.user_id
+    query, sort = dashboard.recent_query(user_id)
+    # limit(0) would mean no limit, so recent=0 skips the queries
+    sources = dashboard.RECENT_SOURCES if recent else []
+
+    # The totals and the per-kind recent queries run concurrently
+    rows, *recent_records = await asyncio.gather(
+        db[rollups.ROLLUP_COLLECTION].find(*dashboard.totals_query(user_id)).to_list(None),
+        *[db[name].find(query, dashboard.RECENT_PROJECTION).sort(sort).limit(recent).to_list(None)
+          for _, name in sources]
+    )
+    summary = dashboard.fold_totals(rows)
+    summary['recent_transactions'] = dashboard.merge_recent(
+        [(kind, records) for (kind, _), records in zip(sources, recent_records)], recent)
+    return JSONResponse(summary)
+
+
+class CompressionMiddleware:
+    """
+    ASGI counterpart of compression.compress_response, including its weak ETags.
+
+    Only a whole 200 JSON body is compressed, so streamed NDJSON and
+    responses that already carry a Content-Encoding (the mounted sync app
+    compresses its own) pass through untouched.
+    """
+
+    def __init__(self, app, settings):
+        self.app = app
+        self.settings = settings
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = best_encoding(Headers(scope=scope).get('accept-encoding'))
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                # Held back until the first body message shows what to do
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start['headers'])
+            mimetype = headers.get('content-type', '').split(';')[0].strip()
+            body = message.get('body', b'')
+            if (start['status'] == 200 and mimetype in COMPRESSIBLE_MIMETYPES
+                    and 'content-encoding' not in headers and not message.get('more_body')):
+                headers.add_vary_header('Accept-Encoding')
+                if encoding and len(body) >= self.settings['COMPRESS_MIN_SIZE']:
+                    body = timed_compress(body, encoding, self.settings)
+                    headers['Content-Encoding'] = encoding
+                    headers['Content-Length'] = str(len(body))
+                    etag = headers.get('etag')
+                    if etag and not etag.startswith('W/'):
+                        headers['ETag'] = f'W/{etag}'
+                    message = {**message, 'body': body}
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+async def server_error(request, exc):
+    return JSONResponse({'error': str(exc)}, status_code=500)
+
+
+def create_async_app(config_name=None):
+    """
+    Build the async app, with the sync app behind it, for a config name from
+    config.py, FINWISE_CONFIG by default. Served with
+    `gunicorn -k uvicorn.workers.UvicornWorker "async_app:create_async_app('production')"`.
+    """
+    config_class = config[config_name or os.environ.get('FINWISE_CONFIG', 'default')]
+    settings = {name: getattr(config_class, name) for name in dir(config_class) if name.isupper()}
+    # Creates the indexes and the worker's services, as in sync mode
+    sync_app = create_app(config_name)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Motor binds to the running loop, so each worker opens its client here
+        client = AsyncIOMotorClient(settings['MONGODB_URI'], **client_options(settings))
+        app.state.db = client.get_default_database(DEFAULT_DATABASE)
+        try:
+            yield
+        finally:
+            client.close()
+
+    app = Starlette(
+        debug=settings.get('DEBUG', False),
+        routes=[
+            Route('/api/profile', get_profile),
+            Route('/api/income', get_income),
+            Route('/api/expense', get_expenses),
+            Route('/api/recommendations', get_recommendations),
+            Route('/api/visualization', get_visualization_data),
+            Route('/api/dashboard/summary', get_dashboard_summary),
+            # Everything else, including other methods on the paths above
+            Mount('/', app=WSGIMiddleware(sync_app))
+        ],
+        middleware=[
+            Middleware(CORSMiddleware, allow_origin_regex='.*', allow_credentials=True,
+                       allow_methods=['*'], allow_headers=['*']),
+            Middleware(CompressionMiddleware, settings=settings)
+        ],
+        exception_handlers={Exception: server_error},
+        lifespan=lifespan
+    )
+    app.state.settings = settings
+    app.state.sync_app = sync_app
+    app.state.sync_db = sync_app.extensions['finwise_db']
+    app.state.result_cache = sync_app.extensions['finwise']['result_cache']
+    app.state.auth = Auth(cache_size=settings['AUTH_CACHE_SIZE'], cache_ttl=settings['AUTH_CACHE_TTL'])
+    return app
@@ -0,0 +1,164 @@
+"""
+Request authentication.
+
+A before_request hook decodes the bearer token once per request and stores
+the caller on flask.g; login_required and admin_required guard the views.
+Tokens carry a role claim, so admin checks need no database lookup. Decoded
+claims are kept in a bounded TTL cache keyed by the token's SHA-256, so
+repeat requests skip signature verification. Decode and lookup latency is
+reported per request in a Server-Timing header and in the metrics.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+
+import jwt
+from flask import current_app, g, jsonify, request
+
+import metrics
+
+
+class TokenCache:
+    """Bounded LRU of decoded token claims with per-entry expiry"""
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, claims):
+        # Never keep a token past its own expiry
+        expires_at = min(time.time() + self.ttl, claims.get('exp', float('inf')))
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Auth:
+    def __init__(self, app=None, cache_size=10000, cache_ttl=300, role_resolver=None):
+        self.cache = TokenCache(cache_size, cache_ttl)
+        self.role_resolver = role_resolver
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['finwise_auth'] = self
+        app.before_request(self.authenticate)
+        app.after_request(self.report_timing)
+        metrics.register('auth', lambda: {'cached_tokens': len(self.cache)})
+
+    def decode(self, token, secret=None):
+        """Return the token's claims, or None if it is invalid or expired"""
+        key = TokenCache.key(token)
+        claims = self.cache.get(key)
+        if claims is not None:
+            metrics.incr('auth.cache_hits')
+            return claims
+
+        metrics.incr('auth.cache_misses')
+        try:
+            claims = jwt.decode(token, secret or current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        except jwt.InvalidTokenError:
+            return None
+        self.cache.set(key, claims)
+        return claims
+
+    def authenticate(self):
+        g.user_id = None
+        g.role = None
+        g.auth_timing = {}
+
+        header = request.headers.get('Authorization', '')
+        if not header:
+            return
+        token = header.replace('Bearer ', '')
+
+        start = time.perf_counter()
+        claims = self.decode(token)
+        g.auth_timing['auth-decode'] = (time.perf_counter() - start) * 1000
+
+        if claims:
+            g.user_id = claims.get('user_id')
+            g.role = claims.get('role')
+            g._token_key = TokenCache.key(token)
+
+    def resolve_role(self):
+        """Role for tokens issued before role claims existed, looked up once per token"""
+        if g.role is not None or not self.role_resolver:
+            return g.role or 'user'
+
+        start = time.perf_counter()
+        g.role = self.role_resolver(g.user_id)
+        g.auth_timing['auth-lookup'] = (time.perf_counter() - start) * 1000
+
+        claims = dict(self.cache.get(g._token_key) or {})
+        if claims:
+            claims['role'] = g.role
+            self.cache.set(g._token_key, claims)
+        return g.role
+
+    def report_timing(self, response):
+        timing = getattr(g, 'auth_timing', None)
+        if timing:
+            for name, milliseconds in timing.items():
+                metrics.observe(name, milliseconds)
+            response.headers.add('Server-Timing', ', '.join(
+                f'{name};dur={milliseconds:.3f}' for name, milliseconds in timing.items()
+            ))
+        return response
+
+
+def generate_token(user_id, role='user'):
+    payload = {
+        'user_id': str(user_id),
+        'role': role,
+        'exp': datetime.utcnow() + timedelta(hours=current_app.config.get('JWT_EXPIRATION_HOURS', 24))
+    }
+    return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
+
+
+def login_required(view):
+    """Reject requests without a valid token with 401"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not g.get('user_id'):
+            return jsonify({'error': 'Invalid token'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def admin_required(view):
+    """Reject requests without a valid admin token with 401 or 403"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not g.get('user_id'):
+            return jsonify({'error': 'Invalid token'}), 401
+        if current_app.extensions['finwise_auth'].resolve_role() != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
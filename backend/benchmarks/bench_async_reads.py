@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Sync vs async read throughput
+
+Runs the same read load against the sync app (gunicorn gthread workers)
+and the async read app (uvicorn workers on Motor) at rising client
+concurrency. For each run it reports requests/sec, p99 latency and the
+peak number of MongoDB connections the server held, read from
+serverStatus. With the sync app concurrency is capped at workers x
+threads. The async app keeps taking requests and shares a few pooled
+connections between them.
+
+    python benchmarks/bench_async_reads.py --workers 2 --concurrency 16 64 256
+
+Needs MongoDB running and gunicorn, uvicorn and motor installed.
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pymongo import MongoClient  # noqa: E402
+
+from benchmarks.load_test import ROUTES, client, percentile, seed, start_server  # noqa: E402
+from config import Config  # noqa: E402
+
+
+class ConnectionSampler(threading.Thread):
+    """Track the peak of serverStatus connections.current while a run is going"""
+
+    def __init__(self, uri, interval=0.2):
+        super().__init__(daemon=True)
+        self.admin = MongoClient(uri).admin
+        self.interval = interval
+        self.baseline = self.current()
+        self.peak = self.baseline
+        self.stopped = threading.Event()
+
+    def current(self):
+        return self.admin.command('serverStatus')['connections']['current']
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return self.peak - self.baseline
+
+
+def load(url, path, token, concurrency, processes, duration):
+    threads = max(1, concurrency // processes)
+    jobs = [(url, path, token, threads, duration)] * processes
+    with Pool(processes) as pool:
+        results = pool.map(client, jobs)
+    latencies = [value for result in results for value in result[0]]
+    errors = sum(result[1] for result in results)
+    return len(latencies) / duration, percentile(latencies, 0.99), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='Server worker processes for both modes')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[16, 64, 256],
+                        help='Concurrent client connections')
+    parser.add_argument('--routes', nargs='+', choices=sorted(ROUTES), default=sorted(ROUTES))
+    parser.add_argument('--processes', type=int, default=4, help='Client processes')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per run')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--expenses', type=int, default=2000, help='Expenses seeded for the test user')
+    args = parser.parse_args()
+
+    url = f'http://127.0.0.1:{args.port}'
+    print(f'{args.workers} workers, sync threads per worker: {Config.SERVER_THREADS}')
+    print(f"{'mode':>6} {'route':>16} {'clients':>8} {'req/s':>9} {'p99 ms':>9} {'mongo conns':>12} {'errors':>7}")
+
+    token = None
+    for async_mode in (False, True):
+        mode = 'async' if async_mode else 'sync'
+        process = start_server(args.workers, args.port, async_mode=async_mode)
+        try:
+            # Seeded once, on the sync server, and reused by the async one
+            token = token or seed(url, args.expenses)
+            for route in args.routes:
+                for concurrency in args.concurrency:
+                    sampler = ConnectionSampler(Config.MONGODB_URI)
+                    sampler.start()
+                    rate, p99, errors = load(url, ROUTES[route], token, concurrency, args.processes, args.duration)
+                    connections = sampler.stop()
+                    print(f'{mode:>6} {route:>16} {concurrency:>8} {rate:>9.0f} {p99:>9.1f} '
+                          f'{connections:>12} {errors:>7}')
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait()
+            time.sleep(1)
+
+
+if __name__ == '__main__':
+    main()
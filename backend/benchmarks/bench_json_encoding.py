@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+JSON encoding benchmark
+
+Encodes a synthetic income/expense listing the way the API used to
+(stringify ObjectId, date and createdAt in Python, then Flask's default
+stdlib-json provider) and the way it does now (json_provider on the raw
+records), with and without the userId field the listings no longer send.
+Reports payload bytes and encode time per listing.
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bson.objectid import ObjectId  # noqa: E402
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from json_provider import dumps  # noqa: E402
+from pagination import serialize_record  # noqa: E402
+
+CATEGORIES = ['Food', 'Rent', 'Transport', 'Utilities', 'Shopping', 'Health']
+
+
+def make_records(count, seed=1):
+    rng = random.Random(seed)
+    user_id = ObjectId()
+    start = datetime(2024, 1, 1)
+    return [{
+        '_id': ObjectId(),
+        'userId': user_id,
+        'category': rng.choice(CATEGORIES),
+        'amount': round(rng.uniform(10, 5000), 2),
+        'date': start + timedelta(days=rng.randrange(700)),
+        'description': 'Card payment',
+        'merchant': f'Merchant {rng.randrange(200)}',
+        'createdAt': start + timedelta(seconds=rng.randrange(60_000_000), microseconds=rng.randrange(1_000_000))
+    } for _ in range(count)]
+
+
+def legacy_serialize(record):
+    """serialize_record as it was before json_provider"""
+    record['_id'] = str(record['_id'])
+    if 'userId' in record:
+        record['userId'] = str(record['userId'])
+    if 'date' in record:
+        record['date'] = record['date'].strftime('%Y-%m-%d')
+    if 'createdAt' in record:
+        record['createdAt'] = record['createdAt'].isoformat()
+    return record
+
+
+def project(records):
+    return [{k: v for k, v in r.items() if k != 'userId'} for r in records]
+
+
+def stdlib_encode(provider, records):
+    # Separators as in DefaultJSONProvider.response() outside debug mode
+    return provider.dumps({'expenses': [legacy_serialize(r) for r in records]}, separators=(',', ':')).encode()
+
+
+def orjson_encode(records):
+    return dumps({'expenses': [serialize_record(r) for r in records]}, sort_keys=True)
+
+
+def measure(encode, records, repeat):
+    best = None
+    for _ in range(repeat):
+        # The serialisers mutate records, as they do on fresh cursor results
+        batch = [dict(r) for r in records]
+        gc.collect()
+        start = time.perf_counter()
+        body = encode(batch)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(body), best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    provider = DefaultJSONProvider(Flask(__name__))
+    records = make_records(args.records)
+    projected = project(records)
+
+    cases = [
+        ('stdlib, all fields', lambda b: stdlib_encode(provider, b), records),
+        ('stdlib, no userId', lambda b: stdlib_encode(provider, b), projected),
+        ('orjson, all fields', orjson_encode, records),
+        ('orjson, no userId', orjson_encode, projected)
+    ]
+
+    print(f'{args.records} records, best of {args.repeat}')
+    print(f"{'encoder':>20} {'bytes':>10} {'encode ms':>10} {'bytes vs base':>14} {'speedup':>8}")
+    base_bytes, base_ms = None, None
+    for name, encode, batch in cases:
+        size, ms = measure(encode, batch, args.repeat)
+        if base_bytes is None:
+            base_bytes, base_ms = size, ms
+        print(f'{name:>20} {size:>10} {ms:>10.1f} {size / base_bytes:>13.0%} {base_ms / ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
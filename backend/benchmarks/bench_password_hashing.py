@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Password hashing benchmark
+
+Measures how many logins per second one core can verify for each hash
+setting, and the total rate through the bounded hashing pool, so
+PASSWORD_HASH_METHOD and PASSWORD_HASH_WORKERS can be picked against the
+expected login load.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from passwords import PasswordHasher  # noqa: E402
+
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:600000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1'
+]
+
+
+def per_core(hasher, stored, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        hasher.verify(stored, 'correct horse battery staple')
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed, elapsed / iterations * 1000
+
+
+def through_pool(hasher, stored, iterations, clients):
+    # Simulates concurrent request threads all logging in at once
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as requests:
+        list(requests.map(lambda _: hasher.verify(stored, 'correct horse battery staple'), range(iterations)))
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='Hashing pool size (PASSWORD_HASH_WORKERS)')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent login requests')
+    args = parser.parse_args()
+
+    print(f'{os.cpu_count()} cores, pool of {args.workers} workers, {args.clients} concurrent clients')
+    print(f"{'method':>24} {'ms/login':>10} {'logins/s/core':>14} {'pool logins/s':>14}")
+    for method in args.methods:
+        hasher = PasswordHasher(method=method, workers=args.workers, queue_limit=args.clients, timeout=600)
+        stored = hasher.hash('correct horse battery staple')
+        rate, latency = per_core(hasher, stored, args.iterations)
+        pooled = through_pool(hasher, stored, args.iterations * args.workers, args.clients)
+        print(f'{method:>24} {latency:>10.1f} {rate:>14.1f} {pooled:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
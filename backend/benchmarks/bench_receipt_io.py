@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Receipt I/O benchmark
+
+Compares the old save-to-uploads-then-reopen path with handing the
+uploaded bytes straight to the extractors. OCR itself is left out for
+images (only decoding is timed) so the numbers isolate the I/O cost.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from PIL import Image  # noqa: E402
+
+from benchmarks.sample_pdf import make_pdf  # noqa: E402
+from receipts import extract_text_from_pdf  # noqa: E402
+
+
+def sample_pdf():
+    lines = ['FinWise Mart', 'GSTIN 29ABCDE1234F1Z5', 'Milk 2 x 45.00 90.00',
+             'Bread 1 x 40.00 40.00', 'Total 130.00', 'Date 12/03/2024']
+    return make_pdf([lines])
+
+
+def sample_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (1200, 1600), 'white').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def via_disk(data, upload_dir, extract):
+    """The original flow: file.save, reopen by path, os.remove"""
+    path = os.path.join(upload_dir, 'receipt')
+    with open(path, 'wb') as file:
+        file.write(data)
+    try:
+        return extract(path)
+    finally:
+        os.remove(path)
+
+
+def decode_image(source):
+    image = Image.open(source if isinstance(source, str) else io.BytesIO(source))
+    image.load()
+    return image.size
+
+
+def throughput(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--upload-dir', help='Directory for the disk path (default: a temp dir)')
+    args = parser.parse_args()
+
+    upload_dir = args.upload_dir or tempfile.mkdtemp()
+    cases = [
+        ('pdf', sample_pdf(), extract_text_from_pdf),
+        ('image decode', sample_image(), decode_image)
+    ]
+
+    print(f"{'receipt':>14} {'size':>10} {'disk/s':>10} {'memory/s':>10} {'speedup':>8}")
+    for name, data, extract in cases:
+        disk = throughput(lambda: via_disk(data, upload_dir, extract), args.iterations)
+        memory = throughput(lambda: extract(data), args.iterations)
+        print(f'{name:>14} {len(data):>9}B {disk:>10.0f} {memory:>10.0f} {memory / disk:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Receipt parser accuracy and throughput benchmark
+
+Generates a seeded corpus of synthetic Indian retail receipts with known
+merchant, date and total, mixing in the usual distractors (phone numbers,
+GSTINs, bill numbers, quantities, tax lines). The generator shares its
+assumptions with the parser, so accuracy is also reported on HANDWRITTEN:
+receipts transcribed by hand in layouts the generator never produces
+(restaurants, fuel, pharmacy, online orders, utility bills). Reports field
+accuracy and lines/sec for the receipt parser and for the original
+two-regex heuristic.
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from receipt_parser import parse_receipt  # noqa: E402
+
+MERCHANTS = ['SHREE KRISHNA SWEETS', 'Big Bazaar', 'MORE SUPERMARKET', 'Cafe Coffee Day', 'APOLLO PHARMACY',
+             'Reliance Fresh', 'SAGAR RATNA', 'DMart Avenue', 'Chai Point', 'HP PETROL PUMP']
+PRODUCTS = ['Milk 1L', 'Bread', 'Paneer 200g', 'Basmati Rice 5kg', 'Toor Dal', 'Masala Dosa', 'Filter Coffee',
+            'Paracetamol 500', 'Samosa', 'Atta 10kg', 'Sugar 1kg', 'Dettol', 'Petrol']
+DATE_FORMATS = ['%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%Y-%m-%d', '%d %b %Y', '%b %d, %Y', '%d-%b-%y']
+TOTAL_LABELS = ['Grand Total', 'Net Amount', 'Total', 'TOTAL', 'Amount Payable', 'Bill Amount']
+
+
+def money(rng, value):
+    return f'{value:,.2f}' if value >= 1000 and rng.random() < 0.5 else f'{value:.2f}'
+
+
+def make_receipt(rng):
+    """Return (text, truth) for one synthetic receipt"""
+    merchant = rng.choice(MERCHANTS)
+    date = datetime(2023, 1, 1) + timedelta(days=rng.randint(0, 700))
+    lines = [merchant]
+    if rng.random() < 0.7:
+        lines.append(f'{rng.randint(1, 300)}, MG Road, Bengaluru {rng.randint(560001, 560099)}')
+    if rng.random() < 0.8:
+        lines.append(f'Ph: {rng.randint(6, 9)}{rng.randint(100000000, 999999999)}')
+    if rng.random() < 0.7:
+        lines.append(f'GSTIN: {rng.randint(10, 37)}ABCDE{rng.randint(1000, 9999)}F1Z{rng.randint(1, 9)}')
+    lines.append('TAX INVOICE' if rng.random() < 0.5 else 'Cash Memo')
+    lines.append(f'Bill No: {rng.randint(1000, 999999)}   Date: {date.strftime(rng.choice(DATE_FORMATS))}')
+
+    subtotal = 0
+    for _ in range(rng.randint(1, 12)):
+        qty = rng.randint(1, 5)
+        price = round(rng.uniform(10, 900), 2)
+        amount = round(qty * price, 2)
+        subtotal += amount
+        lines.append(f'{rng.choice(PRODUCTS)} {qty} x {price:.2f} {money(rng, amount)}')
+    subtotal = round(subtotal, 2)
+
+    tax = round(subtotal * 0.025, 2)
+    total = round(subtotal + 2 * tax, 2)
+    lines.append(f'Sub Total {money(rng, subtotal)}')
+    lines.append(f'CGST 2.5% {money(rng, tax)}')
+    lines.append(f'SGST 2.5% {money(rng, tax)}')
+    lines.append(f'{rng.choice(TOTAL_LABELS)} {"₹" if rng.random() < 0.5 else ""}{money(rng, total)}')
+    if rng.random() < 0.5:
+        lines.append(f'UPI Ref {rng.randint(10 ** 11, 10 ** 12 - 1)}')
+    lines.append('Thank you! Visit again')
+
+    return '\n'.join(lines), {'amount': total, 'date': date.strftime('%d/%m/%Y'), 'merchant': merchant}
+
+
+# (text, truth) pairs written by hand, not produced by make_receipt
+HANDWRITTEN = [
+    ("""UDUPI GRAND
+Veg Restaurant
+No 14, 80 Feet Road, Koramangala
+Tel: 080-25634411
+Table: 7   Covers: 2   Steward: Ravi
+Dt: 14/02/2024  Time: 20:41
+Item                 Qty   Amt
+Masala Dosa           2   180.00
+Idli Vada             1    75.00
+Filter Coffee         2    60.00
+Gulab Jamun           1    55.00
+Total Qty: 6
+Sub-Total                 370.00
+CGST @2.5%                  9.25
+SGST @2.5%                  9.25
+Round Off                   0.50
+Net Payable               389.00
+Paid by: UPI
+Thank You. Visit Again""", {'amount': 389.00, 'date': '14/02/2024', 'merchant': 'UDUPI GRAND'}),
+    ("""INDIAN OIL
+COCO Outlet - Hosur Road
+Receipt No: 004512
+Date: 03-Sep-2023 07:12
+Nozzle: 3  Product: PETROL
+Rate/Ltr: Rs. 101.94
+Volume(Ltr): 19.62
+Amount: Rs. 2000.00
+Vehicle No: KA01AB1234
+Mode: CARD  Card ending 4421
+Thank you""", {'amount': 2000.00, 'date': '03/09/2023', 'merchant': 'INDIAN OIL'}),
+    ("""Apollo Pharmacy
+Shop 3, Sector 21, Gurgaon 122016
+FSSAI 10019011003223
+Inv# AP/23/88123      Date 2023-11-19
+Dolo 650 Tab 15's      1     30.91
+Vicks Vaporub 25ml     1    145.00
+Crocin Cold & Flu      2     92.40
+Less Discount                 -26.83
+Amount Payable               241.48
+You saved Rs 26.83 today""", {'amount': 241.48, 'date': '19/11/2023', 'merchant': 'Apollo Pharmacy'}),
+    ("""Order Summary
+FreshKart Online Pvt Ltd
+Order ID: FK-7781-2231
+Placed on Jan 5, 2024
+2 x Amul Taaza 1L           136.00
+1 x Aashirvaad Atta 5kg     289.00
+1 x Tata Salt 1kg            28.00
+Item total                  453.00
+Delivery fee                 25.00
+Total Savings                40.00
+Grand Total                 478.00""", {'amount': 478.00, 'date': '05/01/2024', 'merchant': 'FreshKart Online Pvt Ltd'}),
+    ("""BESCOM
+Electricity Bill
+Account ID 7845123690
+Bill Date: 02.06.2024
+Due Date: 16.06.2024
+Units consumed 212
+Energy Charges 1,455.60
+Fixed Charges 220.00
+Tax 121.57
+Bill Amount Rs 1,797.17""", {'amount': 1797.17, 'date': '02/06/2024', 'merchant': 'BESCOM'}),
+    ("""Third Wave Coffee
+HSR Layout
+ORDER #A-2291
+12 Aug 2024 09:03 AM
+Cappuccino (R)        220.00
+Almond Croissant      195.00
+GST 5%                 20.75
+TOTAL                 435.75
+Card                  435.75""", {'amount': 435.75, 'date': '12/08/2024', 'merchant': 'Third Wave Coffee'}),
+    ("""SRI LAKSHMI KIRANA STORES
+Opp. Bus Stand, Main Road
+Mob 9845012345
+Cash Bill   Bill No 1182   27/07/24
+Rice Sona Masoori 10kg 1 650.00
+Groundnut Oil 1L 2 350.00
+Jaggery 1kg 1 70.00
+TOTAL 1070.00""", {'amount': 1070.00, 'date': '27/07/2024', 'merchant': 'SRI LAKSHMI KIRANA STORES'}),
+    ("""Cinepolis
+Nexus Mall, Whitefield
+Booking ID: WKJ8TT2
+Show: 21 Dec 2023, 18:30
+Tickets 2 x 280.00       560.00
+Convenience Fee           59.00
+IGST 18%                  10.62
+Total Amount            629.62""", {'amount': 629.62, 'date': '21/12/2023', 'merchant': 'Cinepolis'})
+]
+
+
+def legacy_parse(text):
+    """The original parse_expense_data: largest number is the total, first date wins"""
+    amounts = re.findall(r'₹?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)', text)
+    dates = re.findall(r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})', text)
+    amount = max([float(a.replace(',', '')) for a in amounts]) if amounts else 0
+    return {'amount': amount, 'date': dates[0] if dates else None, 'merchant': None}
+
+
+def normalise_date(value):
+    for fmt in ('%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y'):
+        try:
+            return datetime.strptime(value, fmt).strftime('%d/%m/%Y')
+        except (TypeError, ValueError):
+            continue
+    return value
+
+
+def evaluate(parse, corpus):
+    correct = {'amount': 0, 'date': 0, 'merchant': 0}
+    for text, truth in corpus:
+        result = parse(text)
+        correct['amount'] += abs((result['amount'] or 0) - truth['amount']) < 0.01
+        correct['date'] += normalise_date(result['date']) == truth['date']
+        correct['merchant'] += result['merchant'] == truth['merchant']
+
+    lines = sum(text.count('\n') + 1 for text, _ in corpus)
+    start = time.perf_counter()
+    for text, _ in corpus:
+        parse(text)
+    elapsed = time.perf_counter() - start
+    return {field: count / len(corpus) for field, count in correct.items()}, lines / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--receipts', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_receipt(rng) for _ in range(args.receipts)]
+
+    for title, receipts in [('synthetic', corpus), ('handwritten', HANDWRITTEN * 50)]:
+        print(f"{title:>11} {'amount':>8} {'date':>8} {'merchant':>9} {'lines/sec':>11}")
+        for name, parse in [('parser', parse_receipt), ('legacy', legacy_parse)]:
+            accuracy, rate = evaluate(parse, receipts)
+            print(f"{name:>11} {accuracy['amount']:>8.1%} {accuracy['date']:>8.1%} {accuracy['merchant']:>9.1%} "
+                  f"{rate:>11,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Recommendations latency benchmark
+
+Seeds one user per size with synthetic income and expenses, then reports
+p50/p99 latency of the monthly rollup read the endpoint uses against the
+old approach of loading every document and summing in Python.
+
+Runs against a local mongod with --uri, or mongomock by default (mongomock
+evaluates queries in Python, so only mongod numbers are representative).
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from rollups import ROLLUP_COLLECTION, rebuild_user_rollups, recommendation_totals  # noqa: E402
+
+CATEGORIES = ['Food & Dining', 'Transportation', 'Shopping', 'Groceries', 'Rent', 'Bills & Utilities']
+
+
+def get_database(uri):
+    """Return a scratch database on mongod, or an in-memory mongomock one"""
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri)['finwise_bench']
+    import mongomock
+    return mongomock.MongoClient()['finwise_bench']
+
+
+def seed_user(db, expense_count):
+    """Insert one user with expense_count expenses spread over two years"""
+    user_id = ObjectId()
+    now = datetime.now()
+    db['income'].insert_many([
+        {'userId': user_id, 'source': 'Salary', 'amount': 85000.0, 'frequency': 'monthly', 'date': now},
+        {'userId': user_id, 'source': 'Bonus', 'amount': 120000.0, 'frequency': 'yearly', 'date': now}
+    ])
+    batch = []
+    for _ in range(expense_count):
+        batch.append({
+            'userId': user_id,
+            'category': random.choice(CATEGORIES),
+            'amount': round(random.uniform(50, 5000), 2),
+            'date': now - timedelta(days=random.randint(0, 730))
+        })
+        if len(batch) == 10000:
+            db['expenses'].insert_many(batch)
+            batch = []
+    if batch:
+        db['expenses'].insert_many(batch)
+    return user_id
+
+
+def python_side_totals(db, user_id):
+    """The pre-pipeline implementation: fetch everything, sum in Python"""
+    user_income = list(db['income'].find({'userId': user_id}))
+    user_expenses = list(db['expenses'].find({'userId': user_id}))
+    monthly_income = sum([inc['amount'] for inc in user_income if inc['frequency'] == 'monthly'])
+    monthly_income += sum([inc['amount'] for inc in user_income if inc['frequency'] == 'yearly']) / 12
+    now = datetime.now()
+    expense_categories = {}
+    for expense in user_expenses:
+        if expense['date'].month == now.month and expense['date'].year == now.year:
+            category = expense['category']
+            expense_categories[category] = expense_categories.get(category, 0) + expense['amount']
+    return monthly_income, expense_categories
+
+
+def measure(fn, iterations):
+    """Return (p50, p99) latency in milliseconds"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return statistics.median(samples), p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', help='MongoDB URI of a scratch mongod (default: mongomock)')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Comma separated expense counts')
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    db = get_database(args.uri)
+    db['income'].drop()
+    db['expenses'].drop()
+    db[ROLLUP_COLLECTION].drop()
+    db['expenses'].create_index([('userId', 1), ('date', 1)])
+    db[ROLLUP_COLLECTION].create_index([('userId', 1), ('kind', 1), ('month', 1), ('category', 1)], unique=True)
+
+    print(f"{'expenses':>10} {'rollup p50':>14} {'rollup p99':>14} {'python p50':>12} {'python p99':>12}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        user_id = seed_user(db, size)
+        rebuild_user_rollups(db, user_id)
+        rollup_p50, rollup_p99 = measure(lambda: recommendation_totals(db, user_id), args.iterations)
+        py_p50, py_p99 = measure(lambda: python_side_totals(db, user_id), args.iterations)
+        print(f'{size:>10} {rollup_p50:>12.2f}ms {rollup_p99:>12.2f}ms {py_p50:>10.2f}ms {py_p99:>10.2f}ms')
+
+    if args.uri:
+        db.client.drop_database('finwise_bench')
+
+
+if __name__ == '__main__':
+    main()
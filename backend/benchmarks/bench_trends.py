@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Trend engine benchmark
+
+Builds one synthetic user with --transactions expenses spread over
+--months months. It then times the analysis in trends.py, which works on
+the rollup rows and the per-month arrays MongoDB hands back, against the
+same statistics computed in plain Python over one dict per transaction.
+Query time is not included. Both approaches read an index range, but
+decoding a dict per transaction is itself a large part of the plain
+Python cost.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import trends  # noqa: E402
+
+CATEGORIES = ['Food & Dining', 'Transportation', 'Shopping', 'Groceries', 'Rent', 'Bills & Utilities']
+MERCHANTS = ['Netflix', 'Spotify', 'Swiggy', 'Zomato', 'Uber', 'Amazon', 'BigBasket', '']
+
+
+def make_expenses(count, months, now, seed=1):
+    rng = random.Random(seed)
+    current = trends.month_index(now.year, now.month)
+    expenses = []
+    for _ in range(count):
+        index = current - rng.randrange(months)
+        expenses.append({
+            'category': rng.choice(CATEGORIES),
+            'merchant': rng.choice(MERCHANTS),
+            'amount': float(rng.choice([199, 499, 649]) if rng.random() < 0.1 else round(rng.uniform(50, 5000), 2)),
+            'date': datetime(index // 12, index % 12 + 1, rng.randint(1, 28))
+        })
+    return expenses
+
+
+def as_query_results(expenses, now):
+    """What the two trend queries return for these expenses"""
+    rollups = defaultdict(float)
+    recent = defaultdict(lambda: {'amount': [], 'category': [], 'merchant': []})
+    since = trends.month_index(now.year, now.month) - trends.RECURRING_LOOKBACK
+    for expense in expenses:
+        rollups[(expense['date'].strftime('%Y-%m'), expense['category'])] += expense['amount']
+        if trends.month_index(expense['date'].year, expense['date'].month) >= since and expense['merchant']:
+            doc = recent[(expense['date'].year, expense['date'].month)]
+            for field in ('amount', 'category', 'merchant'):
+                doc[field].append(expense[field])
+    rollup_rows = [{'month': month, 'category': category, 'total': total}
+                   for (month, category), total in rollups.items()]
+    month_docs = [{'_id': {'year': year, 'month': month}, **doc} for (year, month), doc in recent.items()]
+    return rollup_rows, month_docs
+
+
+def python_analysis(expenses, now):
+    """The same statistics over one dict per transaction, without NumPy"""
+    current = now.strftime('%Y-%m')
+    by_month = defaultdict(lambda: defaultdict(float))
+    for expense in expenses:
+        by_month[expense['date'].strftime('%Y-%m')][expense['category']] += expense['amount']
+
+    months = sorted(month for month in by_month if month < current)
+    categories = {category for totals in by_month.values() for category in totals}
+    result = {'baselines': {}, 'anomalies': []}
+    for category in categories:
+        series = [by_month[month].get(category, 0) for month in months]
+        result['baselines'][category] = {window: sum(series[-window:]) / len(series[-window:])
+                                         for window in trends.BASELINE_WINDOWS}
+        last_year = series[-12:]
+        if len(last_year) >= trends.MIN_HISTORY and statistics.stdev(last_year) > 0:
+            z = (by_month[current].get(category, 0) - statistics.mean(last_year)) / statistics.stdev(last_year)
+            if z >= trends.ANOMALY_Z:
+                result['anomalies'].append(category)
+
+    since = trends.month_index(now.year, now.month) - trends.RECURRING_LOOKBACK
+    seen = defaultdict(set)
+    for expense in expenses:
+        index = trends.month_index(expense['date'].year, expense['date'].month)
+        if index >= since and expense['merchant'].strip():
+            payee = (expense['merchant'].strip().lower(), expense['category'])
+            seen[(payee, round(expense['amount']))].add(index)
+    result['recurring'] = [key for key, months_seen in seen.items() if len(months_seen) >= trends.RECURRING_MIN_MONTHS]
+    return result
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=100000)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    expenses = make_expenses(args.transactions, args.months, now)
+    rollup_rows, month_docs = as_query_results(expenses, now)
+
+    engine_ms = best_of(args.repeat, lambda: trends.analyze(rollup_rows, month_docs, now))
+    python_ms = best_of(args.repeat, lambda: python_analysis(expenses, now))
+
+    recent = sum(len(doc['amount']) for doc in month_docs)
+    print(f'{args.transactions} expenses over {args.months} months, best of {args.repeat}')
+    print(f'trends.analyze: {len(rollup_rows)} rollup rows + {recent} recent payments in {len(month_docs)} arrays '
+          f'-> {engine_ms:.1f} ms')
+    print(f'plain Python over {len(expenses)} dicts -> {python_ms:.1f} ms ({python_ms / engine_ms:.1f}x slower)')
+
+
+if __name__ == '__main__':
+    main()
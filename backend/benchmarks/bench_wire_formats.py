@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Wire format benchmark
+
+For a synthetic expense listing, compares the row format, format=columnar
+and NDJSON, each sent as is, gzip and (with the Brotli package) brotli, as
+compress_response would send them. Reports bytes on the wire, server
+encode time (JSON encoding plus compression) and client decode time
+(decompression plus JSON parsing).
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import orjson  # noqa: E402
+
+from bench_json_encoding import make_records  # noqa: E402
+from compression import ENCODINGS, compress  # noqa: E402
+from config import Config  # noqa: E402
+from json_provider import dumps  # noqa: E402
+from pagination import listing_payload, serialize_record  # noqa: E402
+
+SETTINGS = {
+    'COMPRESS_GZIP_LEVEL': Config.COMPRESS_GZIP_LEVEL,
+    'COMPRESS_BROTLI_QUALITY': Config.COMPRESS_BROTLI_QUALITY
+}
+
+
+def encode_json(records, response_format):
+    return dumps(listing_payload('expenses', records, {'format': response_format}), sort_keys=True)
+
+
+def encode_ndjson(records):
+    return b''.join(dumps(record) + b'\n' for record in records)
+
+
+def decode(body, response_format):
+    if response_format == 'ndjson':
+        return [orjson.loads(line) for line in body.splitlines()]
+    return orjson.loads(body)
+
+
+def decompress(body, encoding):
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'br':
+        import brotli
+        return brotli.decompress(body)
+    return body
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    records = [serialize_record({k: v for k, v in r.items() if k != 'userId'})
+               for r in make_records(args.records)]
+    encoders = {
+        'rows': lambda: encode_json(records, None),
+        'columnar': lambda: encode_json(records, 'columnar'),
+        'ndjson': lambda: encode_ndjson(records)
+    }
+
+    print(f'{args.records} records, best of {args.repeat}')
+    print(f"{'format':>10} {'encoding':>9} {'bytes':>10} {'encode ms':>10} {'decode ms':>10}")
+    for response_format, encode in encoders.items():
+        body, encode_ms = best_of(args.repeat, encode)
+        for encoding in ['identity', *ENCODINGS]:
+            if encoding == 'identity':
+                wire, compress_ms = body, 0.0
+            else:
+                wire, compress_ms = best_of(args.repeat, lambda: compress(body, encoding, SETTINGS))
+            _, decode_ms = best_of(args.repeat, lambda: decode(decompress(wire, encoding), response_format))
+            print(f'{response_format:>10} {encoding:>9} {len(wire):>10} {encode_ms + compress_ms:>10.1f} '
+                  f'{decode_ms:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
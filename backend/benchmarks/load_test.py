@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for GET /api/expense and GET /api/recommendations
+
+Registers a throwaway user, seeds expenses through the bulk endpoint and
+then drives each route with keep-alive connections spread over several
+client processes, reporting requests/sec and latency percentiles.
+
+With --workers the script starts gunicorn itself once per worker count
+(SERVER_WORKERS) so the numbers show how throughput scales across cores:
+
+    python benchmarks/load_test.py --workers 1 2 4 8
+    python benchmarks/load_test.py --url http://localhost:5000   # existing server
+
+Needs MongoDB running; the seeded user is left in the database.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from multiprocessing import Pool
+from urllib.parse import urlsplit
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+ROUTES = {
+    'expense': '/api/expense?limit=50',
+    'recommendations': '/api/recommendations'
+}
+CATEGORIES = ['Food', 'Transport', 'Rent', 'Utilities', 'Shopping', 'Entertainment', 'Healthcare']
+
+
+def request(connection, method, path, body=None, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def seed(url, expenses):
+    """Register a user with `expenses` rows and some income, return its token"""
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port)
+    status, body = request(connection, 'POST', '/api/register', {
+        'firstName': 'Load', 'lastName': 'Test', 'email': f'load-{uuid.uuid4().hex}@example.com',
+        'phone': '9999999999', 'dateOfBirth': '1990-01-01', 'gender': 'other', 'password': 'load-test'
+    })
+    if status != 201:
+        raise SystemExit(f'Registration failed: {status} {body[:200]}')
+    token = json.loads(body)['token']
+
+    rng = random.Random(42)
+    today = date.today()
+    rows = [{
+        'category': rng.choice(CATEGORIES),
+        'amount': round(rng.uniform(50, 5000), 2),
+        'date': (today - timedelta(days=rng.randrange(365))).isoformat()
+    } for _ in range(expenses)]
+    request(connection, 'POST', '/api/expense/bulk', {'rows': rows}, token)
+    request(connection, 'POST', '/api/income', {
+        'source': 'Salary', 'amount': 90000, 'frequency': 'monthly', 'date': today.isoformat()
+    }, token)
+    connection.close()
+    return token
+
+
+def client(args):
+    """Run `threads` keep-alive clients for `duration` seconds, return (latencies, errors)"""
+    url, path, token, threads, duration = args
+    parts = urlsplit(url)
+    deadline = time.monotonic() + duration
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def loop():
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        local = []
+        failed = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status, _ = request(connection, 'GET', path, token=token)
+                if status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+                continue
+            local.append(time.perf_counter() - start)
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies, errors[0]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000 if ordered else 0
+
+
+def run(url, token, args, label):
+    for route, path in ROUTES.items():
+        jobs = [(url, path, token, args.threads, args.duration)] * args.clients
+        with Pool(args.clients) as pool:
+            results = pool.map(client, jobs)
+        latencies = [value for result in results for value in result[0]]
+        errors = sum(result[1] for result in results)
+        print(f'{label:>8} {route:>16} {len(latencies) / args.duration:>10.0f} '
+              f'{percentile(latencies, 0.5):>9.1f} {percentile(latencies, 0.99):>9.1f} {errors:>7}')
+
+
+def start_server(workers, port, async_mode=False):
+    """Start gunicorn with the sync app, or the async app on uvicorn workers"""
+    env = dict(os.environ, SERVER_WORKERS=str(workers), SERVER_BIND=f'127.0.0.1:{port}',
+               SERVER_PIDFILE=f'loadtest-{port}.pid', FINWISE_CONFIG='production')
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--access-logfile', '/dev/null']
+    if async_mode:
+        command += ['-k', 'uvicorn.workers.UvicornWorker', "async_app:create_async_app('production')"]
+    else:
+        command.append("app:create_app('production')")
+    process = subprocess.Popen(command,
+                               cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            request(connection, 'GET', '/api/profile')
+            connection.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f'gunicorn with {workers} workers did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Load an already running server instead of starting gunicorn')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4],
+                        help='gunicorn worker counts to compare')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--clients', type=int, default=4, help='Client processes')
+    parser.add_argument('--threads', type=int, default=8, help='Connections per client process')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per route')
+    parser.add_argument('--expenses', type=int, default=2000, help='Expenses seeded for the test user')
+    args = parser.parse_args()
+
+    print(f'{os.cpu_count()} cores, {args.clients * args.threads} concurrent connections')
+    print(f"{'workers':>8} {'route':>16} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+
+    if args.url:
+        run(args.url, seed(args.url, args.expenses), args, 'external')
+        return
+
+    token = None
+    for workers in args.workers:
+        process = start_server(workers, args.port)
+        try:
+            url = f'http://127.0.0.1:{args.port}'
+            token = token or seed(url, args.expenses)
+            run(url, token, args, str(workers))
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Minimal PDF writer for benchmark fixtures.
+
+Builds text-only PDFs with one Helvetica content stream per page, which is
+enough for PyPDF2 text extraction without any extra dependency.
+"""
+
+
+def _escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(pages):
+    """Return PDF bytes for pages, a list of lists of text lines"""
+    objects = []
+    page_count = len(pages)
+    # 1: catalog, 2: page tree, 3: font, then a (page, content) pair per page
+    kids = ' '.join(f'{4 + 2 * i} 0 R' for i in range(page_count))
+    objects.append('<< /Type /Catalog /Pages 2 0 R >>')
+    objects.append(f'<< /Type /Pages /Kids [{kids}] /Count {page_count} >>')
+    objects.append('<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+
+    for i, lines in enumerate(pages):
+        content = ['BT', '/F1 10 Tf', '14 TL', '40 800 Td']
+        content += [f'({_escape(line)}) Tj T*' for line in lines]
+        content.append('ET')
+        stream = '\n'.join(content)
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>')
+        objects.append(f'<< /Length {len(stream.encode("latin-1"))} >>\nstream\n{stream}\nendstream')
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode()
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return bytes(out)
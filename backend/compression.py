@@ -0,0 +1,93 @@
+"""
+Response compression.
+
+JSON responses of at least COMPRESS_MIN_SIZE bytes are compressed with
+brotli or gzip, whichever the client's Accept-Encoding prefers (brotli on
+a tie). Brotli needs the optional Brotli package; without it only gzip is
+offered. Smaller bodies are sent as is, since the saving would not cover
+the CPU. Streamed NDJSON is left alone so records still reach the client
+as they are read.
+
+A compressed body is a different representation of the same data, so its
+ETag is made weak. etags.conditional compares If-None-Match weakly, so
+revalidation keeps answering 304.
+
+compress_response() is the sync app's after_request hook;
+async_app.CompressionMiddleware applies the same rules to the async app.
+"""
+
+import gzip
+import time
+
+from flask import current_app, request
+from werkzeug.http import parse_accept_header
+
+import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json'}
+ENCODINGS = ['br', 'gzip'] if brotli else ['gzip']
+
+
+def best_encoding(accept_encoding):
+    """The preferred entry of ENCODINGS for an Accept-Encoding header, or None"""
+    return parse_accept_header(accept_encoding).best_match(ENCODINGS)
+
+
+def compress(body, encoding, settings):
+    if encoding == 'br':
+        return brotli.compress(body, quality=settings['COMPRESS_BROTLI_QUALITY'])
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=settings['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+
+def timed_compress(body, encoding, settings):
+    start = time.perf_counter()
+    compressed = compress(body, encoding, settings)
+    metrics.observe(f'compression.{encoding}', (time.perf_counter() - start) * 1000)
+    metrics.incr(f'compression.{encoding}.responses')
+    metrics.incr(f'compression.{encoding}.bytes_in', len(body))
+    metrics.incr(f'compression.{encoding}.bytes_out', len(compressed))
+    return compressed
+
+
+def compression_stats():
+    stats = {}
+    for encoding in ENCODINGS:
+        bytes_in = metrics.counter(f'compression.{encoding}.bytes_in')
+        bytes_out = metrics.counter(f'compression.{encoding}.bytes_out')
+        stats[encoding] = {
+            'responses': metrics.counter(f'compression.{encoding}.responses'),
+            'bytes_in': bytes_in,
+            'bytes_out': bytes_out,
+            'ratio': round(bytes_out / bytes_in, 4) if bytes_in else 0
+        }
+    return stats
+
+
+def compress_response(response):
+    """after_request hook compressing large JSON bodies"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    settings = current_app.config
+    body = response.get_data()
+    if len(body) < settings['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+
+    compressed = timed_compress(body, encoding, settings)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
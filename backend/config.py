@@ -7,13 +7,96 @@ class Config:
     
     # MongoDB Configuration
     MONGODB_URI = os.environ.get('MONGODB_URI') or 'mongodb://localhost:27017/finwise_db'
+    # Each server process opens its own pool on first use
+    MONGODB_MAX_POOL_SIZE = int(os.environ.get('MONGODB_MAX_POOL_SIZE', 100))
+    MONGODB_MIN_POOL_SIZE = int(os.environ.get('MONGODB_MIN_POOL_SIZE', 0))
+    # How long a request waits for a free pooled connection
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 5000))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGODB_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGODB_CONNECT_TIMEOUT_MS', 5000))
     
     # Upload Configuration
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 5242880))  # 5MB
     
+    # Receipt OCR job queue
+    OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 2))
+    OCR_QUEUE_DEPTH = int(os.environ.get('OCR_QUEUE_DEPTH', 32))
+    OCR_JOB_TIMEOUT = int(os.environ.get('OCR_JOB_TIMEOUT', 60))  # seconds
+    OCR_RESULT_TTL = int(os.environ.get('OCR_RESULT_TTL', 3600))  # seconds
+    # Multi-page PDFs are extracted in page chunks across the OCR workers
+    PDF_PAGE_CHUNK = int(os.environ.get('PDF_PAGE_CHUNK', 8))
+    PDF_MAX_PAGES = int(os.environ.get('PDF_MAX_PAGES', 100))
+    # Uploads up to this size are processed in memory, larger ones are spooled to UPLOAD_FOLDER.
+    # An in-memory PDF that needs more than one page chunk is spooled before the chunks run.
+    RECEIPT_SPOOL_THRESHOLD = int(os.environ.get('RECEIPT_SPOOL_THRESHOLD', 2097152))  # 2MB
+    
+    # Parsed receipt cache keyed by content hash
+    RECEIPT_CACHE_SIZE = int(os.environ.get('RECEIPT_CACHE_SIZE', 512))
+    RECEIPT_CACHE_TTL = int(os.environ.get('RECEIPT_CACHE_TTL', 7 * 24 * 3600))  # seconds
+    
+    # Cached recommendation and visualization payloads: 'memory' (per process) or 'redis' (shared)
+    RESULT_CACHE_BACKEND = os.environ.get('RESULT_CACHE_BACKEND') or 'memory'
+    RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 3600))  # seconds
+    RESULT_CACHE_REDIS_URL = os.environ.get('RESULT_CACHE_REDIS_URL') or 'redis://localhost:6379/0'
+    # Warming covers users who signed in within RESULT_CACHE_WARM_DAYS
+    RESULT_CACHE_WARM_DAYS = int(os.environ.get('RESULT_CACHE_WARM_DAYS', 30))
+    RESULT_CACHE_WARM_USERS = int(os.environ.get('RESULT_CACHE_WARM_USERS', 1000))
+    RESULT_CACHE_WARM_ON_START = os.environ.get('RESULT_CACHE_WARM_ON_START', '').lower() in ('1', 'true', 'yes')
+    
+    # Charts with more buckets than this are downsampled to a coarser granularity
+    VISUALIZATION_MAX_POINTS = int(os.environ.get('VISUALIZATION_MAX_POINTS', 200))
+    # Day and week charts scan raw expenses, so they are also limited to this many days
+    VISUALIZATION_MAX_RAW_DAYS = int(os.environ.get('VISUALIZATION_MAX_RAW_DAYS', 385))
+    
+    # Nightly batch precomputation (run_batch.py) of the same payloads
+    # for every user who signed in within BATCH_ACTIVE_DAYS
+    BATCH_ACTIVE_DAYS = int(os.environ.get('BATCH_ACTIVE_DAYS', 30))
+    BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', 500))
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+    # Stored payloads older than this are ignored and computed live
+    PRECOMPUTE_MAX_AGE = int(os.environ.get('PRECOMPUTE_MAX_AGE', 36 * 3600))  # seconds
+    
+    # Admin user deletion runs in the background, in batches of _ids with a pause between them
+    USER_DELETE_BATCH_SIZE = int(os.environ.get('USER_DELETE_BATCH_SIZE', 1000))
+    USER_DELETE_PAUSE_MS = int(os.environ.get('USER_DELETE_PAUSE_MS', 50))  # milliseconds
+    USER_DELETE_WORKERS = int(os.environ.get('USER_DELETE_WORKERS', 1))
+    # A deletion with no progress for this long is resumed by the sweeper
+    USER_DELETE_STALE_AFTER = int(os.environ.get('USER_DELETE_STALE_AFTER', 300))  # seconds
+    USER_DELETE_RESULT_TTL = int(os.environ.get('USER_DELETE_RESULT_TTL', 86400))  # seconds
+    
+    # JSON responses at least this large are compressed with brotli or gzip
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # bytes
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+    
     # JWT Configuration
     JWT_EXPIRATION_HOURS = int(os.environ.get('JWT_EXPIRATION_HOURS', 24))
+    # Verified tokens are cached by hash to skip repeat signature checks
+    AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 10000))
+    AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 300))  # seconds
+    
+    # Password hashing: any Werkzeug method string, e.g. 'pbkdf2:sha256:600000' or
+    # 'scrypt:32768:8:1'. Stored hashes are migrated on the next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:600000'
+    # Hash threads per server process; 0 splits half the cores between the SERVER_WORKERS processes
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 64))
+    PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))  # seconds
+    
+    # Production server (run_backend.py --mode prod, see gunicorn.conf.py)
+    SERVER_BIND = os.environ.get('SERVER_BIND') or '0.0.0.0:5000'
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', os.cpu_count() or 1))
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 4))
+    SERVER_KEEPALIVE = int(os.environ.get('SERVER_KEEPALIVE', 5))  # seconds
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', 60))  # seconds
+    # Time workers get to finish in-flight requests on reload or shutdown
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))  # seconds
+    # Recycle each worker after this many requests (0 disables)
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 0))
+    SERVER_MAX_REQUESTS_JITTER = int(os.environ.get('SERVER_MAX_REQUESTS_JITTER', 0))
+    SERVER_PIDFILE = os.environ.get('SERVER_PIDFILE') or 'finwise.pid'
     
     # Allowed file extensions for uploads
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
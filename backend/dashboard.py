@@ -0,0 +1,94 @@
+"""
+Dashboard summary.
+
+Totals come from the monthly rollups, and income is annualised the way the
+dashboard always has: monthly income counts twelve times, yearly and
+one-time income once. The recent transactions are the newest N of each
+kind, read with a limited query on the (userId, createdAt) index, then
+merged newest first and cut to N. The user's full history is never loaded.
+"""
+
+import heapq
+from itertools import islice
+
+from bson.objectid import ObjectId
+from pymongo import DESCENDING
+
+from pagination import serialize_record
+from rollups import ROLLUP_COLLECTION
+
+DEFAULT_RECENT = 5
+MAX_RECENT = 50
+
+# How many times a year each income frequency counts
+ANNUAL_MULTIPLIERS = {'monthly': 12}
+
+RECENT_SOURCES = [
+    ('income', 'income'),
+    ('expense', 'expenses')
+]
+
+
+def parse_recent(args):
+    try:
+        recent = int(args.get('recent', DEFAULT_RECENT))
+    except ValueError:
+        raise ValueError('recent must be an integer')
+    if recent < 0:
+        raise ValueError('recent must not be negative')
+    return min(recent, MAX_RECENT)
+
+
+def totals_query(user_id):
+    """The (filter, projection) of the rollup rows behind the totals"""
+    return {'userId': ObjectId(user_id)}, {'kind': 1, 'category': 1, 'total': 1}
+
+
+def fold_totals(rows):
+    total_income = 0
+    total_expenses = 0
+    for row in rows:
+        if row['kind'] == 'income':
+            total_income += row['total'] * ANNUAL_MULTIPLIERS.get(row['category'], 1)
+        else:
+            total_expenses += row['total']
+
+    balance = total_income - total_expenses
+    return {
+        'total_income': total_income,
+        'total_expenses': total_expenses,
+        'balance': balance,
+        'savings_rate': balance / total_income * 100 if total_income > 0 else 0
+    }
+
+
+# The dashboard never shows userId, so it is left out of the recent records
+RECENT_PROJECTION = {'userId': 0}
+
+
+def recent_query(user_id):
+    """The (filter, sort) used for the newest transactions of one kind"""
+    return {'userId': ObjectId(user_id)}, [('createdAt', DESCENDING), ('_id', DESCENDING)]
+
+
+def merge_recent(batches, limit):
+    """
+    Merge per-kind lists that are each newest first into one list of limit records.
+
+    batches is a list of (kind, records) pairs.
+    """
+    tagged = [[dict(record, type=kind) for record in records] for kind, records in batches]
+    merged = heapq.merge(*tagged, key=lambda record: (record['createdAt'], record['_id']), reverse=True)
+    return [serialize_record(record) for record in islice(merged, limit)]
+
+
+def dashboard_summary(db, user_id, recent=DEFAULT_RECENT):
+    summary = fold_totals(db[ROLLUP_COLLECTION].find(*totals_query(user_id)))
+
+    batches = []
+    if recent:
+        query, sort = recent_query(user_id)
+        for kind, collection_name in RECENT_SOURCES:
+            batches.append((kind, list(db[collection_name].find(query, RECENT_PROJECTION).sort(sort).limit(recent))))
+    summary['recent_transactions'] = merge_recent(batches, recent)
+    return summary
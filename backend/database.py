@@ -0,0 +1,88 @@
+"""
+Lazy, per-process MongoDB client.
+
+MongoClient is not fork-safe, so nothing is connected when the app is
+imported or created. The client is built on first use in each process,
+which means every gunicorn worker gets its own connection pool after the
+fork. Pool size and timeouts come from the app config.
+"""
+
+import os
+import threading
+
+from pymongo import MongoClient
+from werkzeug.local import LocalProxy
+
+DEFAULT_DATABASE = 'finwise_db'
+
+
+def client_options(settings):
+    """MongoClient keyword arguments from a config mapping"""
+    return {
+        'maxPoolSize': settings['MONGODB_MAX_POOL_SIZE'],
+        'minPoolSize': settings['MONGODB_MIN_POOL_SIZE'],
+        'waitQueueTimeoutMS': settings['MONGODB_WAIT_QUEUE_TIMEOUT_MS'],
+        'serverSelectionTimeoutMS': settings['MONGODB_SERVER_SELECTION_TIMEOUT_MS'],
+        'connectTimeoutMS': settings['MONGODB_CONNECT_TIMEOUT_MS']
+    }
+
+
+def connect(uri, name=None):
+    """A database for the command line tools: name, else the one the URI names"""
+    client = MongoClient(uri)
+    return client[name] if name else client.get_default_database(DEFAULT_DATABASE)
+
+
+def supports_transactions(client):
+    topology = getattr(client, 'topology_description', None)
+    return getattr(topology, 'topology_type_name', None) in ('ReplicaSetWithPrimary', 'Sharded', 'LoadBalanced')
+
+
+def run_atomically(client, callback):
+    """Run callback(session) in a transaction when the deployment has them, else callback(None)"""
+    if not supports_transactions(client):
+        return callback(None)
+    with client.start_session() as session:
+        return session.with_transaction(callback)
+
+
+class Database:
+    def __init__(self, app=None):
+        self.uri = None
+        self.options = {}
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.uri = app.config['MONGODB_URI']
+        self.options = client_options(app.config)
+        app.extensions['finwise_db'] = self
+        self.close()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # A client inherited across fork is abandoned, not closed,
+                # since its sockets belong to the parent
+                self._client = MongoClient(self.uri, **self.options)
+                self._pid = os.getpid()
+            return self._client
+
+    @property
+    def db(self):
+        return self.client.get_default_database(DEFAULT_DATABASE)
+
+    def collection(self, name):
+        """A proxy to a collection that resolves the client on each use"""
+        return LocalProxy(lambda: self.db[name])
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
@@ -0,0 +1,105 @@
+"""
+Conditional GETs keyed on a per-user data version.
+
+Every write to a user's income or expenses bumps a counter in the
+data_versions collection. Read routes wrapped in conditional() derive a
+strong ETag from that counter, the user, the request and any time period
+the payload depends on. A matching If-None-Match gets a 304 after a single
+_id lookup, and the route's own queries never run. Responses are marked
+Cache-Control: private, no-cache, so browsers keep them but revalidate
+every time.
+"""
+
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from bson.objectid import ObjectId
+from flask import g, make_response, request
+
+import metrics
+
+VERSION_COLLECTION = 'data_versions'
+CACHE_CONTROL = 'private, no-cache'
+
+
+def bump_version(db, user_id):
+    """Invalidate every ETag issued to user_id"""
+    db[VERSION_COLLECTION].update_one(
+        {'_id': ObjectId(user_id)},
+        {'$inc': {'version': 1}, '$set': {'updatedAt': datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def current_version(db, user_id):
+    doc = db[VERSION_COLLECTION].find_one({'_id': ObjectId(user_id)})
+    return doc['version'] if doc else 0
+
+
+def recent_logins(db, since, limit):
+    """Ids of the users who most recently signed in since `since`, newest first"""
+    # Tokens expire daily, so anyone using the app signs in at least that often
+    rows = db['users'].find({'lastLoginAt': {'$gte': since}}, {'_id': 1}).sort('lastLoginAt', -1).limit(limit)
+    return [row['_id'] for row in rows]
+
+
+def active_users(db, since, limit):
+    """(user_id, version) of the users who most recently signed in since `since`"""
+    user_ids = recent_logins(db, since, limit)
+    versions = {row['_id']: row['version'] for row in
+                db[VERSION_COLLECTION].find({'_id': {'$in': user_ids}}, {'version': 1})}
+    return [(user_id, versions.get(user_id, 0)) for user_id in user_ids]
+
+
+def make_etag(user_id, version, *parts):
+    """Strong ETag for one representation of a user's data at a version"""
+    digest = hashlib.sha256('|'.join([str(user_id), *map(str, parts)]).encode()).hexdigest()[:20]
+    return f'v{version}-{digest}'
+
+
+def request_etag(user_id, version, period=None):
+    return make_etag(user_id, version, request.full_path, request.headers.get('Accept', ''), period or '')
+
+
+def current_month():
+    return datetime.now().strftime('%Y-%m')
+
+
+def conditional_stats():
+    not_modified = metrics.counter('etag.not_modified')
+    full = metrics.counter('etag.full')
+    total = not_modified + full
+    return {
+        'not_modified': not_modified,
+        'full': full,
+        'not_modified_ratio': round(not_modified / total, 4) if total else 0
+    }
+
+
+def conditional(db, period=None):
+    """
+    Answer If-None-Match from the data version alone.
+
+    Goes after login_required. period, if given, returns a string for the
+    time window the payload covers, so a new month changes the ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = g.data_version = current_version(db, g.user_id)
+            etag = request_etag(g.user_id, version, period() if period else None)
+
+            # Weak comparison, as compressed responses carry a weak ETag
+            if request.if_none_match.contains_weak(etag):
+                metrics.incr('etag.not_modified')
+                return '', 304, {'ETag': f'"{etag}"', 'Cache-Control': CACHE_CONTROL}
+
+            metrics.incr('etag.full')
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = CACHE_CONTROL
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,46 @@
+"""
+Gunicorn settings for the production server.
+
+Everything is read from Config so the same environment variables drive
+run_backend.py and a plain
+`gunicorn -c gunicorn.conf.py "app:create_app('production')"`. The app is
+not preloaded: each worker builds it after the fork and opens its own
+MongoDB pool, OCR pool and caches. create_app() also creates any missing
+indexes. Send SIGHUP to the master (or run
+`run_backend.py --reload`) for a graceful reload.
+"""
+
+import threading
+
+from config import Config
+
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS
+worker_class = 'gthread'
+threads = Config.SERVER_THREADS
+keepalive = Config.SERVER_KEEPALIVE
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+max_requests = Config.SERVER_MAX_REQUESTS
+max_requests_jitter = Config.SERVER_MAX_REQUESTS_JITTER
+pidfile = Config.SERVER_PIDFILE
+preload_app = False
+accesslog = '-'
+
+
+def post_worker_init(worker):
+    # The in-process result cache starts empty in every worker, so warm it
+    # in the background without holding up the first requests. Async
+    # workers serve the Starlette app, whose result cache is that of the
+    # sync app mounted behind it.
+    if not Config.RESULT_CACHE_WARM_ON_START:
+        return
+    from flask import Flask
+    from app import warm_result_cache
+    flask_app = worker.wsgi if isinstance(worker.wsgi, Flask) else worker.wsgi.state.sync_app
+
+    def warm():
+        with flask_app.app_context():
+            warm_result_cache()
+
+    threading.Thread(target=warm, name='warm-result-cache', daemon=True).start()
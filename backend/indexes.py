@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Index bootstrap and query-plan diagnostics for the FinWise collections.
+
+ensure_indexes() is run when the server starts. Running this module
+directly creates the indexes and, with --check, explains every query the
+API routes issue and exits non-zero if any of them falls back to a
+collection scan.
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from werkzeug.datastructures import MultiDict
+
+from admin_users import directory_query, usage_stats_pipeline
+from dashboard import RECENT_PROJECTION, RECENT_SOURCES, recent_query, totals_query
+from database import connect
+from etags import VERSION_COLLECTION
+from pagination import EXPENSE_FIELDS, INCOME_FIELDS, build_list_query, encode_cursor, parse_list_args
+from precompute import PRECOMPUTED_COLLECTION, stored_query
+from rollups import ROLLUP_COLLECTION, recommendation_query
+from trends import history_query, recent_expenses_pipeline
+from user_deletion import CHILD_COLLECTIONS, OWNERS_PIPELINE
+from visualization import bucket_pipeline, default_chart, parse_chart_args, rollup_query
+
+# Transaction indexes lead with userId and end with _id so the keyset
+# pagination sort (date, _id) is served straight from the index.
+INDEXES = {
+    'users': [
+        IndexModel([('email', ASCENDING)], unique=True, name='email_unique'),
+        # Prefix search in the admin directory
+        IndexModel([('emailLower', ASCENDING)], name='emailLower'),
+        IndexModel([('nameLower', ASCENDING)], name='nameLower'),
+        IndexModel([('lastNameLower', ASCENDING)], name='lastNameLower'),
+        # Users part way through deletion, found by the sweeper
+        IndexModel([('deletingAt', ASCENDING)], sparse=True, name='deletingAt'),
+        # Recently signed-in users, for the nightly batch and cache warming
+        IndexModel([('lastLoginAt', DESCENDING)], sparse=True, name='lastLoginAt')
+    ],
+    'admins': [
+        IndexModel([('adminName', ASCENDING)], unique=True, name='adminName_unique')
+    ],
+    'income': [
+        IndexModel([('userId', ASCENDING), ('date', DESCENDING), ('_id', DESCENDING)], name='userId_date'),
+        IndexModel([('userId', ASCENDING), ('createdAt', DESCENDING), ('_id', DESCENDING)], name='userId_createdAt')
+    ],
+    'expenses': [
+        IndexModel([('userId', ASCENDING), ('date', DESCENDING), ('_id', DESCENDING)], name='userId_date'),
+        IndexModel([('userId', ASCENDING), ('createdAt', DESCENDING), ('_id', DESCENDING)], name='userId_createdAt'),
+        IndexModel([('userId', ASCENDING), ('category', ASCENDING), ('date', DESCENDING)], name='userId_category_date')
+    ],
+    'monthly_rollups': [
+        IndexModel([('userId', ASCENDING), ('kind', ASCENDING), ('month', ASCENDING), ('category', ASCENDING)],
+                   unique=True, name='userId_kind_month_category')
+    ],
+    'user_deletions': [
+        IndexModel([('expiresAt', ASCENDING)], expireAfterSeconds=0, name='expiresAt_ttl')
+    ],
+    'receipt_jobs': [
+        IndexModel([('expiresAt', ASCENDING)], expireAfterSeconds=0, name='expiresAt_ttl')
+    ],
+    'receipt_cache': [
+        IndexModel([('expiresAt', ASCENDING)], expireAfterSeconds=0, name='expiresAt_ttl')
+    ]
+}
+
+
+def ensure_indexes(db):
+    """Create any missing indexes. Existing indexes are left untouched"""
+    created = {}
+    for collection_name, models in INDEXES.items():
+        created[collection_name] = db[collection_name].create_indexes(models)
+    return created
+
+
+def route_queries(db, user_id=None):
+    """
+    The queries issued by the API routes, as (name, explain function) pairs.
+
+    Queries are built with the same builders the routes call, so a change to
+    a route's query is checked here without being copied. Each explain
+    function returns the raw explain document for its query.
+    """
+    user_id = user_id or ObjectId()
+    position = encode_cursor({'date': datetime.now(), '_id': ObjectId()})
+    recent, by_created = recent_query(user_id)
+    month_ago = datetime.utcnow() - timedelta(days=30)
+
+    def explain_find(collection, query, sort=None, projection=None):
+        def run():
+            cursor = db[collection].find(query, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            return cursor.limit(1).explain()
+        return run
+
+    def explain_aggregate(collection, pipeline):
+        def run():
+            return db.command('aggregate', collection, pipeline=pipeline, explain=True)
+        return run
+
+    def explain_listing(collection, allowed_fields, category_field, args):
+        query, sort, projection = build_list_query(
+            user_id, parse_list_args(MultiDict(args), allowed_fields), category_field)
+        return explain_find(collection, query, sort, projection)
+
+    return [
+        ('register/login: users by email',
+         explain_find('users', {'email': 'probe@example.com'})),
+        ('admin register/login: admins by name',
+         explain_find('admins', {'adminName': 'probe'})),
+        ('GET /api/income',
+         explain_listing('income', INCOME_FIELDS, 'source', {})),
+        ('GET /api/income?before=',
+         explain_listing('income', INCOME_FIELDS, 'source', {'before': position})),
+        ('GET /api/expense',
+         explain_listing('expenses', EXPENSE_FIELDS, 'category', {})),
+        ('GET /api/expense?after=&from=',
+         explain_listing('expenses', EXPENSE_FIELDS, 'category', {'after': position, 'from': '2024-01-01'})),
+        ('GET /api/expense?category=',
+         explain_listing('expenses', EXPENSE_FIELDS, 'category', {'category': 'Rent'})),
+        ('first use: rollups present',
+         explain_find(ROLLUP_COLLECTION, {'userId': user_id}, projection={'_id': 1})),
+        ('GET /api/visualization',
+         explain_find(ROLLUP_COLLECTION, *rollup_query(user_id, default_chart()))),
+        ('GET /api/visualization?granularity=day',
+         explain_aggregate('expenses', bucket_pipeline(user_id, parse_chart_args({'granularity': 'day'})))),
+        ('GET /api/recommendations: totals',
+         explain_find(ROLLUP_COLLECTION, *recommendation_query(user_id))),
+        ('GET /api/recommendations: trend history',
+         explain_find(ROLLUP_COLLECTION, *history_query(user_id))),
+        ('GET /api/recommendations: recent expenses',
+         explain_aggregate('expenses', recent_expenses_pipeline(user_id))),
+        ('GET /api/dashboard/summary: totals',
+         explain_find(ROLLUP_COLLECTION, *totals_query(user_id))),
+        *[(f'GET /api/dashboard/summary: recent {kind}',
+           explain_find(collection_name, recent, by_created, RECENT_PROJECTION))
+          for kind, collection_name in RECENT_SOURCES],
+        ('ETag data version',
+         explain_find(VERSION_COLLECTION, {'_id': user_id})),
+        ('precomputed payload',
+         explain_find(PRECOMPUTED_COLLECTION, *stored_query(user_id, 'recommendations', 0))),
+        ('nightly batch / warm-cache: recent sign-ins',
+         explain_find('users', {'lastLoginAt': {'$gte': month_ago}}, [('lastLoginAt', DESCENDING)])),
+        ('GET /api/admin/users',
+         explain_find('users', directory_query({'q': None, 'before': None}), [('_id', DESCENDING)])),
+        ('GET /api/admin/users?q=',
+         explain_find('users', directory_query({'q': 'probe', 'before': None}), [('_id', DESCENDING)])),
+        ('GET /api/admin/users?stats=1: transaction counts',
+         explain_aggregate(ROLLUP_COLLECTION, usage_stats_pipeline([user_id]))),
+        *[(f'DELETE /api/admin/users: {collection_name}',
+           explain_find(collection_name, {'userId': user_id}, projection={'_id': 1}))
+          for collection_name in CHILD_COLLECTIONS],
+        ('user_deletion sweep: users being deleted',
+         explain_find('users', {'deletingAt': {'$exists': True}})),
+        ('user_deletion sweep: expense owners',
+         explain_aggregate('expenses', OWNERS_PIPELINE))
+    ]
+
+
+def plan_stages(node):
+    """Yield every stage name found in the winning plans of an explain document"""
+    if isinstance(node, dict):
+        if 'stage' in node:
+            yield node['stage']
+        for key, value in node.items():
+            if key in ('rejectedPlans', 'allPlansExecution'):
+                continue
+            yield from plan_stages(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from plan_stages(item)
+
+
+def find_collscans(db):
+    """Return (name, stages) for every route query whose plan scans a collection"""
+    offenders = []
+    for name, explain in route_queries(db):
+        stages = list(plan_stages(explain()))
+        if 'COLLSCAN' in stages:
+            offenders.append((name, stages))
+    return offenders
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Create FinWise indexes and verify query plans')
+    parser.add_argument('--uri', default=Config.MONGODB_URI, help='MongoDB connection string')
+    parser.add_argument('--database', help='Database name, if not the one in the URI')
+    parser.add_argument('--check', action='store_true', help='Fail if any route query uses COLLSCAN')
+    args = parser.parse_args()
+
+    db = connect(args.uri, args.database)
+
+    for collection_name, names in ensure_indexes(db).items():
+        print(f"✅ {collection_name}: {', '.join(names)}")
+
+    if not args.check:
+        return
+
+    offenders = find_collscans(db)
+    for name, stages in offenders:
+        print(f"❌ {name} uses a collection scan: {' -> '.join(stages)}")
+    if offenders:
+        sys.exit(1)
+    print('✅ No route query falls back to COLLSCAN')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+Income and expense document builders and bulk ingestion.
+
+The single-record routes and the bulk routes share the same builders, so a
+row is validated the same way however it arrives. Bulk bodies may be JSON,
+CSV or NDJSON; CSV and NDJSON are read from the request stream and
+inserted in chunks, so a large import never sits in memory all at once.
+"""
+
+import codecs
+import csv
+import json
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+from werkzeug.exceptions import BadRequest
+
+import rollups
+
+CHUNK_SIZE = 1000
+MAX_BULK_ROWS = 50000
+
+INCOME_FREQUENCIES = {'monthly', 'yearly', 'one-time'}
+
+
+def _required(data, field):
+    value = data.get(field)
+    if value is None or value == '':
+        raise ValueError(f'{field} is required')
+    return value
+
+
+def _amount(data):
+    value = _required(data, 'amount')
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('amount must be a number')
+    if amount < 0:
+        raise ValueError('amount must not be negative')
+    return amount
+
+
+def _date(data):
+    value = _required(data, 'date')
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError('date must be in YYYY-MM-DD format')
+
+
+def build_income_doc(user_id, data):
+    """Validate an income payload and return the document to insert"""
+    frequency = _required(data, 'frequency')
+    if frequency not in INCOME_FREQUENCIES:
+        raise ValueError(f'frequency must be one of {", ".join(sorted(INCOME_FREQUENCIES))}')
+    return {
+        'userId': ObjectId(user_id),
+        'source': _required(data, 'source'),
+        'amount': _amount(data),
+        'frequency': frequency,  # monthly, yearly, one-time
+        'date': _date(data),
+        'description': data.get('description') or '',
+        'createdAt': datetime.utcnow()
+    }
+
+
+def build_expense_doc(user_id, data):
+    """Validate an expense payload and return the document to insert"""
+    return {
+        'userId': ObjectId(user_id),
+        'category': _required(data, 'category'),
+        'amount': _amount(data),
+        'date': _date(data),
+        'description': data.get('description') or '',
+        'merchant': data.get('merchant') or '',
+        'createdAt': datetime.utcnow()
+    }
+
+
+BUILDERS = {
+    'income': build_income_doc,
+    'expense': build_expense_doc
+}
+
+
+def iter_rows(request, chunk_size=64 * 1024):
+    """
+    Yield row dicts from a bulk request body.
+
+    JSON bodies are either a list of rows or {"rows": [...]}. CSV bodies
+    need a header line. NDJSON bodies hold one JSON object per line. Rows
+    that cannot be decoded are yielded as exceptions so they still get a
+    per-row error. A body that stops decoding part way raises ValueError.
+    """
+    mimetype = request.mimetype
+
+    if mimetype == 'application/json':
+        try:
+            body = request.get_json()
+        except BadRequest:
+            raise ValueError('Malformed JSON body')
+        rows = body.get('rows') if isinstance(body, dict) else body
+        if not isinstance(rows, list):
+            raise ValueError('Expected a list of rows')
+        yield from rows
+        return
+
+    # Decode the stream incrementally so multi-byte characters split across
+    # chunks survive and only one chunk is buffered at a time
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+
+    def lines():
+        pending = ''
+        try:
+            while True:
+                chunk = request.stream.read(chunk_size)
+                if not chunk:
+                    break
+                pending += decoder.decode(chunk)
+                *complete, pending = pending.split('\n')
+                yield from complete
+            pending += decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            raise ValueError('Body must be UTF-8 encoded')
+        if pending:
+            yield pending
+
+    if mimetype in ('application/x-ndjson', 'application/jsonl'):
+        for line in lines():
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield ValueError('Malformed JSON line')
+        return
+
+    if mimetype == 'text/csv':
+        reader = csv.DictReader(line for line in lines() if line.strip())
+        try:
+            for row in reader:
+                yield {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        except csv.Error as e:
+            raise ValueError(f'Malformed CSV: {e}')
+        return
+
+    raise ValueError('Unsupported content type, use JSON, CSV or NDJSON')
+
+
+def _insert_chunk(db, collection, kind, chunk, result):
+    """Insert a chunk of (row index, document) pairs and record the outcome"""
+    docs = [doc for _, doc in chunk]
+    failed = {}
+    try:
+        collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get('writeErrors', []):
+            failed[error['index']] = error.get('errmsg', 'Insert failed')
+
+    inserted = []
+    for position, (row, doc) in enumerate(chunk):
+        if position in failed:
+            result['errors'].append({'row': row, 'error': failed[position]})
+        else:
+            result['inserted_rows'].append(row)
+            inserted.append(doc)
+
+    rollups.record_transactions(db, kind, inserted)
+
+
+def _read(rows, result):
+    """Number the rows, stopping with result['error'] set if the body cannot be read further"""
+    try:
+        yield from enumerate(rows)
+    except ValueError as e:
+        result['error'] = str(e)
+
+
+def ingest_rows(db, collection, kind, user_id, rows):
+    """
+    Validate and insert rows in unordered chunks.
+
+    Returns {'inserted': n, 'failed': n, 'inserted_rows': [...], 'errors': [...]}
+    where row numbers are zero-based positions in the request body. If the
+    body itself turns out to be unreadable, the valid rows before that point
+    are still inserted and the result also holds 'error'.
+    """
+    build = BUILDERS[kind]
+    result = {'inserted_rows': [], 'errors': []}
+    chunk = []
+    rollups.ensure_user_rollups(db, user_id)
+
+    for row, data in _read(rows, result):
+        if row >= MAX_BULK_ROWS:
+            result['errors'].append({'row': row, 'error': f'Row limit of {MAX_BULK_ROWS} exceeded'})
+            break
+        try:
+            if isinstance(data, Exception):
+                raise data
+            if not isinstance(data, dict):
+                raise ValueError('Row must be an object')
+            chunk.append((row, build(user_id, data)))
+        except (KeyError, TypeError, ValueError) as e:
+            result['errors'].append({'row': row, 'error': str(e)})
+
+        if len(chunk) >= CHUNK_SIZE:
+            _insert_chunk(db, collection, kind, chunk, result)
+            chunk = []
+
+    if chunk:
+        _insert_chunk(db, collection, kind, chunk, result)
+
+    result['errors'].sort(key=lambda error: error['row'])
+    result['inserted'] = len(result['inserted_rows'])
+    result['failed'] = len(result['errors'])
+    return result
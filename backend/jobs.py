@@ -0,0 +1,241 @@
+"""
+Background job queue for receipt OCR.
+
+Uploads are handed to a process pool so Tesseract and PDF parsing never
+run on a request thread. Each job is watched by a coordinator thread that
+enforces the per-job timeout and writes the outcome to MongoDB, so any
+server process can answer a status poll. The number of queued and running
+jobs per process is bounded; submit() raises QueueFull beyond that.
+
+A job that times out has its pool's worker processes terminated, since a
+stuck Tesseract call would otherwise keep burning a core. Other jobs on
+that pool fail with a retryable error and later jobs get a fresh pool.
+Jobs left pending by a server that stopped are marked failed by
+fail_stale() on startup, and by get() when a poll finds one.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+
+PENDING_STATUSES = ('queued', 'running')
+# Allowance on top of the job timeout before a running job counts as orphaned
+STALE_GRACE = 30  # seconds
+INTERRUPTED_ERROR = 'Processing was interrupted, please upload the receipt again'
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at its configured depth"""
+
+
+class JobContext:
+    """
+    Handed to a coordinated task while it runs.
+
+    The task fans work out to the process pool with submit(), collects it
+    with result(), which honours the job deadline, and can publish partial
+    results with progress().
+    """
+
+    def __init__(self, queue, job_id, pool, deadline):
+        self.queue = queue
+        self.job_id = job_id
+        self.pool = pool
+        self.deadline = deadline
+
+    @property
+    def workers(self):
+        return self.queue.workers
+
+    def submit(self, fn, *args):
+        return self.pool.submit(fn, *args)
+
+    def result(self, future):
+        return future.result(timeout=max(0, self.deadline - time.monotonic()))
+
+    def progress(self, items=None, **fields):
+        """Set fields on the job document and append items to its items list"""
+        update = {}
+        if fields:
+            update['$set'] = fields
+        if items:
+            update['$push'] = {'items': {'$each': items}}
+        if update:
+            self.queue.collection.update_one({'_id': self.job_id}, update)
+
+
+def run_in_pool(context, fn, *args):
+    """Default task: run fn(*args) on one pool worker"""
+    return context.result(context.submit(fn, *args))
+
+
+class ReceiptJobQueue:
+    def __init__(self, collection, workers=2, max_depth=32, timeout=60, result_ttl=3600, poll_interval=0.25):
+        self.collection = collection
+        self.workers = workers
+        self.max_depth = max_depth
+        self.timeout = timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._events = {}
+        self._pid = None
+        self._pool = None
+        self._coordinators = None
+
+    def _executors(self):
+        # Pools are created lazily and per process so forked servers never share one
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._coordinators = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='receipt-job')
+                self._pid = os.getpid()
+                self._depth = 0
+                self._events = {}
+            return self._pool, self._coordinators
+
+    def _replace_pool(self, pool, terminate=False):
+        # A crashed worker breaks the whole pool and a timed-out task keeps
+        # its worker busy, so later jobs get a fresh pool. On a timeout the
+        # old pool's processes are terminated, as the stuck task cannot be
+        # cancelled any other way.
+        with self._lock:
+            if self._pool is pool:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        if terminate:
+            for process in list((getattr(pool, '_processes', None) or {}).values()):
+                if process.is_alive():
+                    process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def stale_query(self, now=None):
+        """Pending jobs that no live process can still be working on"""
+        now = now or datetime.utcnow()
+        # A queued job waits at most for the jobs ahead of it in a full queue
+        queued_for = self.timeout * (self.max_depth // max(self.workers, 1) + 1) + STALE_GRACE
+        return {'$or': [
+            {'status': 'running', 'startedAt': {'$lt': now - timedelta(seconds=self.timeout + STALE_GRACE)}},
+            {'status': 'queued', 'createdAt': {'$lt': now - timedelta(seconds=queued_for)}}
+        ]}
+
+    def fail_stale(self):
+        """Mark jobs orphaned by a stopped server as failed. Returns the number marked"""
+        return self.collection.update_many(self.stale_query(), {'$set': {
+            'status': 'failed',
+            'error': INTERRUPTED_ERROR,
+            'finishedAt': datetime.utcnow()
+        }}).modified_count
+
+    @property
+    def depth(self):
+        return self._depth
+
+    def submit(self, user_id, fn, *args, on_done=None):
+        """Queue fn(*args) on the process pool and return the job id"""
+        return self.submit_task(user_id, run_in_pool, fn, *args, on_done=on_done)
+
+    def submit_task(self, user_id, task, *args, on_done=None):
+        """
+        Queue task(context, *args) on a coordinator thread and return the job id.
+
+        The task gets a JobContext to spread work over the process pool.
+        on_done(result) is called on the coordinator thread after a
+        successful run.
+        """
+        _, coordinators = self._executors()
+
+        with self._lock:
+            if self._depth >= self.max_depth:
+                raise QueueFull()
+            self._depth += 1
+
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        try:
+            self.collection.insert_one({
+                '_id': job_id,
+                'userId': ObjectId(user_id),
+                'status': 'queued',
+                'createdAt': now,
+                'expiresAt': now + timedelta(seconds=self.result_ttl)
+            })
+            event = threading.Event()
+            self._events[job_id] = event
+            coordinators.submit(self._run, job_id, event, task, args, on_done)
+        except Exception:
+            with self._lock:
+                self._depth -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id, event, task, args, on_done):
+        try:
+            self.collection.update_one({'_id': job_id}, {'$set': {
+                'status': 'running',
+                'startedAt': datetime.utcnow()
+            }})
+            pool = self._pool
+            context = JobContext(self, job_id, pool, time.monotonic() + self.timeout)
+            try:
+                update = {'status': 'done', 'result': task(context, *args)}
+            except FutureTimeout:
+                self._replace_pool(pool, terminate=True)
+                update = {'status': 'failed', 'error': f'Processing timed out after {self.timeout}s'}
+            except BrokenProcessPool:
+                # Replaced already when another job on the pool timed out
+                stopped = self._pool is not pool
+                self._replace_pool(pool)
+                update = {'status': 'failed', 'error': 'Receipt worker was restarted, please try again'
+                          if stopped else 'Receipt worker crashed'}
+            except Exception as e:
+                update = {'status': 'failed', 'error': str(e)}
+
+            update['finishedAt'] = datetime.utcnow()
+            self.collection.update_one({'_id': job_id}, {'$set': update})
+            if on_done and update['status'] == 'done':
+                on_done(update['result'])
+        finally:
+            with self._lock:
+                self._depth -= 1
+            self._events.pop(job_id, None)
+            event.set()
+
+    def get(self, job_id, user_id, wait=0):
+        """
+        Return the job document owned by user_id, or None.
+
+        With wait > 0 this long-polls until the job finishes or wait seconds
+        pass. Jobs running in this process are awaited on an event; jobs
+        from other processes are re-read every poll_interval.
+        """
+        query = {'_id': job_id, 'userId': ObjectId(user_id)}
+        deadline = time.monotonic() + wait
+
+        event = self._events.get(job_id)
+        if event is not None and wait > 0:
+            event.wait(wait)
+
+        job = self.collection.find_one(query)
+        while job and job['status'] in PENDING_STATUSES and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            job = self.collection.find_one(query)
+
+        if job and job['status'] in PENDING_STATUSES and job_id not in self._events:
+            # Not ours; fail it if its process is evidently gone
+            if self.collection.update_one({**query, **self.stale_query()}, {'$set': {
+                'status': 'failed',
+                'error': INTERRUPTED_ERROR,
+                'finishedAt': datetime.utcnow()
+            }}).modified_count:
+                job = self.collection.find_one(query)
+        return job
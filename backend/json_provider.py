@@ -0,0 +1,45 @@
+"""
+orjson-backed JSON encoding for Flask and the async app.
+
+ObjectId is encoded as its hex string. datetime and date are encoded
+natively by orjson: naive datetimes come out in isoformat() form, and dates
+as YYYY-MM-DD. Records can therefore go straight from pymongo to the
+encoder without a per-field conversion pass in Python.
+"""
+
+import orjson
+from bson.objectid import ObjectId
+from flask.json.provider import JSONProvider
+
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(obj, sort_keys=False, indent=False):
+    """Encode obj to JSON bytes"""
+    option = orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=_default, option=option)
+
+
+class OrjsonProvider(JSONProvider):
+    # Same key order as Flask's default provider
+    sort_keys = True
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys)).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Like Flask's default provider, responses are indented in debug mode
+        body = dumps(obj, sort_keys=self.sort_keys, indent=self._app.debug)
+        return self._app.response_class(body, mimetype='application/json')
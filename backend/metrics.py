@@ -0,0 +1,51 @@
+"""
+Process-local metrics exposed on GET /api/admin/metrics.
+
+Modules either bump named counters, record timings, or register a
+provider callable that returns a dict of their own stats when a snapshot
+is taken.
+"""
+
+import os
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = {}
+_providers = {}
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def counter(name):
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def observe(name, milliseconds):
+    """Record one duration sample under name"""
+    with _lock:
+        count, total, peak = _timings.get(name, (0, 0.0, 0.0))
+        _timings[name] = (count + 1, total + milliseconds, max(peak, milliseconds))
+
+
+def register(name, provider):
+    """Include provider() under name in every snapshot"""
+    _providers[name] = provider
+
+
+def snapshot():
+    with _lock:
+        counters = dict(_counters)
+        timings = {
+            name: {'count': count, 'avg_ms': round(total / count, 3), 'max_ms': round(peak, 3)}
+            for name, (count, total, peak) in _timings.items()
+        }
+    data = {'pid': os.getpid(), 'counters': counters, 'timings': timings}
+    for name, provider in _providers.items():
+        data[name] = provider()
+    return data
@@ -0,0 +1,223 @@
+"""
+Keyset pagination helpers for the income and expense listings.
+
+Records are ordered newest first on (date, _id). A cursor encodes the
+(date, _id) pair of a boundary record, so fetching the next page is an
+index range scan instead of a skip over everything already sent.
+"""
+
+import base64
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from json_provider import dumps
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 500
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Values of ?format=; columnar sends parallel arrays instead of one object per record
+RESPONSE_FORMATS = [None, 'json', 'ndjson', 'columnar']
+
+# Fields a listing may select with ?fields=
+INCOME_FIELDS = {'source', 'amount', 'frequency', 'date', 'description', 'createdAt', 'userId'}
+EXPENSE_FIELDS = {'category', 'amount', 'date', 'description', 'merchant', 'createdAt', 'userId'}
+
+
+def encode_cursor(record):
+    """Encode the (date, _id) position of a record as an opaque token"""
+    raw = f"{record['date'].isoformat()}|{record['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(token):
+    """Decode a cursor token back into a (date, ObjectId) pair"""
+    try:
+        raw = base64.urlsafe_b64decode(token.encode()).decode()
+        date_part, id_part = raw.split('|', 1)
+        return datetime.fromisoformat(date_part), ObjectId(id_part)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def _parse_day(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'{name} must be in YYYY-MM-DD format')
+
+
+def parse_list_args(args, allowed_fields):
+    """
+    Validate the listing query string.
+
+    Returns a dict with limit, before, after, date_from, date_to,
+    categories, fields, format and stream. Raises ValueError on bad input.
+    """
+    response_format = args.get('format') or None
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(RESPONSE_FORMATS[1:])}")
+
+    params = {
+        'limit': None,
+        'before': None,
+        'after': None,
+        'date_from': None,
+        'date_to': None,
+        'categories': [],
+        'fields': None,
+        'format': response_format,
+        'stream': response_format == 'ndjson'
+    }
+
+    if 'limit' in args:
+        try:
+            limit = int(args['limit'])
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        params['limit'] = min(limit, MAX_PAGE_SIZE)
+
+    if args.get('before') and args.get('after'):
+        raise ValueError('Use either before or after, not both')
+    if args.get('before'):
+        params['before'] = decode_cursor(args['before'])
+    if args.get('after'):
+        params['after'] = decode_cursor(args['after'])
+
+    # Cursor navigation without an explicit limit gets the default page size
+    if params['limit'] is None and (params['before'] or params['after']):
+        params['limit'] = DEFAULT_PAGE_SIZE
+
+    if args.get('from'):
+        params['date_from'] = _parse_day(args['from'], 'from')
+    if args.get('to'):
+        params['date_to'] = _parse_day(args['to'], 'to')
+
+    for value in args.getlist('category'):
+        params['categories'].extend(c for c in value.split(',') if c)
+
+    if args.get('fields'):
+        fields = [f for f in args['fields'].split(',') if f]
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        params['fields'] = fields
+
+    return params
+
+
+def build_list_query(user_id, params, category_field='category'):
+    """Build the (filter, sort, projection) triple for a listing request"""
+    query = {'userId': ObjectId(user_id)}
+
+    date_range = {}
+    if params['date_from']:
+        date_range['$gte'] = params['date_from']
+    if params['date_to']:
+        # 'to' is inclusive of the whole day
+        date_range['$lt'] = params['date_to'] + timedelta(days=1)
+    if date_range:
+        query['date'] = date_range
+
+    if params['categories']:
+        query[category_field] = {'$in': params['categories']}
+
+    direction = DESCENDING
+    if params['before'] or params['after']:
+        cursor_date, cursor_id = params['before'] or params['after']
+        op = '$lt' if params['before'] else '$gt'
+        query = {'$and': [query, {'$or': [
+            {'date': {op: cursor_date}},
+            {'date': cursor_date, '_id': {op: cursor_id}}
+        ]}]}
+        if params['after']:
+            # Walk forward from the cursor, the page is flipped back afterwards
+            direction = ASCENDING
+
+    sort = [('date', direction), ('_id', direction)]
+
+    # userId is the caller's own id, so it is only sent when asked for
+    projection = {'userId': 0}
+    if params['fields']:
+        # date and _id are always needed to build cursors
+        projection = dict.fromkeys(params['fields'], 1)
+        projection.update({'_id': 1, 'date': 1})
+
+    return query, sort, projection
+
+
+def serialize_record(record):
+    """
+    Prepare a transaction record for json_provider.
+
+    The encoder handles ObjectId and datetime itself; only the transaction
+    date is narrowed to a date so it is sent as YYYY-MM-DD.
+    """
+    if 'date' in record:
+        record['date'] = record['date'].date()
+    return record
+
+
+def fetch_page(collection, query, sort, projection, params):
+    """
+    Run a paginated query and return (records, next_cursor, prev_cursor).
+
+    One extra record is fetched to know whether another page exists.
+    """
+    records = list(collection.find(query, projection).sort(sort).limit(params['limit'] + 1))
+    return page_from_records(records, params)
+
+
+def page_from_records(records, params):
+    """Turn up to limit + 1 fetched records into (records, next_cursor, prev_cursor)"""
+    limit = params['limit']
+    has_more = len(records) > limit
+    records = records[:limit]
+    if params['after']:
+        records.reverse()
+
+    if params['after']:
+        # Walking forward: the cursor record itself is older than this page
+        older_remaining, newer_remaining = True, has_more
+    else:
+        older_remaining, newer_remaining = has_more, params['before'] is not None
+
+    next_cursor = None
+    prev_cursor = None
+    if records:
+        if older_remaining:
+            next_cursor = encode_cursor(records[-1])
+        if newer_remaining:
+            prev_cursor = encode_cursor(records[0])
+
+    return [serialize_record(r) for r in records], next_cursor, prev_cursor
+
+
+def to_columns(records):
+    """
+    Pivot serialized records into parallel arrays, one per field.
+
+    Every array has one entry per record, null where a record lacks the field.
+    """
+    fields = dict.fromkeys(field for record in records for field in record)
+    return {field: [record.get(field) for record in records] for field in fields}
+
+
+def listing_payload(key, records, params, cursors=None):
+    """Response body for a listing, in rows or, with format=columnar, columns"""
+    payload = {key: to_columns(records) if params['format'] == 'columnar' else records}
+    if cursors is not None:
+        payload['next_cursor'], payload['prev_cursor'] = cursors
+    return payload
+
+
+def stream_ndjson(cursor):
+    """Yield one JSON line per record straight off a pymongo cursor"""
+    for record in cursor.batch_size(STREAM_BATCH_SIZE):
+        yield dumps(serialize_record(record)) + b'\n'
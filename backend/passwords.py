@@ -0,0 +1,69 @@
+"""
+Password hashing with a configurable algorithm and cost.
+
+Hashing and verification run on a small dedicated thread pool. hashlib
+releases the GIL while it works, so the pool caps how many cores a login
+storm can take and leaves the rest for cheap read endpoints. Every server
+process has its own pool, so by default half the cores are split between
+the SERVER_WORKERS processes. Requests beyond the pool's queue limit, or
+still waiting after the timeout, are rejected with HasherBusy instead of
+piling up. Hashes made with other parameters are reported by
+needs_rehash() so they can be replaced after a successful login.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import cached_property
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when too many hash operations are already queued, or one timed out"""
+
+
+def default_workers(server_workers, cores=None):
+    """Half the cores, shared between the server's worker processes, and at least one thread each"""
+    cores = cores or os.cpu_count() or 2
+    return max(1, cores // 2 // max(1, server_workers))
+
+
+class PasswordHasher:
+    def __init__(self, method='pbkdf2:sha256:600000', workers=2, queue_limit=64, timeout=10):
+        self.method = method
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+
+    @cached_property
+    def prefix(self):
+        # Werkzeug expands short forms such as 'pbkdf2' to their full
+        # parameters, so derive the canonical prefix from a real hash.
+        # Computed on first use to keep imports fast.
+        return generate_password_hash('', self.method).split('$', 1)[0]
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # The hash keeps its slot until it finishes, so the pool stays bounded
+            raise HasherBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """True when stored_hash was made with different parameters"""
+        return stored_hash.split('$', 1)[0] != self.prefix
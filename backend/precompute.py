@@ -0,0 +1,216 @@
+"""
+Nightly precomputation of the recommendation and visualization payloads.
+
+run_batch.py (next to run_backend.py) takes every user who signed in
+within the last BATCH_ACTIVE_DAYS days, whether or not they wrote
+anything. It splits them into chunks of BATCH_CHUNK_SIZE and hands the
+chunks to a process pool. Each chunk costs three queries however many
+users it holds: their data versions, all their rollup rows, and one
+aggregation of their recent expenses. Every payload is then built from
+those rows in memory. Users without rollup rows are skipped: they have no
+data yet, or have not been backfilled, and are computed live.
+
+Payloads are stored encoded, one document per user in precomputed_payloads,
+together with the user's data version (read before the data) and a
+computedAt timestamp. On a result cache miss the API serves the stored
+payload when:
+- the version still matches, so there has been no write since;
+- the period is unchanged, so the month has not rolled over;
+- it is younger than PRECOMPUTE_MAX_AGE.
+Otherwise it computes the payload live, as before.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from bson.binary import Binary
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne
+
+import metrics
+import rollups
+import trends
+import visualization
+from analytics import build_recommendations, month_bounds
+from etags import VERSION_COLLECTION, recent_logins
+from json_provider import dumps
+
+PRECOMPUTED_COLLECTION = 'precomputed_payloads'
+RUNS_COLLECTION = 'batch_runs'
+
+
+def payload_periods(now=None):
+    """The period each payload covers, as used in ETags and result cache keys"""
+    now = now or datetime.now()
+    return {
+        'recommendations': now.strftime('%Y-%m'),
+        'visualization': visualization.period_key(visualization.default_chart(now))
+    }
+
+
+def split_rollup_rows(rows, now=None):
+    """
+    Sort one user's rollup rows into (recommendation, chart, history) rows.
+
+    Mirrors rollups.recommendation_query, visualization.rollup_query for the
+    default chart and trends.history_query, so the payloads match the live ones.
+    """
+    start, _ = month_bounds(now)
+    this_month = rollups.month_key(start)
+    chart = visualization.default_chart(now)
+    first, end = rollups.month_key(chart['start']), rollups.month_key(chart['end'])
+
+    recommendation, chart_rows, history = [], [], []
+    for row in rows:
+        if row['kind'] == 'income':
+            if row['category'] in ('monthly', 'yearly'):
+                recommendation.append(row)
+            continue
+        history.append(row)
+        if row['month'] == this_month:
+            recommendation.append(row)
+        if first <= row['month'] < end:
+            chart_rows.append(row)
+    return recommendation, chart_rows, history
+
+
+def build_payloads(rows, month_docs, now=None):
+    """Both payloads for one user from their rollup rows and recent expense arrays"""
+    recommendation, chart_rows, history = split_rollup_rows(rows, now)
+    return {
+        'recommendations': build_recommendations(rollups.fold_recommendation_rows(recommendation),
+                                                 trends.analyze(history, month_docs, now)),
+        'visualization': visualization.fold_rollup_rows(chart_rows, visualization.default_chart(now))
+    }
+
+
+def compute_chunk(db, user_ids, now=None):
+    """Compute and store the payloads of a chunk of users. Returns the number stored"""
+    now = now or datetime.now()
+    periods = payload_periods(now)
+
+    # Versions are read before the data, so a write that races the batch
+    # leaves a stale version behind and the stored payload is never served
+    versions = {row['_id']: row['version'] for row in
+                db[VERSION_COLLECTION].find({'_id': {'$in': user_ids}}, {'version': 1})}
+    rows = {user_id: [] for user_id in user_ids}
+    for row in db[rollups.ROLLUP_COLLECTION].find({'userId': {'$in': user_ids}},
+                                                  {'userId': 1, 'kind': 1, 'month': 1, 'category': 1, 'total': 1}):
+        rows[row['userId']].append(row)
+    month_docs = {user_id: [] for user_id in user_ids}
+    for doc in db['expenses'].aggregate(trends.chunk_recent_expenses_pipeline(user_ids, now)):
+        month_docs[doc['_id']['userId']].append(doc)
+
+    computed_at = datetime.utcnow()
+    writes = []
+    for user_id in user_ids:
+        if not rows[user_id]:
+            # Empty payloads would be wrong for a user whose rollups were never backfilled
+            continue
+        payloads = build_payloads(rows[user_id], month_docs[user_id], now)
+        writes.append(ReplaceOne({'_id': user_id}, {
+            'version': versions.get(user_id, 0),
+            'computedAt': computed_at,
+            'payloads': {
+                name: {'period': periods[name], 'body': Binary(dumps(payload, sort_keys=True))}
+                for name, payload in payloads.items()
+            }
+        }, upsert=True))
+    if writes:
+        db[PRECOMPUTED_COLLECTION].bulk_write(writes, ordered=False)
+    return len(writes)
+
+
+def stored_query(user_id, name, version):
+    """The (filter, projection) of a user's stored payload at a data version"""
+    return {'_id': ObjectId(user_id), 'version': version}, {f'payloads.{name}': 1, 'computedAt': 1}
+
+
+def fresh_body(doc, name, period, max_age):
+    """The encoded payload from a stored document, unless it is too old or for another period"""
+    body = None
+    if doc and doc['computedAt'] >= datetime.utcnow() - timedelta(seconds=max_age):
+        stored = doc['payloads'].get(name)
+        if stored and stored['period'] == period:
+            body = bytes(stored['body'])
+    metrics.incr('precomputed.served' if body is not None else 'precomputed.missed')
+    return body
+
+
+def load_payload(db, user_id, name, version, period, max_age):
+    """The stored payload bytes if still fresh, else None"""
+    doc = db[PRECOMPUTED_COLLECTION].find_one(*stored_query(user_id, name, version))
+    return fresh_body(doc, name, period, max_age)
+
+
+def precompute_stats():
+    served = metrics.counter('precomputed.served')
+    missed = metrics.counter('precomputed.missed')
+    total = served + missed
+    return {
+        'served': served,
+        'missed': missed,
+        'served_ratio': round(served / total, 4) if total else 0
+    }
+
+
+_worker_db = None
+
+
+def _init_worker(config_name):
+    # Each pool process opens its own client after the fork
+    global _worker_db
+    from pymongo import MongoClient
+
+    from config import config
+    from database import DEFAULT_DATABASE, client_options
+    settings = config[config_name]
+    options = client_options({name: getattr(settings, name) for name in dir(settings) if name.isupper()})
+    client = MongoClient(settings.MONGODB_URI, **options)
+    _worker_db = client.get_default_database(DEFAULT_DATABASE)
+
+
+def _run_chunk(user_ids, now):
+    return compute_chunk(_worker_db, user_ids, now)
+
+
+def run_batch(db, config_name='default', days=30, chunk_size=500, workers=None, progress=None):
+    """
+    Precompute payloads for every user who signed in within days, on a process pool.
+
+    progress(done_users, total_users), if given, is called after each chunk.
+    Returns a summary of the run, which is also stored in batch_runs.
+    """
+    workers = workers or os.cpu_count() or 1
+    now = datetime.now()
+    started_at = datetime.utcnow()
+    start = time.perf_counter()
+
+    # limit 0 means no limit
+    user_ids = recent_logins(db, datetime.utcnow() - timedelta(days=days), 0)
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+
+    done = stored = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config_name,)) as pool:
+        futures = {pool.submit(_run_chunk, chunk, now): len(chunk) for chunk in chunks}
+        for future in as_completed(futures):
+            stored += future.result()
+            done += futures[future]
+            if progress:
+                progress(done, len(user_ids))
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        'startedAt': started_at,
+        'finishedAt': datetime.utcnow(),
+        'users': done,
+        'stored': stored,
+        'chunks': len(chunks),
+        'workers': workers,
+        'seconds': round(elapsed, 3),
+        'users_per_sec': round(done / elapsed, 1) if elapsed else 0
+    }
+    db[RUNS_COLLECTION].insert_one(dict(summary))
+    return summary
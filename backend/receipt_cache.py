@@ -0,0 +1,97 @@
+"""
+Content-hash cache for parsed receipts.
+
+Results are keyed by the SHA-256 of the uploaded bytes and the parser
+version, so a parser change re-parses receipts instead of serving stale
+results. A bounded LRU in memory answers repeat uploads within a process;
+a MongoDB collection with a TTL index shares results between processes and
+restarts.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+def content_digest(stream, chunk_size=64 * 1024):
+    """SHA-256 hex digest of a file-like object, read from the start"""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+class ReceiptCache:
+    def __init__(self, collection, max_entries=512, ttl=7 * 24 * 3600, version=0):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = version
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._store_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def key(self, digest):
+        return f'v{self.version}:{digest}'
+
+    def _remember(self, digest, result):
+        with self._lock:
+            self._entries[digest] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get(self, digest):
+        """Return the cached parse result for digest, or None"""
+        digest = self.key(digest)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(digest)
+                self._hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[digest]
+
+        doc = self.collection.find_one({'_id': digest, 'expiresAt': {'$gt': datetime.utcnow()}})
+        if doc:
+            self._remember(digest, doc['result'])
+            with self._lock:
+                self._store_hits += 1
+            return doc['result']
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, digest, result):
+        digest = self.key(digest)
+        self._remember(digest, result)
+        self.collection.update_one(
+            {'_id': digest},
+            {'$set': {'result': result, 'expiresAt': datetime.utcnow() + timedelta(seconds=self.ttl)}},
+            upsert=True
+        )
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._store_hits + self._misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'memory_hits': self._hits,
+                'store_hits': self._store_hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': (self._hits + self._store_hits) / lookups if lookups else 0
+            }
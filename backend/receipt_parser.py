@@ -0,0 +1,288 @@
+"""
+Receipt and statement text parser.
+
+Every pattern the parser needs is folded into one compiled alternation,
+TOKEN_RE, so each line is scanned exactly once. The scan yields the line's
+keywords (total, subtotal, tax, phone numbers, GSTIN, invoice numbers and
+other noise), its dates and its amounts, and parse_receipt() classifies the
+line from those: noise, a total, subtotal or tax line, or an itemised line,
+while collecting dates and merchant candidates on the way. The total is
+then chosen by keyword priority with fallbacks, and every extracted field
+carries a 0-1 confidence score.
+"""
+
+import re
+from datetime import datetime
+
+# Bump whenever parse_receipt output changes, so cached results are re-parsed
+PARSER_VERSION = 3
+
+MONTHS = {m: i for i, m in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+_MONTH = r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]{0,6}'
+
+# Alternatives are tried in order at each position. They are grouped by
+# their first character, so a position fails after one lookahead for every
+# group but its own. Dates, phone numbers and GSTINs claim their digits
+# before the amount pattern can, longer keywords come before the words they
+# contain, and any other word is consumed whole rather than tried letter by
+# letter. Currency marks need no token: the amount after them is read alone.
+TOKEN_RE = re.compile(
+    r'(?=\d)(?:'
+    # 2024-03-12
+    r'(?P<iso_date>\b(?P<y1>\d{4})[-/.](?P<m1>\d{1,2})[-/.](?P<d1>\d{1,2})\b)'
+    # 12/03/2024, 12-03-24
+    r'|(?P<numeric_date>\b(?P<d2>\d{1,2})[-/.](?P<m2>\d{1,2})[-/.](?P<y2>\d{4}|\d{2})\b)'
+    # 12 Mar 2024, 12-Mar-24
+    rf'|(?P<day_month_date>\b(?P<d3>\d{{1,2}})[\s-](?P<mon3>{_MONTH})[\s,-]+(?P<y3>\d{{4}}|\d{{2}})\b)'
+    r'|(?P<gstin>\b(?-i:\d{2}[A-Z]{5}\d{4}[A-Z][A-Z\d]Z[A-Z\d])\b)'
+    r'|(?P<phone_number>\b[6-9]\d{9}\b|\b0\d{2,4}[\s-]\d{6,8}\b)'
+    r'|(?P<amount>\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d+\.\d{1,2}|\d+)(?![\d/-])'
+    r')|(?=[^\W\d_])(?:'
+    # Mar 12, 2024
+    rf'(?P<month_day_date>\b(?P<mon4>{_MONTH})\s+(?P<d4>\d{{1,2}}),?\s+(?P<y4>\d{{4}})\b)'
+    r'|(?P<phone>\b(?:ph|phone|tel|mob|mobile|contact)\b)'
+    r'|(?P<grand_total>\b(?:grand\s*total|net\s*(?:amount|total|payable)|amount\s*(?:due|payable)|'
+    r'total\s*(?:amount|payable|due)|balance\s*due|bill\s*amount)\b)'
+    r'|(?P<not_money_tax>\btotal\s*tax\b)'
+    r'|(?P<not_money>\btotal\s*(?:qty|quantity|items?|savings?|discount)\b)'
+    r'|(?P<subtotal>\bsub\s*-?\s*total\b)'
+    r'|(?P<total>\btotal\b)'
+    r'|(?P<tax_invoice>\btax\s*invoice\b)'
+    r'|(?P<tax>\b(?:c?gst|sgst|igst|utgst|vat|cess|service\s*tax|tax)\b)'
+    r'|(?P<reference>\b(?:gstin|fssai|pan|cin|invoice\s*(?:no|#)|bill\s*(?:no|#)|order\s*(?:no|id|#)|'
+    r'receipt\s*(?:no|#)|txn|upi\s*ref|card\s*(?:no|ending)|a/?c\s*no|table|token|hsn)\b)'
+    r'|(?P<date_keyword>\b(?:date|dt|dated)\b)'
+    r'|(?P<address>\b(?:road|rd\.?|street|st\.|nagar|colony|sector|floor|near|opp\.?|lane|main|cross|'
+    r'layout|pin\s*code)\b)'
+    r'|(?P<header>\b(?:invoice|receipt|bill|cash\s*memo|welcome|thank\s*you|original|duplicate|copy)\b)'
+    r'|[^\W\d_]+'
+    r')|(?P<intl_phone>\+91[\s-]?\d)',
+    re.IGNORECASE
+)
+
+# Date token -> (day, month, year groups, confidence), in order of preference
+DATE_TOKENS = {
+    'iso_date': ('d1', 'm1', 'y1', 0.9),
+    'numeric_date': ('d2', 'm2', 'y2', 0.85),
+    'day_month_date': ('d3', 'mon3', 'y3', 0.9),
+    'month_day_date': ('d4', 'mon4', 'y4', 0.9)
+}
+DATE_RANKS = {name: rank for rank, name in enumerate(DATE_TOKENS)}
+# Keywords a token stands for, when more than its own name
+IMPLIES = {
+    'phone_number': ('phone',),
+    'intl_phone': ('phone',),
+    'grand_total': ('grand_total', 'total'),
+    'subtotal': ('subtotal', 'total'),
+    'not_money_tax': ('not_money', 'total', 'tax'),
+    'not_money': ('not_money', 'total'),
+    'tax_invoice': ('header', 'tax')
+}
+NOISE = {'gstin', 'phone', 'reference'}
+NOT_ITEM = NOISE | {'total', 'tax'}
+NOT_MERCHANT = NOISE | {'header', 'address'}
+
+QTY_PRICE_RE = re.compile(r'(?P<qty>\d+(?:\.\d+)?)\s*[xX@*]\s*(?:₹|Rs\.?)?\s*(?P<price>\d[\d,]*(?:\.\d{1,2})?)')
+# Each run of spaces has one way to match, so padded columns do not backtrack
+ITEM_RE = re.compile(
+    r'^\s*(?P<description>[^A-Za-z]*[A-Za-z].*?)\s+(?:(?:₹|Rs\.?)\s*)?(?P<amount>\d[\d,]*\.\d{2})\s*$'
+)
+
+
+def _to_float(value):
+    return float(value.replace(',', ''))
+
+
+def _token_date(match, kind):
+    day, month, year, _ = DATE_TOKENS[kind]
+    month = match.group(month)
+    month = MONTHS[month[:3].lower()] if month.isalpha() else int(month)
+    year = int(match.group(year))
+    if year < 100:
+        year += 2000
+    try:
+        return datetime(year, month, int(match.group(day)))
+    except ValueError:
+        return None
+
+
+def _scan(line):
+    """
+    Scan a line once. Returns (keywords, date, date confidence, date span, amount text).
+
+    The date is the first valid one in DATE_TOKENS order, and the amount is
+    the right-most one outside any date, ignoring the qty x price part.
+    """
+    keywords = set()
+    date, date_kind, span = None, None, None
+    amount = None
+    for match in TOKEN_RE.finditer(line):
+        kind = match.lastgroup
+        if kind is None:
+            continue
+        if kind == 'amount':
+            amount = match.group()
+            if len(amount) == 6 and amount.isdigit():
+                # Six digits on their own read as a PIN code
+                keywords.add('address')
+        elif kind in DATE_TOKENS:
+            if date_kind is None or DATE_RANKS[kind] < DATE_RANKS[date_kind]:
+                found = _token_date(match, kind)
+                if found:
+                    date, date_kind, span = found, kind, match.span()
+        else:
+            keywords.update(IMPLIES.get(kind, (kind,)))
+    confidence = DATE_TOKENS[date_kind][3] if date_kind else 0
+    return keywords, date, confidence, span, amount
+
+
+def _without(line, span):
+    return line[:span[0]] + ' ' + line[span[1]:] if span else line
+
+
+def parse_line_items(text, page=None):
+    """Lines that end in an amount and are not totals, taxes or reference numbers"""
+    items = []
+    for line in text.splitlines():
+        keywords, found, _, span, _ = _scan(line)
+        item = _item(_without(line, span), keywords)
+        if item:
+            if found:
+                item['date'] = found.strftime('%d/%m/%Y')
+            item['page'] = page
+            items.append(item)
+    return items
+
+
+def _item(line, keywords):
+    if keywords & NOT_ITEM:
+        return None
+    match = ITEM_RE.match(line)
+    if not match:
+        return None
+    description = match.group('description').strip()
+    item = {'description': description, 'amount': _to_float(match.group('amount'))}
+    qty = QTY_PRICE_RE.search(description)
+    if qty:
+        item['quantity'] = float(qty.group('qty'))
+        item['unit_price'] = _to_float(qty.group('price'))
+        item['description'] = description[:qty.start()].strip() or description
+    return item
+
+
+def _merchant_candidate(line, index, keywords):
+    """Score a header line as the merchant name, or return 0"""
+    stripped = line.strip()
+    if len(stripped) > 48 or keywords & NOT_MERCHANT:
+        return 0
+    if sum(map(str.isalpha, stripped)) < 3 or ITEM_RE.match(stripped):
+        return 0
+    score = 0.7 - 0.1 * index
+    if stripped.isupper():
+        score += 0.2
+    return max(0.1, min(score, 0.95))
+
+
+def parse_receipt(text, header_lines=6):
+    """
+    Parse receipt text into amount, date, merchant, subtotal, tax and items.
+
+    Returns a dict; confidence maps each field to a 0-1 score and is 0 for
+    fields that fell back to a default. A receipt without a date has date
+    None; with_default_date() fills in today when the result is served.
+    """
+    grand_totals = []
+    totals = []
+    subtotal = None
+    taxes = []
+    items = []
+    loose_amounts = []
+    loose_integers = []
+    date, date_confidence = None, 0
+    merchant, merchant_confidence = None, 0
+
+    for index, line in enumerate(text.splitlines()):
+        if not line.strip():
+            continue
+
+        keywords, found, confidence, span, amount_text = _scan(line)
+
+        if index < header_lines:
+            score = _merchant_candidate(line, index, keywords)
+            if score > merchant_confidence:
+                merchant, merchant_confidence = line.strip(), score
+
+        if found:
+            if 'date_keyword' in keywords:
+                confidence = 0.95
+            if confidence > date_confidence:
+                date, date_confidence = found, confidence
+
+        # Reference numbers, phone numbers and GSTINs are never the total
+        if keywords & NOISE or amount_text is None:
+            continue
+        amount = _to_float(amount_text)
+
+        if 'subtotal' in keywords:
+            subtotal = amount
+        elif 'not_money' in keywords:
+            if 'tax' in keywords:
+                taxes.append(amount)
+        elif 'grand_total' in keywords:
+            grand_totals.append(amount)
+        elif 'total' in keywords:
+            totals.append(amount)
+        elif 'tax' in keywords:
+            taxes.append(amount)
+        else:
+            # Date digits must not be read as part of an item
+            line = _without(line, span)
+            item = _item(line, keywords)
+            if item:
+                items.append(item)
+            elif '.' in amount_text:
+                loose_amounts.append(amount)
+            elif 'address' not in keywords:
+                # Whole numbers are also quantities, units and years
+                loose_integers.append(amount)
+
+    tax = round(sum(taxes), 2) if taxes else None
+
+    # Later totals win: receipts print the payable figure at the bottom
+    if grand_totals:
+        amount, amount_confidence = grand_totals[-1], 0.95
+    elif totals:
+        amount, amount_confidence = totals[-1], 0.85
+    elif subtotal is not None:
+        amount, amount_confidence = round(subtotal + (tax or 0), 2), 0.7
+    elif items:
+        amount, amount_confidence = round(sum(item['amount'] for item in items), 2), 0.5
+    elif loose_amounts:
+        amount, amount_confidence = max(loose_amounts), 0.3
+    elif loose_integers:
+        amount, amount_confidence = max(loose_integers), 0.2
+    else:
+        amount, amount_confidence = 0, 0
+
+    return {
+        'amount': amount,
+        'date': date.strftime('%d/%m/%Y') if date else None,
+        'merchant': merchant,
+        'subtotal': subtotal,
+        'tax': tax,
+        'items': items,
+        'confidence': {
+            'amount': amount_confidence,
+            'date': date_confidence,
+            'merchant': round(merchant_confidence, 2)
+        },
+        'raw_text': text
+    }
+
+
+def with_default_date(result, now=None):
+    """A copy of a parse result with today's date if none was found"""
+    if result.get('date'):
+        return result
+    return {**result, 'date': (now or datetime.now()).strftime('%d/%m/%Y')}
@@ -0,0 +1,193 @@
+"""
+Receipt text extraction and parsing.
+
+These functions run inside the OCR worker processes, so they live in
+their own module that the workers can import without pulling in the
+Flask app.
+"""
+
+import io
+import logging
+import os
+import uuid
+
+import PyPDF2
+import pytesseract
+from PIL import Image
+from PyPDF2.errors import PyPdfError
+
+from receipt_parser import parse_line_items, parse_receipt
+
+log = logging.getLogger(__name__)
+
+# What reading a scanned page's images can raise: bad or unsupported image
+# streams, images Pillow cannot identify, and Tesseract failures
+OCR_ERRORS = (PyPdfError, NotImplementedError, OSError, Image.DecompressionBombError, pytesseract.TesseractError)
+
+
+def open_source(source):
+    """
+    Return a binary file object for a receipt source.
+
+    Small uploads arrive as bytes and are read from memory; large ones are
+    spooled to disk by the server and arrive as a path.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return open(source, 'rb')
+
+
+class ExtractionError(Exception):
+    """A receipt whose text could not be read; the job fails with this message"""
+
+
+def _page_text(page, number):
+    """Text layer of a PDF page, falling back to OCR of its images for scans"""
+    text = page.extract_text() or ''
+    if text.strip():
+        return text
+
+    parts = []
+    try:
+        for image_file in page.images:
+            with Image.open(io.BytesIO(image_file.data)) as image:
+                parts.append(pytesseract.image_to_string(image))
+    except OCR_ERRORS as e:
+        # An unreadable page should not sink the rest of the document
+        log.warning('OCR of page %d images failed: %r', number + 1, e)
+    return '\n'.join(parts)
+
+
+def pdf_page_count(source):
+    try:
+        with open_source(source) as file:
+            return len(PyPDF2.PdfReader(file).pages)
+    except PyPdfError as e:
+        raise ExtractionError('Could not read the PDF receipt') from e
+
+
+def spool_source(data, directory):
+    """Write in-memory upload bytes to a uniquely named file and return its path"""
+    path = os.path.join(directory, f'{uuid.uuid4().hex}.pdf')
+    with open(path, 'wb') as file:
+        file.write(data)
+    return path
+
+
+def extract_page_range(source, start, stop):
+    """Text of pages [start, stop), run inside a worker process"""
+    with open_source(source) as file:
+        reader = PyPDF2.PdfReader(file)
+        stop = min(stop, len(reader.pages))
+        return [_page_text(reader.pages[number], number) for number in range(start, stop)]
+
+
+def iter_pdf_pages(source, max_pages=None):
+    """Yield (page number, text) one page at a time"""
+    with open_source(source) as file:
+        reader = PyPDF2.PdfReader(file)
+        for number, page in enumerate(reader.pages):
+            if max_pages is not None and number >= max_pages:
+                break
+            yield number, _page_text(page, number)
+
+
+# Extract text from PDF
+def extract_text_from_pdf(source, max_pages=None):
+    try:
+        return '\n'.join(text for _, text in iter_pdf_pages(source, max_pages))
+    except Exception as e:
+        raise ExtractionError('Could not read the PDF receipt') from e
+
+
+# Extract text from image using OCR
+def extract_text_from_image(source):
+    try:
+        with open_source(source) as file:
+            image = Image.open(file)
+            text = pytesseract.image_to_string(image)
+        return text
+    except Exception as e:
+        raise ExtractionError('Could not read the receipt image') from e
+
+
+# Parse expense data from extracted text
+def parse_expense_data(text):
+    return parse_receipt(text)
+
+
+def receipt_kind(filename):
+    """Return 'pdf' or 'image' for a supported receipt filename, else None"""
+    name = filename.lower()
+    if name.endswith('.pdf'):
+        return 'pdf'
+    if name.endswith(('.jpg', '.jpeg', '.png')):
+        return 'image'
+    return None
+
+
+def process_receipt(source):
+    """Extract and parse one receipt image, removing a spooled file afterwards"""
+    try:
+        return parse_expense_data(extract_text_from_image(source))
+    finally:
+        if isinstance(source, str) and os.path.exists(source):
+            os.remove(source)
+
+
+def process_pdf(context, source, chunk_size=8, max_pages=100, spool_dir=None):
+    """
+    Coordinate page-parallel extraction of a PDF job.
+
+    Runs on a job coordinator thread. Pages are split into chunks that run
+    across the process pool, with at most two chunks per worker in flight.
+    Chunks are collected in page order so line items are published to the
+    job as each one lands, and the text is joined once at the end.
+
+    The page count is read on a worker too, so a malformed document is
+    bound by the job timeout. A PDF that fits in one chunk stays in memory;
+    a larger in-memory one is first spooled to spool_dir, so each chunk
+    sends the workers a path and a page range rather than the whole document.
+    """
+    futures = []
+    try:
+        total = context.result(context.submit(pdf_page_count, source))
+        pages = min(total, max_pages) if max_pages else total
+        if pages > chunk_size and spool_dir and not isinstance(source, str):
+            source = spool_source(source, spool_dir)
+        starts = iter(range(0, pages, chunk_size))
+        max_in_flight = max(1, context.workers * 2)
+
+        texts = []
+        line_items = []
+        while True:
+            while len(futures) < max_in_flight:
+                start = next(starts, None)
+                if start is None:
+                    break
+                futures.append(context.submit(extract_page_range, source, start, min(start + chunk_size, pages)))
+            if not futures:
+                break
+
+            chunk = context.result(futures.pop(0))
+            first_page = len(texts) + 1
+            texts.extend(chunk)
+            items = []
+            for offset, text in enumerate(chunk):
+                items.extend(parse_line_items(text, page=first_page + offset))
+            line_items.extend(items)
+            context.progress(items=items, pagesDone=len(texts), pages=pages)
+
+        result = parse_expense_data('\n'.join(texts))
+        result.update({
+            'pages': total,
+            'pages_processed': pages,
+            'truncated': pages < total,
+            'line_items': line_items
+        })
+        return result
+    finally:
+        for future in futures:
+            future.cancel()
+        if isinstance(source, str) and os.path.exists(source):
+            os.remove(source)
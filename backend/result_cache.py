@@ -0,0 +1,184 @@
+"""
+Per-user cache of computed JSON payloads.
+
+The recommendation and visualization payloads are cached as encoded JSON,
+so a hit skips both the rollup query and serialisation. Keys carry the
+user's data version (see etags.py) and the period the payload covers.
+A write makes the old entries unreachable in every process at once, and
+the writing process also drops them right away to free memory.
+
+Two backends are available:
+
+- MemoryBackend (default): an in-process LRU bounded by a byte budget.
+- RedisBackend: a shared cache. It takes any redis-py compatible client,
+  so a local stand-in such as fakeredis can replace the server in tests.
+  Its memory budget is Redis's own maxmemory with an LRU eviction policy.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl, user_id):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + ttl, value, user_id)
+            self._by_user.setdefault(user_id, set()).add(key)
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete_user(self, user_id):
+        with self._lock:
+            keys = list(self._by_user.get(user_id, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def _remove(self, key):
+        _, value, user_id = self._entries.pop(key)
+        self.bytes -= len(value)
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+    def stats(self):
+        return {
+            'backend': 'memory',
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+class RedisBackend:
+    def __init__(self, client, prefix='finwise:results:'):
+        self.client = client
+        self.prefix = prefix
+
+    def _user_index(self, user_id):
+        return f'{self.prefix}user:{user_id}'
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl, user_id):
+        index = self._user_index(user_id)
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, value, ex=ttl)
+        pipe.sadd(index, key)
+        pipe.expire(index, ttl)
+        pipe.execute()
+
+    def delete_user(self, user_id):
+        index = self._user_index(user_id)
+        keys = self.client.smembers(index)
+        if keys:
+            self.client.delete(*[self.prefix + (k.decode() if isinstance(k, bytes) else k) for k in keys])
+        self.client.delete(index)
+        return len(keys)
+
+    def stats(self):
+        stats = {'backend': 'redis', 'keys': self.client.dbsize()}
+        try:
+            memory = self.client.info('memory')
+            stats.update(used_memory=memory.get('used_memory'), maxmemory=memory.get('maxmemory'),
+                         evicted_keys=self.client.info('stats').get('evicted_keys'))
+        except Exception:
+            # Stand-ins such as fakeredis do not implement INFO
+            pass
+        return stats
+
+
+class ResultCache:
+    def __init__(self, backend, ttl=3600):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(user_id, version, name, period):
+        return f'{name}:{user_id}:{version}:{period}'
+
+    def get(self, user_id, version, name, period):
+        """Return the cached payload bytes, or None"""
+        value = self.backend.get(self.key(user_id, version, name, period))
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return value
+
+    def set(self, user_id, version, name, period, value):
+        self.backend.set(self.key(user_id, version, name, period), value, self.ttl, str(user_id))
+
+    def fetch(self, user_id, version, name, period, compute):
+        """Return the cached payload bytes, or compute(), store and return them"""
+        value = self.get(user_id, version, name, period)
+        if value is None:
+            value = compute()
+            self.set(user_id, version, name, period, value)
+        return value
+
+    def invalidate_user(self, user_id):
+        removed = self.backend.delete_user(str(user_id))
+        with self._lock:
+            self.invalidations += removed
+        return removed
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0,
+            'invalidated': self.invalidations,
+            **self.backend.stats()
+        }
+
+
+def make_result_cache(settings):
+    """Build the cache configured by the RESULT_CACHE_* entries of a config mapping"""
+    if settings['RESULT_CACHE_BACKEND'] == 'redis':
+        import redis
+        backend = RedisBackend(redis.Redis.from_url(settings['RESULT_CACHE_REDIS_URL']))
+    elif settings['RESULT_CACHE_BACKEND'] == 'memory':
+        backend = MemoryBackend(settings['RESULT_CACHE_MAX_BYTES'])
+    else:
+        raise ValueError(f"Unknown RESULT_CACHE_BACKEND {settings['RESULT_CACHE_BACKEND']!r}")
+    return ResultCache(backend, ttl=settings['RESULT_CACHE_TTL'])
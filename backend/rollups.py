@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Monthly rollups of income and expenses.
+
+One document per (userId, kind, month, category) holds the running total
+and count for that bucket. Writes keep it current with $inc upserts, so
+the visualization and recommendation endpoints read a few rollup rows
+instead of every transaction. For income the category is the frequency,
+which is what the recommendations need.
+
+On a replica set or sharded cluster, a single insert and its rollup update
+commit in one transaction. On a standalone server, and for bulk imports,
+they are separate writes, so a crash between them leaves the rollups
+behind the raw data until the next rebuild. check finds such drift.
+
+Users whose transactions predate the rollups have no rollup rows, so
+ensure_user_rollups() backfills a user from raw data before their first
+rollup read or write. Anyone importing straight into MongoDB must rebuild.
+Run directly to rebuild the rollups from raw data or to check them:
+
+    python rollups.py rebuild [--user USER_ID]
+    python rollups.py check [--user USER_ID]
+
+A full rebuild writes into a staging collection and renames it over the
+live one, so readers never see an empty or half-built rollup collection.
+"""
+
+import argparse
+import sys
+
+from bson.objectid import ObjectId
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+from analytics import month_bounds
+from database import connect, run_atomically
+
+ROLLUP_COLLECTION = 'monthly_rollups'
+STAGING_COLLECTION = 'monthly_rollups_rebuild'
+
+# Raw collection and the field used as the rollup category for each kind
+SOURCES = {
+    'expense': ('expenses', 'category'),
+    'income': ('income', 'frequency')
+}
+
+
+def month_key(date):
+    return date.strftime('%Y-%m')
+
+
+def rollup_change(kind, doc, sign=1):
+    """Return the (filter, update) that folds one transaction into its bucket"""
+    category_field = SOURCES[kind][1]
+    bucket = {
+        'userId': doc['userId'],
+        'kind': kind,
+        'month': month_key(doc['date']),
+        'category': doc[category_field]
+    }
+    return bucket, {'$inc': {'total': sign * doc['amount'], 'count': sign}}
+
+
+def record_transaction(db, kind, doc, session=None):
+    """Fold a newly inserted income or expense document into the rollups"""
+    bucket, change = rollup_change(kind, doc)
+    db[ROLLUP_COLLECTION].update_one(bucket, change, upsert=True, session=session)
+
+
+def insert_transaction(db, kind, doc):
+    """Insert an income or expense document and fold it into the rollups, in one transaction where possible"""
+    ensure_user_rollups(db, doc['userId'])
+
+    def write(session):
+        result = db[SOURCES[kind][0]].insert_one(doc, session=session)
+        record_transaction(db, kind, doc, session)
+        return result
+    return run_atomically(db.client, write)
+
+
+def record_transactions(db, kind, docs):
+    """Fold many documents into the rollups with one bulk write"""
+    if docs:
+        updates = [UpdateOne(*rollup_change(kind, doc), upsert=True) for doc in docs]
+        db[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+
+
+def delete_user_rollups(db, user_id):
+    db[ROLLUP_COLLECTION].delete_many({'userId': ObjectId(user_id)})
+
+
+def recommendation_query(user_id, now=None):
+    """The (filter, projection) of the rollup rows behind the recommendations"""
+    start, _ = month_bounds(now)
+    return {
+        'userId': ObjectId(user_id),
+        '$or': [
+            {'kind': 'income', 'category': {'$in': ['monthly', 'yearly']}},
+            {'kind': 'expense', 'month': month_key(start)}
+        ]
+    }, {'kind': 1, 'category': 1, 'total': 1}
+
+
+def recommendation_totals(db, user_id, now=None):
+    """Monthly income, expenses and expense categories for the recommendations"""
+    return fold_recommendation_rows(db[ROLLUP_COLLECTION].find(*recommendation_query(user_id, now)))
+
+
+def fold_recommendation_rows(rows):
+    income = {}
+    expense_categories = {}
+    for row in rows:
+        bucket = income if row['kind'] == 'income' else expense_categories
+        bucket[row['category']] = bucket.get(row['category'], 0) + row['total']
+
+    monthly_income = income.get('monthly', 0) + income.get('yearly', 0) / 12
+    return {
+        'monthly_income': monthly_income,
+        'monthly_expenses': sum(expense_categories.values()),
+        'expense_categories': expense_categories
+    }
+
+
+def raw_rollups_pipeline(kind, user_id=None):
+    """Aggregate raw transactions into rollup-shaped documents"""
+    category_field = SOURCES[kind][1]
+    match = {'userId': ObjectId(user_id)} if user_id else {}
+    return [
+        {'$match': match},
+        {'$group': {
+            '_id': {
+                'userId': '$userId',
+                'month': {'$dateToString': {'format': '%Y-%m', 'date': '$date'}},
+                'category': f'${category_field}'
+            },
+            'total': {'$sum': '$amount'},
+            'count': {'$sum': 1}
+        }},
+        {'$project': {
+            '_id': 0,
+            'userId': '$_id.userId',
+            'kind': {'$literal': kind},
+            'month': '$_id.month',
+            'category': '$_id.category',
+            'total': 1,
+            'count': 1
+        }}
+    ]
+
+
+def iter_raw_rollups(db, user_id=None):
+    """Rollup documents recomputed from raw data"""
+    for kind, (collection_name, _) in SOURCES.items():
+        yield from db[collection_name].aggregate(raw_rollups_pipeline(kind, user_id), allowDiskUse=True)
+
+
+def _bucket(row):
+    return {field: row[field] for field in ('userId', 'kind', 'month', 'category')}
+
+
+def rebuild_user_rollups(db, user_id):
+    """
+    Recompute one user's rollups in place. Returns the bucket count.
+
+    Buckets are replaced rather than deleted and re-inserted, so the user's
+    rows are never missing; buckets with no raw data left are removed last.
+    """
+    rows = list(iter_raw_rollups(db, user_id))
+    writes = [ReplaceOne(_bucket(row), row, upsert=True) for row in rows]
+    keep = {(row['kind'], row['month'], row['category']) for row in rows}
+    for row in db[ROLLUP_COLLECTION].find({'userId': ObjectId(user_id)}, {'kind': 1, 'month': 1, 'category': 1}):
+        if (row['kind'], row['month'], row['category']) not in keep:
+            writes.append(DeleteOne({'_id': row['_id']}))
+
+    def write(session):
+        if writes:
+            db[ROLLUP_COLLECTION].bulk_write(writes, session=session)
+    run_atomically(db.client, write)
+    return len(rows)
+
+
+def ensure_user_rollups(db, user_id):
+    """
+    Backfill a user's rollups if they have none but do have transactions.
+
+    Once the user has a rollup row this is one indexed lookup. Returns True
+    if the rollups were rebuilt.
+    """
+    user = {'userId': ObjectId(user_id)}
+    if db[ROLLUP_COLLECTION].find_one(user, {'_id': 1}):
+        return False
+    if not any(db[name].find_one(user, {'_id': 1}) for name, _ in SOURCES.values()):
+        return False
+    rebuild_user_rollups(db, user_id)
+    return True
+
+
+def rebuild_rollups(db, user_id=None, batch_size=1000):
+    """Recompute rollups from raw data for one user, or everyone. Returns the bucket count"""
+    if user_id:
+        return rebuild_user_rollups(db, user_id)
+
+    from indexes import INDEXES
+
+    staging = db[STAGING_COLLECTION]
+    staging.drop()
+    staging.create_indexes(INDEXES[ROLLUP_COLLECTION])
+
+    written = 0
+    batch = []
+    for row in iter_raw_rollups(db):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            staging.insert_many(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        staging.insert_many(batch, ordered=False)
+        written += len(batch)
+
+    # Writes that land on the live collection during the rebuild are lost
+    # with it; check reports them and another rebuild picks them up
+    staging.rename(ROLLUP_COLLECTION, dropTarget=True)
+    return written
+
+
+def check_consistency(db, user_id=None, tolerance=0.01):
+    """
+    Compare stored rollups with totals recomputed from raw data.
+
+    Returns a list of (key, expected, actual) tuples, where expected and
+    actual are (total, count) pairs or None when a bucket is missing.
+    """
+    def key(row):
+        return (str(row['userId']), row['kind'], row['month'], row['category'])
+
+    expected = {key(row): (row['total'], row['count']) for row in iter_raw_rollups(db, user_id)}
+
+    scope = {'userId': ObjectId(user_id)} if user_id else {}
+    actual = {}
+    for row in db[ROLLUP_COLLECTION].find(scope):
+        # Buckets emptied by a reversal are harmless
+        if row['count'] != 0:
+            actual[key(row)] = (row['total'], row['count'])
+
+    mismatches = []
+    for bucket in sorted(expected.keys() | actual.keys()):
+        want, got = expected.get(bucket), actual.get(bucket)
+        if want is None or got is None or want[1] != got[1] or abs(want[0] - got[0]) > tolerance:
+            mismatches.append((bucket, want, got))
+    return mismatches
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Rebuild or verify the monthly rollups')
+    parser.add_argument('command', choices=['rebuild', 'check'])
+    parser.add_argument('--uri', default=Config.MONGODB_URI, help='MongoDB connection string')
+    parser.add_argument('--database', help='Database name, if not the one in the URI')
+    parser.add_argument('--user', help='Limit to a single user id')
+    args = parser.parse_args()
+
+    db = connect(args.uri, args.database)
+
+    if args.command == 'rebuild':
+        written = rebuild_rollups(db, args.user)
+        print(f'✅ Rebuilt {written} rollup buckets')
+        return
+
+    mismatches = check_consistency(db, args.user)
+    for bucket, want, got in mismatches:
+        print(f'❌ {bucket}: expected {want}, stored {got}')
+    if mismatches:
+        sys.exit(1)
+    print('✅ Rollups match raw data')
+
+
+if __name__ == '__main__':
+    main()
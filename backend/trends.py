@@ -0,0 +1,240 @@
+"""
+Spending trends over a user's whole history, computed with NumPy.
+
+Two compact inputs feed the analysis, and neither needs one Python dict per
+transaction:
+
+- The expense rollups, one row per (month, category), pivoted into a
+  category x month matrix. The rolling 3/6/12-month baselines,
+  month-over-month deltas, z-score anomalies and rising categories are
+  column operations on that matrix.
+- For recurring-payment detection, the last RECURRING_LOOKBACK months of
+  expenses that name a merchant, grouped by month inside MongoDB into
+  parallel amount, category and merchant arrays. Payments are keyed on
+  merchant, category and whole-rupee amount, and a key seen in at least
+  RECURRING_MIN_MONTHS different months counts as recurring. Without a
+  merchant a payment is ordinary category spending, however regular.
+
+The current month is still in progress. Baselines, deltas and trends
+therefore use complete months only, and anomalies flag spikes only: a
+partial month can already be unusually high but not yet unusually low.
+"""
+
+from datetime import datetime
+
+import numpy as np
+from bson.objectid import ObjectId
+
+from rollups import ROLLUP_COLLECTION
+
+BASELINE_WINDOWS = (3, 6, 12)
+# Complete months of history needed before a category can be called anomalous
+MIN_HISTORY = 3
+ANOMALY_Z = 2.0
+# A category is rising when its 3-month baseline beats its 12-month one by this much
+TREND_THRESHOLD = 0.2
+RECURRING_LOOKBACK = 6
+RECURRING_MIN_MONTHS = 3
+
+
+def month_index(year, month):
+    return year * 12 + month - 1
+
+
+def month_label(index):
+    return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+def history_query(user_id):
+    """The (filter, projection) of every expense rollup row for a user"""
+    return {'userId': ObjectId(user_id), 'kind': 'expense'}, {'month': 1, 'category': 1, 'total': 1}
+
+
+def recent_expenses_pipeline(user_id, now=None):
+    """A user's recent expenses as one document of parallel arrays per month"""
+    return chunk_recent_expenses_pipeline([user_id], now)
+
+
+def chunk_recent_expenses_pipeline(user_ids, now=None):
+    """Recent expenses with a merchant of several users, one document of parallel arrays per (user, month)"""
+    now = now or datetime.now()
+    first = month_index(now.year, now.month) - RECURRING_LOOKBACK
+    return [
+        {'$match': {
+            'userId': {'$in': [ObjectId(user_id) for user_id in user_ids]},
+            'date': {'$gte': datetime(first // 12, first % 12 + 1, 1)},
+            'merchant': {'$nin': [None, '']}
+        }},
+        {'$group': {
+            '_id': {'userId': '$userId', 'year': {'$year': '$date'}, 'month': {'$month': '$date'}},
+            'amount': {'$push': '$amount'},
+            'category': {'$push': '$category'},
+            'merchant': {'$push': '$merchant'}
+        }}
+    ]
+
+
+def expense_matrix(rows, current):
+    """
+    Pivot rollup rows into (categories, first month index, matrix).
+
+    The matrix has one row per category and one column per month, from the
+    first month with data up to and including current.
+    """
+    rows = [row for row in rows if row['total'] and row['month'] <= month_label(current)]
+    if not rows:
+        return [], current, np.zeros((0, 1))
+
+    months = np.array([month_index(int(row['month'][:4]), int(row['month'][5:7])) for row in rows])
+    categories, category_codes = np.unique([row['category'] for row in rows], return_inverse=True)
+    first = int(months.min())
+
+    matrix = np.zeros((len(categories), current - first + 1))
+    np.add.at(matrix, (category_codes, months - first), [row['total'] for row in rows])
+    return categories.tolist(), first, matrix
+
+
+def baselines(history):
+    """Mean monthly spend per category over the last 3, 6 and 12 complete months"""
+    available = history.shape[1]
+    return {
+        window: history[:, -window:].mean(axis=1) if available else np.zeros(history.shape[0])
+        for window in BASELINE_WINDOWS
+    }
+
+
+def month_over_month(categories, first, history):
+    """Change per category between the last two complete months"""
+    if history.shape[1] < 2:
+        return None
+    previous, latest = history[:, -2], history[:, -1]
+    change = latest - previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_pct = np.where(previous > 0, change / previous * 100, np.nan)
+
+    last = first + history.shape[1] - 1
+    changed = np.flatnonzero(change)
+    order = changed[np.argsort(-np.abs(change[changed]))]
+    return {
+        'from': month_label(last - 1),
+        'to': month_label(last),
+        'categories': [{
+            'category': categories[i],
+            'previous': round(float(previous[i]), 2),
+            'current': round(float(latest[i]), 2),
+            'change': round(float(change[i]), 2),
+            'change_pct': None if np.isnan(change_pct[i]) else round(float(change_pct[i]), 1)
+        } for i in order]
+    }
+
+
+def anomalies(categories, current_month, history):
+    """Categories whose spend this month is ANOMALY_Z standard deviations above their last year"""
+    window = history[:, -12:]
+    if window.shape[1] < MIN_HISTORY:
+        return []
+    mean = window.mean(axis=1)
+    std = window.std(axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(std > 0, (current_month - mean) / std, 0)
+
+    flagged = np.flatnonzero(z >= ANOMALY_Z)
+    return [{
+        'category': categories[i],
+        'amount': round(float(current_month[i]), 2),
+        'baseline': round(float(mean[i]), 2),
+        'z_score': round(float(z[i]), 2)
+    } for i in flagged[np.argsort(-z[flagged])]]
+
+
+def rising(categories, history, means):
+    """Categories whose recent 3-month average is well above their 12-month average"""
+    if history.shape[1] < 6:
+        return []
+    short, long = means[3], means[12]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(long > 0, short / long - 1, 0)
+    flagged = np.flatnonzero(growth >= TREND_THRESHOLD)
+    return [{
+        'category': categories[i],
+        'baseline_3m': round(float(short[i]), 2),
+        'baseline_12m': round(float(long[i]), 2),
+        'change_pct': round(float(growth[i]) * 100, 1)
+    } for i in flagged[np.argsort(-growth[flagged])]]
+
+
+def recurring_payments(month_docs):
+    """Payments to the same merchant, in the same category, for the same whole-rupee amount in several months"""
+    month_docs = [doc for doc in month_docs if doc['amount']]
+    if not month_docs:
+        return []
+
+    lengths = [len(doc['amount']) for doc in month_docs]
+    months = np.repeat([month_index(doc['_id']['year'], doc['_id']['month']) for doc in month_docs], lengths)
+    amounts = np.concatenate([np.asarray(doc['amount'], dtype=float) for doc in month_docs])
+
+    # The payee is (merchant, category); -1 marks a blank merchant. Strings
+    # are numbered through a dict, which beats sorting them with np.unique.
+    payee_codes = {}
+    payees = np.fromiter(
+        (payee_codes.setdefault((merchant.strip().lower(), category), len(payee_codes)) if merchant.strip() else -1
+         for doc in month_docs for merchant, category in zip(doc['merchant'], doc['category'])),
+        dtype=np.int64, count=len(amounts)
+    )
+    named = payees >= 0
+    if not named.any():
+        return []
+    payees, amounts, months = payees[named], amounts[named], months[named]
+    payee_names = list(payee_codes)
+
+    # One integer key per (payee, whole-rupee amount)
+    rupees = np.rint(amounts).astype(np.int64)
+    stride = int(rupees.max()) - int(rupees.min()) + 1
+    keys, groups = np.unique(payees * stride + (rupees - rupees.min()), return_inverse=True)
+    key_payees, key_rupees = keys // stride, keys % stride + rupees.min()
+
+    # Distinct (group, month) pairs give the number of months each group appears in
+    span = int(months.max()) + 1
+    pairs = np.unique(groups * span + months)
+    month_counts = np.bincount(pairs // span, minlength=len(keys))
+    last_seen = np.zeros(len(keys), dtype=np.int64)
+    np.maximum.at(last_seen, groups, months)
+    totals = np.bincount(groups, weights=amounts, minlength=len(keys))
+    counts = np.bincount(groups, minlength=len(keys))
+
+    found = np.flatnonzero(month_counts >= RECURRING_MIN_MONTHS)
+    found = found[np.argsort(-key_rupees[found], kind='stable')]
+    return [{
+        'payee': payee_names[key_payees[i]][0],
+        'category': payee_names[key_payees[i]][1],
+        'amount': round(float(totals[i] / counts[i]), 2),
+        'months': int(month_counts[i]),
+        'last_seen': month_label(int(last_seen[i]))
+    } for i in found]
+
+
+def analyze(rollup_rows, recent_month_docs, now=None):
+    """Trend analysis of one user's spending, ready to send as JSON"""
+    now = now or datetime.now()
+    current = month_index(now.year, now.month)
+    categories, first, matrix = expense_matrix(rollup_rows, current)
+    history, current_month = matrix[:, :-1], matrix[:, -1]
+    means = baselines(history)
+
+    return {
+        'baselines': {
+            category: {f'{window}m': round(float(means[window][i]), 2) for window in BASELINE_WINDOWS}
+            for i, category in enumerate(categories)
+        },
+        'month_over_month': month_over_month(categories, first, history),
+        'anomalies': anomalies(categories, current_month, history),
+        'rising': rising(categories, history, means),
+        'recurring': recurring_payments(recent_month_docs)
+    }
+
+
+def expense_trends(db, user_id, now=None):
+    """Run the trend queries for one user against db and analyze them"""
+    rows = db[ROLLUP_COLLECTION].find(*history_query(user_id))
+    month_docs = db['expenses'].aggregate(recent_expenses_pipeline(user_id, now))
+    return analyze(list(rows), list(month_docs), now)
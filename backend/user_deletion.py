@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Background removal of a user and everything they own.
+
+DELETE /api/admin/users/<id> marks the user with deletingAt, which blocks
+sign-in, and hands the removal to a worker thread. Only the request that
+claims the job, with a conditional upsert, queues the work. The worker
+deletes the user's income, expenses and rollups in batches of batch_size
+_ids, pausing between batches so live traffic keeps its share of the
+database. The user document goes last, together with the user's data
+version and precomputed payloads, so a crash at any point leaves the user
+still marked and the work can be resumed. On a replica set or sharded cluster, each
+batch and its progress update commit in one transaction. On a standalone
+server they are separate writes.
+
+Progress lives in the user_deletions collection, keyed by user id, and any
+server process can report it. The sweeper finishes deletions that failed
+or whose worker stopped sending heartbeats. It also removes rows and
+per-user documents whose user no longer exists, such as rows left by the old three-step delete or
+written by a signed-in session during a deletion:
+
+    python user_deletion.py sweep
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import connect, run_atomically
+from etags import VERSION_COLLECTION
+from precompute import PRECOMPUTED_COLLECTION
+from rollups import ROLLUP_COLLECTION
+
+JOB_COLLECTION = 'user_deletions'
+PENDING_STATUSES = ['queued', 'running']
+
+# Collections holding rows owned by a user through userId, deleted in this order
+CHILD_COLLECTIONS = ['income', 'expenses', ROLLUP_COLLECTION]
+# Collections holding one document per user, keyed by the user's _id
+USER_KEYED_COLLECTIONS = [VERSION_COLLECTION, PRECOMPUTED_COLLECTION]
+# Distinct userIds of a child collection; the sort lets the group walk the userId index
+OWNERS_PIPELINE = [
+    {'$sort': {'userId': 1}},
+    {'$group': {'_id': '$userId'}}
+]
+
+
+def public_job(job):
+    """A deletion job as sent to the admin dashboard"""
+    total = sum(job['total'].values())
+    deleted = sum(job['deleted'].values())
+    return {
+        'userId': str(job['_id']),
+        'status': job['status'],
+        'total': job['total'],
+        'deleted': job['deleted'],
+        'progress': round(min(deleted / total, 1), 4) if total else (1 if job['status'] == 'done' else 0),
+        'error': job.get('error'),
+        'createdAt': job['createdAt'],
+        'finishedAt': job.get('finishedAt')
+    }
+
+
+class UserDeleter:
+    def __init__(self, db, batch_size=1000, pause=0.05, workers=1, stale_after=300, result_ttl=86400,
+                 on_deleted=None):
+        self.db = db
+        self.batch_size = batch_size
+        self.pause = pause
+        self.workers = workers
+        self.stale_after = stale_after
+        self.result_ttl = result_ttl
+        self.on_deleted = on_deleted
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+
+    @property
+    def jobs(self):
+        return self.db[JOB_COLLECTION]
+
+    def _pool(self):
+        # Threads do not survive fork, so each process starts its own
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='user-delete')
+                self._pid = os.getpid()
+            return self._executor
+
+    def _job_fields(self, user_id):
+        now = datetime.utcnow()
+        return {
+            'status': 'queued',
+            'total': {name: self.db[name].count_documents({'userId': user_id}) for name in CHILD_COLLECTIONS},
+            'deleted': dict.fromkeys(CHILD_COLLECTIONS, 0),
+            'createdAt': now,
+            'heartbeatAt': now
+        }
+
+    def _new_job(self, user_id):
+        job = {'_id': user_id, **self._job_fields(user_id)}
+        self.jobs.replace_one({'_id': user_id}, job, upsert=True)
+        return job
+
+    def _claim(self, user_id):
+        """
+        Create a new job for user_id unless one is pending, in one write.
+
+        Returns (job, claimed). When a pending job exists, the upsert's
+        insert collides with it on _id and that job is returned unclaimed.
+        """
+        try:
+            job = self.jobs.find_one_and_update(
+                {'_id': user_id, 'status': {'$nin': PENDING_STATUSES}},
+                {
+                    '$set': self._job_fields(user_id),
+                    # What a finished job leaves behind, expiresAt above all
+                    '$unset': {'startedAt': '', 'finishedAt': '', 'expiresAt': '', 'error': ''}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return job, True
+        except DuplicateKeyError:
+            return self.jobs.find_one({'_id': user_id}), False
+
+    def start(self, user_id):
+        """
+        Mark a user for deletion and queue the work.
+
+        Returns the job document, or None if there is no such user. A
+        deletion already in progress is returned as is.
+        """
+        user_id = ObjectId(user_id)
+        marked = self.db['users'].update_one({'_id': user_id}, {'$min': {'deletingAt': datetime.utcnow()}})
+        if not marked.matched_count:
+            return None
+
+        job, claimed = self._claim(user_id)
+        if claimed:
+            self._pool().submit(self.delete, user_id)
+        return job
+
+    def get(self, user_id):
+        return self.jobs.find_one({'_id': ObjectId(user_id)})
+
+    def delete_rows(self, collection_name, user_id, job_id=None):
+        """Delete one user's rows from a collection in throttled batches. Returns the count"""
+        collection = self.db[collection_name]
+        removed = 0
+        while True:
+            ids = [row['_id'] for row in collection.find({'userId': user_id}, {'_id': 1}).limit(self.batch_size)]
+            if not ids:
+                return removed
+
+            def delete_batch(session):
+                count = collection.delete_many({'_id': {'$in': ids}}, session=session).deleted_count
+                if job_id is not None:
+                    self.jobs.update_one({'_id': job_id}, {
+                        '$inc': {f'deleted.{collection_name}': count},
+                        '$set': {'heartbeatAt': datetime.utcnow()}
+                    }, session=session)
+                return count
+
+            removed += run_atomically(self.db.client, delete_batch)
+            time.sleep(self.pause)
+
+    def delete(self, user_id):
+        """Run a deletion job to completion on the calling thread"""
+        try:
+            self.jobs.update_one({'_id': user_id}, {'$set': {
+                'status': 'running',
+                'startedAt': datetime.utcnow(),
+                'heartbeatAt': datetime.utcnow()
+            }})
+            for collection_name in CHILD_COLLECTIONS:
+                self.delete_rows(collection_name, user_id, job_id=user_id)
+
+            def finish(session):
+                now = datetime.utcnow()
+                self.db['users'].delete_one({'_id': user_id}, session=session)
+                # Dropping the data version also makes every ETag issued to the user stale
+                for collection_name in USER_KEYED_COLLECTIONS:
+                    self.db[collection_name].delete_one({'_id': user_id}, session=session)
+                self.jobs.update_one({'_id': user_id}, {'$set': {
+                    'status': 'done',
+                    'finishedAt': now,
+                    'expiresAt': now + timedelta(seconds=self.result_ttl)
+                }}, session=session)
+
+            run_atomically(self.db.client, finish)
+            if self.on_deleted:
+                self.on_deleted(user_id)
+        except Exception as e:
+            self.jobs.update_one({'_id': user_id}, {'$set': {
+                'status': 'failed',
+                'error': str(e),
+                'finishedAt': datetime.utcnow()
+            }})
+
+    def owners(self, collection_name):
+        """Every distinct owner in a collection, read off the userId or _id index"""
+        if collection_name in USER_KEYED_COLLECTIONS:
+            return [row['_id'] for row in self.db[collection_name].find({}, {'_id': 1})]
+        return [row['_id'] for row in self.db[collection_name].aggregate(OWNERS_PIPELINE)]
+
+    def sweep(self):
+        """
+        Finish interrupted deletions and remove rows whose user is gone.
+
+        Returns {'resumed': [user ids], 'orphans': {collection: rows removed}}.
+        """
+        report = {'resumed': [], 'orphans': dict.fromkeys(CHILD_COLLECTIONS + USER_KEYED_COLLECTIONS, 0)}
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+
+        for user in self.db['users'].find({'deletingAt': {'$exists': True}}, {'_id': 1}):
+            job = self.jobs.find_one({'_id': user['_id']})
+            if job and job['status'] in PENDING_STATUSES and job['heartbeatAt'] >= cutoff:
+                # Still being worked on by a live process
+                continue
+            if not job or job['status'] == 'done':
+                self._new_job(user['_id'])
+            self.delete(user['_id'])
+            report['resumed'].append(str(user['_id']))
+
+        for collection_name in CHILD_COLLECTIONS + USER_KEYED_COLLECTIONS:
+            owners = self.owners(collection_name)
+            existing = set()
+            for start in range(0, len(owners), self.batch_size):
+                chunk = owners[start:start + self.batch_size]
+                existing.update(row['_id'] for row in self.db['users'].find({'_id': {'$in': chunk}}, {'_id': 1}))
+            for owner in owners:
+                if owner in existing:
+                    continue
+                if collection_name in USER_KEYED_COLLECTIONS:
+                    report['orphans'][collection_name] += self.db[collection_name].delete_one(
+                        {'_id': owner}).deleted_count
+                else:
+                    report['orphans'][collection_name] += self.delete_rows(collection_name, owner)
+        return report
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Finish interrupted user deletions and remove orphaned rows')
+    parser.add_argument('command', choices=['sweep'])
+    parser.add_argument('--uri', default=Config.MONGODB_URI, help='MongoDB connection string')
+    parser.add_argument('--database', help='Database name, if not the one in the URI')
+    args = parser.parse_args()
+
+    db = connect(args.uri, args.database)
+    deleter = UserDeleter(db, batch_size=Config.USER_DELETE_BATCH_SIZE, pause=Config.USER_DELETE_PAUSE_MS / 1000,
+                          stale_after=Config.USER_DELETE_STALE_AFTER)
+
+    report = deleter.sweep()
+    for user_id in report['resumed']:
+        print(f'✅ Finished deleting user {user_id}')
+    for collection_name, removed in report['orphans'].items():
+        print(f'✅ {collection_name}: removed {removed} orphaned rows')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""
+Expense charts over any date range, bucketed by day, week, month, quarter or year.
+
+GET /api/visualization takes ?from= and ?to= (YYYY-MM-DD, inclusive) and
+?granularity=. With none of them it charts the last 180 days by month, as
+it always has. The range is widened to whole buckets, with weeks starting
+on Monday. Every bucket gets a point, zero if nothing was spent, so series
+line up across ranges and users.
+
+A chart has at most max_points points (VISUALIZATION_MAX_POINTS). A range
+with more buckets at the requested granularity uses the next coarser
+granularity that fits, so five years by day come back as 60 months.
+range.granularity in the response says which one was used. Dates must
+fall between EARLIEST and LATEST.
+
+Month, quarter and year charts are folded from the monthly rollups, which
+hold a few rows per month however many transactions there are. Day and
+week charts group the raw expenses inside MongoDB with $dateTrunc, which
+needs MongoDB 5.0. Their cost grows with the days scanned rather than the
+points drawn, so they also cover at most max_raw_days days
+(VISUALIZATION_MAX_RAW_DAYS): a year by week is about 53 points, while
+two years by week come back by month.
+"""
+
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+
+from rollups import ROLLUP_COLLECTION, month_key
+
+GRANULARITIES = ['day', 'week', 'month', 'quarter', 'year']
+ROLLUP_GRANULARITIES = ('month', 'quarter', 'year')
+DEFAULT_GRANULARITY = 'month'
+DEFAULT_DAYS = 180
+DEFAULT_MAX_POINTS = 200
+# A year by week, with the partial weeks at either end
+DEFAULT_MAX_RAW_DAYS = 385
+EARLIEST = datetime(1970, 1, 1)
+LATEST = datetime(2099, 12, 31)
+
+
+def bucket_start(date, granularity):
+    """Start of the bucket containing date"""
+    day = datetime(date.year, date.month, date.day)
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return datetime(date.year, date.month, 1)
+    if granularity == 'quarter':
+        return datetime(date.year, (date.month - 1) // 3 * 3 + 1, 1)
+    return datetime(date.year, 1, 1)
+
+
+def next_bucket(start, granularity):
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    months = {'month': 1, 'quarter': 3, 'year': 12}[granularity]
+    index = start.year * 12 + start.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def bucket_label(start, granularity):
+    if granularity in ('day', 'week'):
+        return start.strftime('%Y-%m-%d')
+    if granularity == 'month':
+        return start.strftime('%Y-%m')
+    if granularity == 'quarter':
+        return f'{start.year}-Q{(start.month - 1) // 3 + 1}'
+    return str(start.year)
+
+
+def bucket_count(start, end, granularity):
+    """Number of buckets in [start, end), both bucket boundaries"""
+    if granularity == 'day':
+        return (end - start).days
+    if granularity == 'week':
+        return (end - start).days // 7
+    months = (end.year - start.year) * 12 + end.month - start.month
+    return months // {'month': 1, 'quarter': 3, 'year': 12}[granularity]
+
+
+def _parse_day(value, name):
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'{name} must be in YYYY-MM-DD format')
+    if not EARLIEST <= day <= LATEST:
+        raise ValueError(f'{name} must be between {EARLIEST:%Y-%m-%d} and {LATEST:%Y-%m-%d}')
+    return day
+
+
+def _fits(start, end, granularity, max_points, max_raw_days):
+    if bucket_count(start, end, granularity) > max_points:
+        return False
+    return uses_rollups({'granularity': granularity}) or (end - start).days <= max_raw_days
+
+
+def parse_chart_args(args, max_points=DEFAULT_MAX_POINTS, now=None, max_raw_days=DEFAULT_MAX_RAW_DAYS):
+    """
+    Validate the chart query string.
+
+    Returns a dict with start and end (bucket boundaries, end exclusive),
+    granularity and requested_granularity. Raises ValueError on bad input.
+    """
+    now = now or datetime.now()
+    today = datetime(now.year, now.month, now.day)
+
+    requested = args.get('granularity') or DEFAULT_GRANULARITY
+    if requested not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    first = _parse_day(args['from'], 'from') if args.get('from') else today - timedelta(days=DEFAULT_DAYS)
+    last = _parse_day(args['to'], 'to') if args.get('to') else today
+    if first > last:
+        raise ValueError('from must not be after to')
+
+    # Downsample to the first granularity at or above the requested one that fits
+    for granularity in GRANULARITIES[GRANULARITIES.index(requested):]:
+        try:
+            start = bucket_start(first, granularity)
+            end = next_bucket(bucket_start(last, granularity), granularity)
+        except (OverflowError, ValueError):
+            # Bucket edges past datetime's range
+            raise ValueError('Date range is out of range')
+        if _fits(start, end, granularity, max_points, max_raw_days):
+            return {'start': start, 'end': end, 'granularity': granularity, 'requested_granularity': requested}
+    raise ValueError('Date range is too long')
+
+
+def chart_limits(settings):
+    """parse_chart_args keyword arguments from a config mapping"""
+    return {'max_points': settings['VISUALIZATION_MAX_POINTS'], 'max_raw_days': settings['VISUALIZATION_MAX_RAW_DAYS']}
+
+
+def default_chart(now=None):
+    """The chart sent when no parameters are given, also precomputed nightly"""
+    return parse_chart_args({}, now=now)
+
+
+def period_key(params=None):
+    """The range a chart covers, as used in ETags and result cache keys"""
+    params = params or default_chart()
+    return f"{params['start']:%Y-%m-%d}/{params['end']:%Y-%m-%d}/{params['granularity']}"
+
+
+def request_period(args, max_points=DEFAULT_MAX_POINTS, max_raw_days=DEFAULT_MAX_RAW_DAYS):
+    """period_key for a query string. Invalid arguments give '', the view answers them with a 400"""
+    try:
+        return period_key(parse_chart_args(args, max_points, max_raw_days=max_raw_days))
+    except ValueError:
+        return ''
+
+
+def uses_rollups(params):
+    return params['granularity'] in ROLLUP_GRANULARITIES
+
+
+def rollup_query(user_id, params):
+    """The (filter, projection) of the rollup rows behind a month, quarter or year chart"""
+    return {
+        'userId': ObjectId(user_id),
+        'kind': 'expense',
+        'month': {'$gte': month_key(params['start']), '$lt': month_key(params['end'])}
+    }, {'month': 1, 'category': 1, 'total': 1}
+
+
+def bucket_pipeline(user_id, params):
+    """Expense totals per (bucket, category) for a day or week chart"""
+    trunc = {'date': '$date', 'unit': params['granularity']}
+    if params['granularity'] == 'week':
+        trunc['startOfWeek'] = 'monday'
+    return [
+        {'$match': {
+            'userId': ObjectId(user_id),
+            'date': {'$gte': params['start'], '$lt': params['end']}
+        }},
+        {'$group': {
+            '_id': {'bucket': {'$dateTrunc': trunc}, 'category': '$category'},
+            'total': {'$sum': '$amount'}
+        }}
+    ]
+
+
+def build_chart(params, bucket_totals, category_totals):
+    """Format the totals for the dashboard charts, with a point for every bucket"""
+    granularity = params['granularity']
+    labels, data = [], []
+    start = params['start']
+    while start < params['end']:
+        labels.append(bucket_label(start, granularity))
+        data.append(round(bucket_totals.get(start, 0), 2))
+        start = next_bucket(start, granularity)
+
+    categories = sorted(category_totals.items(), key=lambda item: -item[1])
+    return {
+        # Named for the original monthly-only chart; holds one point per bucket
+        'monthly_chart': {'labels': labels, 'data': data},
+        'category_chart': {
+            'labels': [category for category, _ in categories],
+            'data': [round(total, 2) for _, total in categories]
+        },
+        'range': {
+            'from': params['start'].strftime('%Y-%m-%d'),
+            'to': (params['end'] - timedelta(days=1)).strftime('%Y-%m-%d'),
+            'granularity': granularity,
+            'requested_granularity': params['requested_granularity']
+        }
+    }
+
+
+def fold_rollup_rows(rows, params):
+    bucket_totals, category_totals = {}, {}
+    for row in rows:
+        bucket = bucket_start(datetime(int(row['month'][:4]), int(row['month'][5:7]), 1), params['granularity'])
+        bucket_totals[bucket] = bucket_totals.get(bucket, 0) + row['total']
+        category_totals[row['category']] = category_totals.get(row['category'], 0) + row['total']
+    return build_chart(params, bucket_totals, category_totals)
+
+
+def fold_bucket_rows(rows, params):
+    bucket_totals, category_totals = {}, {}
+    for row in rows:
+        bucket = bucket_start(row['_id']['bucket'], params['granularity'])
+        bucket_totals[bucket] = bucket_totals.get(bucket, 0) + row['total']
+        category = row['_id']['category']
+        category_totals[category] = category_totals.get(category, 0) + row['total']
+    return build_chart(params, bucket_totals, category_totals)
+
+
+def chart_data(db, user_id, params=None):
+    """The chart payload for a user, from the rollups or a bucketing aggregation"""
+    params = params or default_chart()
+    if uses_rollups(params):
+        return fold_rollup_rows(db[ROLLUP_COLLECTION].find(*rollup_query(user_id, params)), params)
+    return fold_bucket_rows(db['expenses'].aggregate(bucket_pipeline(user_id, params)), params)
@@ -4,33 +4,80 @@ import axios from 'axios';
 import { toast } from 'react-toastify';
 import './AdminDashboard.css';
 
+const PAGE_SIZE = 50;
+
 const AdminDashboard = () => {
   const [users, setUsers] = useState([]);
+  const [totalUsers, setTotalUsers] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [search, setSearch] = useState('');
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [deletionProgress, setDeletionProgress] = useState({});
   const { admin, logout } = useAuth();
 
+  // Search as the admin types, once they pause
   useEffect(() => {
-    fetchUsers();
-  }, []);
+    const timer = setTimeout(() => fetchUsers(), 300);
+    return () => clearTimeout(timer);
+  }, [search]);
 
-  const fetchUsers = async () => {
+  // Users come a page at a time, newest first; `before` continues after the last page
+  const fetchUsers = async (before = null) => {
     try {
-      const response = await axios.get('/api/admin/users');
-      setUsers(response.data.users);
+      const response = await axios.get('/api/admin/users', {
+        params: { limit: PAGE_SIZE, q: search || undefined, before: before || undefined, stats: 1 }
+      });
+      setUsers(before ? [...users, ...response.data.users] : response.data.users);
+      setNextCursor(response.data.next_cursor);
+      if (response.data.total !== undefined) {
+        setTotalUsers(response.data.total);
+      }
     } catch (error) {
       toast.error('Failed to fetch users');
       console.error('Error fetching users:', error);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
+  const loadMore = () => {
+    setLoadingMore(true);
+    fetchUsers(nextCursor);
+  };
+
+  // Deletion runs in the background on the server; poll until it finishes
+  const watchDeletion = (userId) => {
+    const timer = setInterval(async () => {
+      try {
+        const { deletion } = (await axios.get(`/api/admin/users/${userId}/deletion`)).data;
+        setDeletionProgress((progress) => ({ ...progress, [userId]: deletion.progress }));
+        if (deletion.status === 'done') {
+          clearInterval(timer);
+          toast.success('User deleted successfully');
+          setUsers((current) => current.filter((user) => user._id !== userId));
+          setTotalUsers((total) => total - 1);
+        } else if (deletion.status === 'failed') {
+          clearInterval(timer);
+          toast.error(`Failed to delete user: ${deletion.error}`);
+        }
+      } catch (error) {
+        clearInterval(timer);
+        console.error('Error checking deletion progress:', error);
+      }
+    }, 1000);
+  };
+
   const handleDeleteUser = async (userId, userName) => {
     if (window.confirm(`Are you sure you want to delete user "${userName}"? This action cannot be undone.`)) {
       try {
         await axios.delete(`/api/admin/users/${userId}`);
-        toast.success('User deleted successfully');
-        fetchUsers(); // Refresh the user list
+        toast.info('User deletion started');
+        setUsers((current) => current.map((user) => (
+          user._id === userId ? { ...user, deletingAt: new Date().toISOString() } : user
+        )));
+        watchDeletion(userId);
       } catch (error) {
         toast.error('Failed to delete user');
         console.error('Error deleting user:', error);
@@ -39,6 +86,9 @@ const AdminDashboard = () => {
   };
 
   const formatDate = (dateString) => {
+    if (!dateString) {
+      return '—';
+    }
     return new Date(dateString).toLocaleDateString('en-US', {
       year: 'numeric',
       month: 'short',
@@ -78,20 +128,29 @@ const AdminDashboard = () => {
         <div className="stats-cards">
           <div className="stat-card">
             <h3>Total Users</h3>
-            <p className="stat-number">{users.length}</p>
+            <p className="stat-number">{totalUsers}</p>
           </div>
           <div className="stat-card">
             <h3>Active Users</h3>
-            <p className="stat-number">{users.length}</p>
+            <p className="stat-number">{totalUsers}</p>
           </div>
         </div>
 
         <div className="users-section">
           <div className="section-header">
             <h2>User Management</h2>
-            <button onClick={fetchUsers} className="refresh-btn">
-              Refresh
-            </button>
+            <div className="section-actions">
+              <input
+                type="search"
+                className="user-search"
+                placeholder="Search by name or email"
+                value={search}
+                onChange={(e) => setSearch(e.target.value)}
+              />
+              <button onClick={() => fetchUsers()} className="refresh-btn">
+                Refresh
+              </button>
+            </div>
           </div>
 
           {users.length === 0 ? (
@@ -109,6 +168,8 @@ const AdminDashboard = () => {
                     <th>Gender</th>
                     <th>Date of Birth</th>
                     <th>Joined</th>
+                    <th>Transactions</th>
+                    <th>Last Active</th>
                     <th>Actions</th>
                   </tr>
                 </thead>
@@ -121,18 +182,28 @@ const AdminDashboard = () => {
                       <td>{user.gender}</td>
                       <td>{user.dateOfBirth}</td>
                       <td>{formatDate(user.createdAt)}</td>
+                      <td>{user.income_count + user.expense_count}</td>
+                      <td>{formatDate(user.last_activity)}</td>
                       <td>
                         <button
                           onClick={() => handleDeleteUser(user._id, `${user.firstName} ${user.lastName}`)}
                           className="delete-btn"
+                          disabled={Boolean(user.deletingAt)}
                         >
-                          Delete
+                          {user.deletingAt
+                            ? `Deleting ${Math.round((deletionProgress[user._id] || 0) * 100)}%`
+                            : 'Delete'}
                         </button>
                       </td>
                     </tr>
                   ))}
                 </tbody>
               </table>
+              {nextCursor && (
+                <button onClick={loadMore} className="refresh-btn load-more-btn" disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              )}
             </div>
           )}
         </div>
@@ -32,42 +32,18 @@ const Dashboard = () => {
 
   const fetchDashboardData = async () => {
     try {
-      const [incomeRes, expenseRes] = await Promise.all([
-        axios.get('/api/income'),
-        axios.get('/api/expense')
-      ]);
-
-      const income = incomeRes.data.income || [];
-      const expenses = expenseRes.data.expenses || [];
-
-      // Calculate totals
-      const totalIncome = income.reduce((sum, item) => {
-        if (item.frequency === 'monthly') {
-          return sum + (item.amount * 12);
-        } else if (item.frequency === 'yearly') {
-          return sum + item.amount;
-        }
-        return sum + item.amount;
-      }, 0);
-
-      const totalExpenses = expenses.reduce((sum, item) => sum + item.amount, 0);
-      const currentBalance = totalIncome - totalExpenses;
-      const savingsRate = totalIncome > 0 ? ((currentBalance / totalIncome) * 100) : 0;
-
-      // Get recent transactions (last 5)
-      const recentTransactions = [
-        ...expenses.map(exp => ({ ...exp, type: 'expense' })),
-        ...income.map(inc => ({ ...inc, type: 'income' }))
-      ]
-        .sort((a, b) => new Date(b.createdAt) - new Date(a.createdAt))
-        .slice(0, 5);
+      // Totals and recent transactions are computed server-side
+      const response = await axios.get('/api/dashboard/summary', {
+        params: { recent: 5 }
+      });
+      const summary = response.data;
 
       setDashboardData({
-        totalIncome,
-        totalExpenses,
-        currentBalance,
-        savingsRate,
-        recentTransactions
+        totalIncome: summary.total_income,
+        totalExpenses: summary.total_expenses,
+        currentBalance: summary.balance,
+        savingsRate: summary.savings_rate,
+        recentTransactions: summary.recent_transactions
       });
     } catch (error) {
       toast.error('Failed to fetch dashboard data');
@@ -245,8 +221,8 @@ const Dashboard = () => {
           <div className="transactions-card">
             {dashboardData.recentTransactions.length > 0 ? (
               <div className="transactions-list">
-                {dashboardData.recentTransactions.map((transaction, index) => (
-                  <div key={index} className="transaction-item">
+                {dashboardData.recentTransactions.map((transaction) => (
+                  <div key={transaction._id} className="transaction-item">
                     <div className="transaction-icon">
                       {transaction.type === 'income' ? (
                         <TrendingUp size={20} className="income-icon" />
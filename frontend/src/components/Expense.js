@@ -4,6 +4,9 @@ import { toast } from 'react-toastify';
 import { Plus, Edit3, Trash2, TrendingDown, Upload, FileText, Calendar } from 'lucide-react';
 import './Expense.css';
 
+// How long to keep polling a receipt job before giving up
+const RECEIPT_POLL_LIMIT_MS = 3 * 60 * 1000;
+
 const Expense = () => {
   const [expenseList, setExpenseList] = useState([]);
   const [showForm, setShowForm] = useState(false);
@@ -152,27 +155,26 @@ const Expense = () => {
 
     setBulkSubmitting(true);
     try {
-      let successCount = 0;
-      for (const row of bulkRows) {
-        try {
-          await axios.post('/api/expense', row);
-          successCount += 1;
-        } catch (err) {
-          // continue with other rows
-          console.error('Bulk row save error:', err);
-        }
-      }
+      const response = await axios.post('/api/expense/bulk', { rows: bulkRows }, {
+        validateStatus: (status) => status < 500
+      });
+      const { inserted = 0, errors = [] } = response.data;
+
+      errors.forEach(err => console.error(`Bulk row ${err.row + 1} save error:`, err.error));
 
-      if (successCount === bulkRows.length) {
-        toast.success(`Added ${successCount} expenses successfully`);
-      } else if (successCount > 0) {
-        toast.warn(`Added ${successCount}/${bulkRows.length} expenses. Some failed.`);
+      if (inserted === bulkRows.length) {
+        toast.success(`Added ${inserted} expenses successfully`);
+      } else if (inserted > 0) {
+        toast.warn(`Added ${inserted}/${bulkRows.length} expenses. Some failed.`);
       } else {
         toast.error('Failed to add expenses');
       }
 
       resetBulk();
       fetchExpenses();
+    } catch (error) {
+      toast.error('Failed to add expenses');
+      console.error('Bulk save error:', error);
     } finally {
       setBulkSubmitting(false);
     }
@@ -207,12 +209,29 @@ const Expense = () => {
         }
       });
 
-      const extractedData = response.data.data;
+      // Processing happens in the background, long-poll until the job
+      // finishes, giving up after a few minutes
+      let job = response.data;
+      const giveUpAt = Date.now() + RECEIPT_POLL_LIMIT_MS;
+      while (job.status === 'queued' || job.status === 'running') {
+        if (Date.now() > giveUpAt) {
+          throw new Error('Receipt processing is taking too long');
+        }
+        const poll = await axios.get(`/api/receipts/${job.job_id}`, { params: { wait: 20 } });
+        job = poll.data;
+      }
+
+      if (job.status !== 'done') {
+        throw new Error(job.error || 'Receipt processing failed');
+      }
+
+      const extractedData = job.data;
       
       // Pre-fill form with extracted data
       setFormData(prev => ({
         ...prev,
         amount: extractedData.amount || prev.amount,
+        merchant: extractedData.merchant || prev.merchant,
         date: extractedData.date ? 
           new Date(extractedData.date.split('/').reverse().join('-')).toISOString().split('T')[0] : 
           prev.date,
@@ -222,7 +241,9 @@ const Expense = () => {
       toast.success('Receipt processed successfully! Please review and adjust the details.');
       setShowForm(true);
     } catch (error) {
-      toast.error('Failed to process receipt');
+      toast.error(error.response?.status === 429
+        ? 'Receipt processing is busy, please try again shortly'
+        : 'Failed to process receipt');
       console.error('Receipt upload error:', error);
     } finally {
       setUploadLoading(false);
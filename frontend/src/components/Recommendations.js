@@ -79,11 +79,15 @@ const Recommendations = () => {
     switch (type) {
       case 'warning':
       case 'alert':
+      case 'anomaly':
         return <AlertTriangle size={24} />;
       case 'investment':
+      case 'trend':
         return <TrendingUp size={24} />;
       case 'category_alert':
         return <Target size={24} />;
+      case 'recurring':
+        return <RefreshCw size={24} />;
       default:
         return <Lightbulb size={24} />;
     }
@@ -92,6 +96,8 @@ const Recommendations = () => {
   const getRecommendationClass = (type) => {
     switch (type) {
       case 'warning':
+      case 'anomaly':
+      case 'trend':
         return 'warning';
       case 'alert':
         return 'danger';
@@ -34,14 +34,28 @@ const Visualization = () => {
   const [visualizationData, setVisualizationData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [activeChart, setActiveChart] = useState('monthly');
+  const [rangeYears, setRangeYears] = useState('');
+  const [granularity, setGranularity] = useState('month');
 
   useEffect(() => {
     fetchVisualizationData();
-  }, []);
+  }, [rangeYears, granularity]);
+
+  const chartParams = () => {
+    // No parameters gives the default 6-month monthly chart
+    const params = {};
+    if (rangeYears) {
+      const from = new Date();
+      from.setFullYear(from.getFullYear() - Number(rangeYears));
+      params.from = from.toISOString().slice(0, 10);
+    }
+    if (granularity !== 'month') params.granularity = granularity;
+    return params;
+  };
 
   const fetchVisualizationData = async () => {
     try {
-      const response = await axios.get('/api/visualization');
+      const response = await axios.get('/api/visualization', { params: chartParams() });
       setVisualizationData(response.data);
     } catch (error) {
       toast.error('Failed to fetch visualization data');
@@ -66,16 +80,26 @@ const Visualization = () => {
     return date.toLocaleDateString('en-IN', { month: 'short', year: 'numeric' });
   };
 
+  // Labels are YYYY-MM-DD, YYYY-MM, YYYY-Qn or YYYY depending on the granularity
+  const formatLabel = (label) => {
+    const used = visualizationData?.range?.granularity || 'month';
+    if (used === 'month') return formatMonth(label);
+    if (used === 'day' || used === 'week') {
+      return new Date(label).toLocaleDateString('en-IN', { day: 'numeric', month: 'short', year: '2-digit' });
+    }
+    return label;
+  };
+
   const getMonthlyChartData = () => {
     if (!visualizationData?.monthly_chart) return null;
 
     const { labels, data } = visualizationData.monthly_chart;
     
     return {
-      labels: labels.map(formatMonth),
+      labels: labels.map(formatLabel),
       datasets: [
         {
-          label: 'Monthly Expenses',
+          label: 'Expenses',
           data: data,
           backgroundColor: 'rgba(239, 68, 68, 0.8)',
           borderColor: 'rgba(239, 68, 68, 1)',
@@ -118,7 +142,7 @@ const Visualization = () => {
     const { labels, data } = visualizationData.monthly_chart;
     
     return {
-      labels: labels.map(formatMonth),
+      labels: labels.map(formatLabel),
       datasets: [
         {
           label: 'Spending Trend',
@@ -238,19 +262,20 @@ const Visualization = () => {
     if (monthly_chart?.data?.length > 1) {
       const lastMonth = monthly_chart.data[monthly_chart.data.length - 1];
       const previousMonth = monthly_chart.data[monthly_chart.data.length - 2];
-      const change = ((lastMonth - previousMonth) / previousMonth) * 100;
+      const change = previousMonth > 0 ? ((lastMonth - previousMonth) / previousMonth) * 100 : 0;
+      const period = visualizationData.range?.granularity || 'month';
 
       if (change > 10) {
         insights.push({
           type: 'warning',
           title: 'Spending Increase',
-          message: `Your expenses increased by ${change.toFixed(1)}% last month.`
+          message: `Your expenses increased by ${change.toFixed(1)}% over the last ${period}.`
         });
       } else if (change < -10) {
         insights.push({
           type: 'success',
           title: 'Spending Decrease',
-          message: `Great job! Your expenses decreased by ${Math.abs(change).toFixed(1)}% last month.`
+          message: `Great job! Your expenses decreased by ${Math.abs(change).toFixed(1)}% over the last ${period}.`
         });
       }
     }
@@ -309,10 +334,24 @@ const Visualization = () => {
           <h1>Spending Visualization</h1>
           <p>Analyze your financial patterns with interactive charts</p>
         </div>
-        <button className="btn btn-secondary" onClick={fetchVisualizationData}>
-          <RefreshCw size={16} />
-          Refresh
-        </button>
+        <div className="visualization-controls">
+          <select value={rangeYears} onChange={(e) => setRangeYears(e.target.value)}>
+            <option value="">Last 6 months</option>
+            <option value="1">Last year</option>
+            <option value="5">Last 5 years</option>
+          </select>
+          <select value={granularity} onChange={(e) => setGranularity(e.target.value)}>
+            <option value="day">Daily</option>
+            <option value="week">Weekly</option>
+            <option value="month">Monthly</option>
+            <option value="quarter">Quarterly</option>
+            <option value="year">Yearly</option>
+          </select>
+          <button className="btn btn-secondary" onClick={fetchVisualizationData}>
+            <RefreshCw size={16} />
+            Refresh
+          </button>
+        </div>
       </div>
 
       {/* Chart Navigation */}
@@ -322,7 +361,7 @@ const Visualization = () => {
           onClick={() => setActiveChart('monthly')}
         >
           <BarChart3 size={20} />
-          Monthly Expenses
+          Expenses Over Time
         </button>
         <button 
           className={`nav-btn ${activeChart === 'category' ? 'active' : ''}`}
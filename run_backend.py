@@ -4,18 +4,31 @@ FinWise Backend Server Runner
 
 This script starts the Flask backend server for the FinWise application.
 Make sure MongoDB is running before starting the server.
+
+    python run_backend.py                # development server with the reloader
+    python run_backend.py --mode prod    # multi-worker gunicorn server
+    python run_backend.py --mode async   # async (uvicorn) workers for the read routes
+    python run_backend.py --reload       # gracefully reload a running prod server
+
+The mode can also be set with FINWISE_MODE. Production settings (workers,
+threads, keep-alive, timeouts) come from backend/config.py and the
+SERVER_* environment variables.
 """
 
+import argparse
 import os
+import signal
 import sys
 import subprocess
 from pathlib import Path
 
-def check_mongodb():
-    """Check if MongoDB is running"""
+BACKEND_DIR = Path(__file__).parent / 'backend'
+
+def check_mongodb(uri=None):
+    """Check if MongoDB is running, at the configured MONGODB_URI by default"""
     try:
         import pymongo
-        client = pymongo.MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=2000)
+        client = pymongo.MongoClient(uri or server_config().MONGODB_URI, serverSelectionTimeoutMS=2000)
         client.server_info()
         print("✅ MongoDB is running")
         return True
@@ -38,19 +51,72 @@ def check_dependencies():
         print("Please run: pip install -r backend/requirements.txt")
         return False
 
+def check_gunicorn():
+    """Check if gunicorn is available for production mode"""
+    if os.name == 'nt':
+        print("❌ Production mode needs gunicorn, which does not run on Windows")
+        return False
+    try:
+        import gunicorn
+        print(f"✅ gunicorn {gunicorn.__version__} is installed")
+        return True
+    except ImportError:
+        print("❌ gunicorn is not installed")
+        print("Please run: pip install -r backend/requirements.txt")
+        return False
+
+def server_config():
+    """Load the backend Config without importing the app"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    from config import Config
+    return Config
+
+def reload_server():
+    """Send SIGHUP to a running production server for a graceful reload"""
+    pidfile = BACKEND_DIR / server_config().SERVER_PIDFILE
+    try:
+        pid = int(pidfile.read_text().strip())
+        os.kill(pid, signal.SIGHUP)
+    except (OSError, ValueError) as e:
+        print(f"❌ No running production server found ({pidfile}): {e}")
+        sys.exit(1)
+    print(f"🔄 Reloading workers of server {pid}")
+
+def server_command(mode):
+    if mode == 'prod':
+        return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', "app:create_app('production')"]
+    if mode == 'async':
+        # Read routes on the event loop, the rest through the mounted sync app; see async_app.py
+        return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                '-k', 'uvicorn.workers.UvicornWorker', "async_app:create_async_app('production')"]
+    return [sys.executable, 'app.py']
+
 def main():
+    parser = argparse.ArgumentParser(description='Start the FinWise backend server')
+    parser.add_argument('--mode', choices=['dev', 'prod', 'async'], default=os.environ.get('FINWISE_MODE', 'dev'),
+                        help='dev: Flask dev server with reloader; prod: gunicorn workers; '
+                             'async: uvicorn workers, read routes on Motor')
+    parser.add_argument('--reload', action='store_true', help='Gracefully reload a running prod server')
+    args = parser.parse_args()
+    
+    if args.reload:
+        reload_server()
+        return
+    
     print("🚀 Starting FinWise Backend Server...")
     
     # Check dependencies
     if not check_dependencies():
         sys.exit(1)
+    if args.mode in ('prod', 'async') and not check_gunicorn():
+        sys.exit(1)
     
     # Check MongoDB
     if not check_mongodb():
         sys.exit(1)
     
     # Change to backend directory
-    backend_dir = Path(__file__).parent / 'backend'
+    backend_dir = BACKEND_DIR
     os.chdir(backend_dir)
     
     # Create uploads directory if it doesn't exist
@@ -58,13 +124,19 @@ def main():
     uploads_dir.mkdir(exist_ok=True)
     
     print("📁 Created uploads directory")
-    print("🌐 Starting Flask server on http://localhost:5000")
+    if args.mode in ('prod', 'async'):
+        Config = server_config()
+        per_worker = 'an event loop' if args.mode == 'async' else f'{Config.SERVER_THREADS} threads'
+        print(f"🌐 Starting gunicorn on {Config.SERVER_BIND} with {Config.SERVER_WORKERS} workers, "
+              f"{per_worker} each")
+    else:
+        print("🌐 Starting Flask server on http://localhost:5000")
     print("📊 API documentation available at http://localhost:5000/api")
     print("🛑 Press Ctrl+C to stop the server\n")
     
-    # Start the Flask server
+    # Start the server
     try:
-        subprocess.run([sys.executable, 'app.py'], check=True)
+        subprocess.run(server_command(args.mode), check=True)
     except KeyboardInterrupt:
         print("\n👋 Server stopped")
     except subprocess.CalledProcessError as e:
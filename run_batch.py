@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+FinWise Nightly Batch Runner
+
+Precomputes the recommendation and visualization payloads of every
+recently active user, so the API serves them without touching the
+transaction data. See backend/precompute.py. Run it from cron once a
+night, for example:
+
+    15 2 * * * cd /srv/finwise && python run_batch.py --config production
+
+    python run_batch.py                      # users who signed in within BATCH_ACTIVE_DAYS days
+    python run_batch.py --days 7 --workers 4 # a narrower, smaller run
+
+Defaults come from backend/config.py and the BATCH_* environment variables.
+"""
+
+import argparse
+import os
+import sys
+
+from run_backend import BACKEND_DIR, check_mongodb, server_config
+
+def progress(done, total):
+    print(f"   {done}/{total} users", flush=True)
+
+def main():
+    Config = server_config()
+    parser = argparse.ArgumentParser(description='Precompute payloads for recently active FinWise users')
+    parser.add_argument('--config', default=os.environ.get('FINWISE_CONFIG', 'default'),
+                        help='Config name from backend/config.py')
+    parser.add_argument('--days', type=int, default=Config.BATCH_ACTIVE_DAYS,
+                        help='Users who signed in within this many days')
+    parser.add_argument('--chunk-size', type=int, default=Config.BATCH_CHUNK_SIZE, help='Users per aggregation')
+    parser.add_argument('--workers', type=int, default=Config.BATCH_WORKERS, help='Worker processes')
+    args = parser.parse_args()
+
+    from config import config
+    if not check_mongodb(config[args.config].MONGODB_URI):
+        sys.exit(1)
+
+    os.chdir(BACKEND_DIR)
+    from pymongo import MongoClient
+
+    from database import DEFAULT_DATABASE
+    import precompute
+
+    db = MongoClient(config[args.config].MONGODB_URI).get_default_database(DEFAULT_DATABASE)
+    print(f"🌙 Precomputing payloads for users active in the last {args.days} days "
+          f"({args.workers} workers, {args.chunk_size} users per chunk)")
+    try:
+        summary = precompute.run_batch(db, config_name=args.config, days=args.days, chunk_size=args.chunk_size,
+                                       workers=args.workers, progress=progress)
+    except KeyboardInterrupt:
+        print("\n👋 Batch stopped")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Batch failed: {e}")
+        sys.exit(1)
+
+    print(f"✅ {summary['users']} users ({summary['stored']} with data) in {summary['chunks']} chunks, {summary['seconds']}s "
+          f"({summary['users_per_sec']} users/sec)")
+
+if __name__ == '__main__':
+    main()